@@ -7,10 +7,32 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from fact_check_with_openai import history_writer, http_session  # noqa: E402  (needs settings loaded)
+
+
+async def application(scope, receive, send):
+    # Django's ASGIHandler rejects lifespan scopes, so startup/shutdown are handled here:
+    # the worker's loop is long-lived, so the pooled aiohttp session can be shared.
+    if scope["type"] != "lifespan":
+        return await django_application(scope, receive, send)
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            http_session.enable_shared_session()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await http_session.close_sessions()
+            # كتابة سجلات الفحص المتبقية في الطابور قبل إنهاء العامل
+            await asyncio.to_thread(history_writer.shutdown)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -1,9 +1,11 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR
 from django.utils.html import format_html
-from django.db.models import Count, Q
+from django.db import transaction
 from django.utils import timezone
-from datetime import timedelta
 from .models import FactCheckHistory
+from . import rollups
+from .search import search_history
 
 
 @admin.register(FactCheckHistory)
@@ -35,6 +37,7 @@ class FactCheckHistoryAdmin(admin.ModelAdmin):
     ]
 
     readonly_fields = [
+        'case_label',
         'created_at',
         'sources_display',
         'news_article_preview',
@@ -43,7 +46,7 @@ class FactCheckHistoryAdmin(admin.ModelAdmin):
 
     fieldsets = (
         ('معلومات الفحص', {
-            'fields': ('query', 'case', 'talk')
+            'fields': ('query', 'case', 'case_label', 'talk')
         }),
         ('المصادر', {
             'fields': ('sources_display',),
@@ -65,11 +68,27 @@ class FactCheckHistoryAdmin(admin.ModelAdmin):
 
     actions = ['mark_as_true', 'mark_as_false', 'export_selected']
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # صفحة القائمة تعرض معاينات فقط؛ الإجراءات (POST) وصفحة التعديل تحتاج الصف كاملاً
+        match = request.resolver_match
+        if request.method == 'GET' and match and match.url_name == 'dashboard_factcheckhistory_changelist':
+            queryset = queryset.for_list()
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        """بحث نصي مفهرس بدل ILIKE على كل الحقول (search_fields يبقى لإظهار مربع البحث)"""
+        if not search_term:
+            return queryset, False
+        queryset = search_history(queryset, search_term)
+        # الأكثر صلة أولاً ما لم يختر المستخدم ترتيباً بنفسه
+        if ORDER_VAR not in request.GET:
+            queryset = queryset.order_by('-rank', '-created_at', '-pk')
+        return queryset, False
+
     def query_preview(self, obj):
         """عرض أول 100 حرف من النص"""
-        if len(obj.query) > 100:
-            return f"{obj.query[:100]}..."
-        return obj.query
+        return obj.query_preview
     query_preview.short_description = 'النص'
 
     def case_badge(self, obj):
@@ -134,13 +153,17 @@ class FactCheckHistoryAdmin(admin.ModelAdmin):
     # Custom Actions
     def mark_as_true(self, request, queryset):
         """تحديد كـ حقيقي"""
-        updated = queryset.update(case='true')
+        with transaction.atomic():
+            rollups.move_case(queryset, 'true')
+            updated = queryset.update(case='true')
         self.message_user(request, f'تم تحديث {updated} سجل كـ حقيقي')
     mark_as_true.short_description = 'تحديد كـ حقيقي'
 
     def mark_as_false(self, request, queryset):
         """تحديد كـ كاذب"""
-        updated = queryset.update(case='false')
+        with transaction.atomic():
+            rollups.move_case(queryset, 'false')
+            updated = queryset.update(case='false')
         self.message_user(request, f'تم تحديث {updated} سجل كـ كاذب')
     mark_as_false.short_description = 'تحديد كـ كاذب'
 
@@ -172,26 +195,12 @@ class FactCheckHistoryAdmin(admin.ModelAdmin):
         """إضافة إحصائيات في أعلى الصفحة"""
         extra_context = extra_context or {}
 
-        # إحصائيات عامة
-        total = FactCheckHistory.objects.count()
-        today = FactCheckHistory.objects.filter(
-            created_at__date=timezone.now().date()
-        ).count()
-        last_7_days = FactCheckHistory.objects.filter(
-            created_at__gte=timezone.now() - timedelta(days=7)
-        ).count()
-
-        # إحصائيات حسب النتيجة
-        stats = FactCheckHistory.objects.aggregate(
-            true_count=Count('id', filter=Q(case='true')),
-            false_count=Count('id', filter=Q(case='false')),
-            mixed_count=Count('id', filter=Q(case='mixed')),
-            unverified_count=Count('id', filter=Q(case='unverified')),
-        )
+        # كل الإحصائيات من جدول الملخص اليومي في استعلام واحد
+        summary = rollups.summary(timezone.localdate())
 
-        extra_context['total_checks'] = total
-        extra_context['today_checks'] = today
-        extra_context['last_7_days_checks'] = last_7_days
-        extra_context['stats'] = stats
+        extra_context['total_checks'] = summary['total_checks']
+        extra_context['today_checks'] = summary['today_checks']
+        extra_context['last_7_days_checks'] = summary['last_7_days']
+        extra_context['stats'] = {key: summary[key] for key in ('true_count', 'false_count', 'mixed_count', 'unverified_count')}
 
         return super().changelist_view(request, extra_context=extra_context)
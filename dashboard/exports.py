@@ -0,0 +1,148 @@
+"""
+Streaming export of FactCheckHistory (CSV / JSONL, optionally gzip-compressed).
+
+Rows are read in chunks of EXPORT_CHUNK_SIZE and written out in ~64 KB pieces, so
+memory stays constant whatever the table size. Under WSGI the response iterates
+``queryset.iterator()``; under ASGI (``asynchronous=True``) it is an async generator
+that fetches the same chunks through ``sync_to_async`` (see ``_aiterate``). Django
+would otherwise consume a sync iterator with ``sync_to_async(list)``, i.e. build the
+whole export in memory before sending the first byte.
+"""
+import csv
+import json
+import zlib
+from itertools import islice
+from typing import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async
+from django.db.models import F, Func, IntegerField
+from django.db.models.functions import Coalesce, Substr
+from django.http import StreamingHttpResponse
+
+from .models import FactCheckHistory
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'jsonl')
+_FLUSH_BYTES = 64 * 1024
+
+CSV_HEADER = ['ID', 'النص', 'النتيجة', 'التحليل', 'عدد المصادر', 'IP', 'التاريخ']
+JSONL_FIELDS = ['id', 'query', 'case', 'case_label', 'talk', 'sources', 'news_article', 'x_tweet', 'ip_address', 'created_at']
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer: returns the formatted line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+class _CsvFormat:
+    def __init__(self, queryset):
+        self.rows = queryset.annotate(
+            # أول 200 حرف من التحليل وعدد المصادر تُحسب في قاعدة البيانات بدل تحميل الحقول الكبيرة
+            talk_excerpt=Substr('talk', 1, 200),
+            sources_total=Coalesce(Func(F('sources'), function='jsonb_array_length', output_field=IntegerField()), 0),
+        ).values_list('id', 'query', 'case', 'talk_excerpt', 'sources_total', 'ip_address', 'created_at')
+        self.writer = csv.writer(_Echo())
+        self.case_labels = dict(FactCheckHistory.CASE_CHOICES)
+
+    def header(self) -> str:
+        # BOM مرة واحدة حتى يفتح Excel الملف العربي بشكل صحيح
+        return '\ufeff' + self.writer.writerow(CSV_HEADER)
+
+    def line(self, values) -> str:
+        pk, query, case, talk, sources_total, ip, created_at = values
+        return self.writer.writerow([
+            pk, query, self.case_labels.get(case, case), talk, sources_total, ip,
+            created_at.strftime('%Y-%m-%d %H:%M'),
+        ])
+
+
+class _JsonlFormat:
+    def __init__(self, queryset):
+        self.rows = queryset.values_list(*JSONL_FIELDS)
+
+    def header(self) -> str:
+        return ''
+
+    def line(self, values) -> str:
+        record = dict(zip(JSONL_FIELDS, values))
+        record['id'] = str(record['id'])
+        record['created_at'] = record['created_at'].isoformat()
+        return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class _Encoder:
+    """Lines → ~64 KB byte chunks, gzip-compressed when compress=True (same encoder for both streams)"""
+
+    def __init__(self, compress: bool, header: str = ''):
+        first = header.encode('utf-8')
+        self.buffer, self.size = [first], len(first)
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31 → gzip container
+
+    def feed(self, line: str) -> bytes:
+        """b'' until ~64 KB are buffered"""
+        data = line.encode('utf-8')
+        self.buffer.append(data)
+        self.size += len(data)
+        return self._drain() if self.size >= _FLUSH_BYTES else b''
+
+    def close(self) -> bytes:
+        chunk = self._drain()
+        return chunk + self.compressor.flush() if self.compressor else chunk
+
+    def _drain(self) -> bytes:
+        chunk = b''.join(self.buffer)
+        self.buffer, self.size = [], 0
+        return self.compressor.compress(chunk) if self.compressor and chunk else chunk
+
+
+def _stream(fmt, encoder: _Encoder) -> Iterator[bytes]:
+    for values in fmt.rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        chunk = encoder.feed(fmt.line(values))
+        if chunk:
+            yield chunk
+    yield encoder.close()
+
+
+async def _aiterate(rows) -> AsyncIterator[tuple]:
+    """
+    ``rows.aiterator()`` one chunk per sync_to_async call. Django 5.2's aiterator()
+    cannot be used on values_list() querysets: ValuesListIterable.__iter__ runs the
+    query as soon as it is called, i.e. inside the event loop (SynchronousOnlyOperation).
+    """
+    iterator = rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    next_chunk = sync_to_async(lambda: list(islice(iterator, EXPORT_CHUNK_SIZE)))
+    while True:
+        chunk = await next_chunk()
+        for values in chunk:
+            yield values
+        if len(chunk) < EXPORT_CHUNK_SIZE:
+            return
+
+
+async def _astream(fmt, encoder: _Encoder) -> AsyncIterator[bytes]:
+    async for values in _aiterate(fmt.rows):
+        chunk = encoder.feed(fmt.line(values))
+        if chunk:
+            yield chunk
+    yield encoder.close()
+
+
+def stream_export(queryset, export_format: str = 'csv', compress: bool = False, asynchronous: bool = False) -> StreamingHttpResponse:
+    """asynchronous=True for requests served by the ASGI handler (see module docstring)"""
+    if export_format == 'jsonl':
+        fmt = _JsonlFormat(queryset)
+        content_type, filename = 'application/x-ndjson', 'fact_checks.jsonl'
+    else:
+        fmt = _CsvFormat(queryset)
+        content_type, filename = 'text/csv; charset=utf-8', 'fact_checks.csv'
+
+    if compress:
+        content_type, filename = 'application/gzip', filename + '.gz'
+
+    encoder = _Encoder(compress, fmt.header())
+    chunks = _astream(fmt, encoder) if asynchronous else _stream(fmt, encoder)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,54 @@
+"""
+Primary keys for FactCheckHistory.
+
+uuid4 keys are random, so every insert lands on a random page of the primary-key
+B-tree (page splits, cold pages, a bloated index under sustained load). UUIDv7
+(RFC 9562) puts a millisecond timestamp in the top 48 bits, so new keys are
+appended to the right edge of the index like a sequence, while staying globally
+unique and the same 128-bit uuid type — existing uuid4 rows stay valid.
+
+HISTORY_TIME_ORDERED_IDS=0 switches new rows back to uuid4.
+"""
+import os
+import secrets
+import threading
+import time
+import uuid
+
+HISTORY_TIME_ORDERED_IDS = os.getenv("HISTORY_TIME_ORDERED_IDS", "1") == "1"
+
+_MAX_COUNTER = 0xFFF
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    48-bit unix ms | version 7 | 12-bit counter | variant | 62 random bits.
+    The counter keeps ids strictly increasing within one process even when
+    several are generated in the same millisecond (RFC 9562 §6.2, method 1).
+    """
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            # نبدأ من النصف الأدنى ليبقى مجال للزيادة داخل نفس الميلي ثانية
+            _last_ms, _counter = ms, secrets.randbits(11)
+        else:
+            _counter += 1
+            if _counter > _MAX_COUNTER:
+                # نفد العداد → نستعير الميلي ثانية التالية بدل الانتظار
+                _last_ms, _counter = _last_ms + 1, 0
+        ms, counter = _last_ms, _counter
+    value = (ms & (2 ** 48 - 1)) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | secrets.randbits(62)
+    return uuid.UUID(int=value)
+
+
+def uuid7_time(value: uuid.UUID) -> float:
+    """Unix timestamp (seconds) encoded in a UUIDv7"""
+    return (value.int >> 80) / 1000
+
+
+def new_history_id() -> uuid.UUID:
+    return uuid7() if HISTORY_TIME_ORDERED_IDS else uuid.uuid4()
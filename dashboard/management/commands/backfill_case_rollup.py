@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyCaseRollup table (day x case counts) from FactCheckHistory"
+
+    def handle(self, *args, **options):
+        written = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt daily rollup: {written} (day, case) rows"))
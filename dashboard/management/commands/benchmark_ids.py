@@ -0,0 +1,61 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from dashboard.ids import uuid7
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare insert throughput and primary-key index size for uuid4 vs UUIDv7 keys "
+        "(temporary tables shaped like dashboard_factcheckhistory, dropped afterwards)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--batch', type=int, default=100, help='Rows per INSERT (the write-behind batch size)')
+
+    def handle(self, *args, **options):
+        results = {}
+        for label, make_id in [('uuid4', uuid.uuid4), ('uuid7', uuid7)]:
+            results[label] = self._run(label, make_id, options['rows'], options['batch'])
+            seconds, index_bytes, table_bytes = results[label]
+            self.stdout.write(
+                f"{label}: {options['rows'] / seconds:10.0f} rows/s  "
+                f"pk index {index_bytes / 2 ** 20:8.1f} MB  table {table_bytes / 2 ** 20:8.1f} MB"
+            )
+        uuid4, uuid7_ = results['uuid4'], results['uuid7']
+        self.stdout.write(self.style.SUCCESS(
+            f"📊 uuid7 vs uuid4: {uuid4[0] / uuid7_[0]:.2f}x throughput, "
+            f"{uuid7_[1] / uuid4[1]:.2f}x index size"
+        ))
+
+    def _run(self, label, make_id, rows, batch):
+        table = connection.ops.quote_name(f'benchmark_ids_{label}')
+        placeholders = ", ".join(["(%s, %s, now())"] * batch)
+        payload = 'ت' * 200  # بحجم سطر قصير من query
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"CREATE TABLE {table} (id uuid PRIMARY KEY, query text NOT NULL, created_at timestamptz NOT NULL)")
+            try:
+                seconds = 0.0
+                for offset in range(0, rows, batch):
+                    size = min(batch, rows - offset)
+                    values = placeholders if size == batch else ", ".join(["(%s, %s, now())"] * size)
+                    params = [value for _ in range(size) for value in (make_id(), payload)]
+                    # نقيس زمن قاعدة البيانات فقط؛ كل دفعة في معاملة مستقلة كما يفعل history_writer
+                    started = time.perf_counter()
+                    with transaction.atomic():
+                        cursor.execute(f"INSERT INTO {table} (id, query, created_at) VALUES {values}", params)
+                    seconds += time.perf_counter() - started
+                cursor.execute(
+                    "SELECT pg_relation_size(i.indexrelid), pg_relation_size(i.indrelid) "
+                    "FROM pg_index i WHERE i.indrelid = %s::regclass AND i.indisprimary",
+                    [table],
+                )
+                index_bytes, table_bytes = cursor.fetchone()
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        return seconds, index_bytes, table_bytes
@@ -0,0 +1,85 @@
+import re
+import statistics
+import time
+
+from django.contrib.postgres.search import SearchQuery
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from dashboard import rollups
+from dashboard.models import FactCheckHistory
+from dashboard.search import search_history
+
+# مفردات لتوليد نصوص عربية تركيبية
+WORDS = [
+    'زلزال', 'تركيا', 'الحكومة', 'الرئيس', 'انتخابات', 'اللقاح', 'كورونا', 'الاقتصاد',
+    'الدولار', 'النفط', 'مصر', 'السعودية', 'غزة', 'المغرب', 'وزارة', 'الصحة', 'فيضانات',
+    'ارتفاع', 'الأسعار', 'مباراة', 'المنتخب', 'تصريحات', 'الجامعة', 'إضراب', 'الطيران',
+]
+TERMS = ['زلزال', 'الانتخابات', 'ارتفاع الأسعار', 'النفط -مصر', 'ترك']
+SCAN_RE = re.compile(r'[A-Za-z ]*Scan(?: using \S+)?')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ILIKE scans with indexed full-text/trigram search on a synthetic "
+        "FactCheckHistory table (rolled back afterwards unless --keep)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._generate(options['rows'])
+            for term in TERMS:
+                self.stdout.write(f"\n🔎 {term!r}")
+                for label, queryset in self._candidates(term):
+                    self._measure(label, queryset, options['repeat'])
+            if options['keep']:
+                # الإدراج الخام لا يمر بالإشارات → نعيد بناء الملخص اليومي
+                rollups.rebuild()
+            else:
+                transaction.set_rollback(True)
+
+    def _generate(self, rows):
+        words = "ARRAY[" + ", ".join(f"'{w}'" for w in WORDS) + "]"
+        pick = f"({words})[1 + floor(random() * {len(WORDS)})::int]"
+        sentence = lambda n: " || ' ' || ".join([pick] * n)
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO dashboard_factcheckhistory (id, query, "case", talk, sources, created_at)
+                SELECT gen_random_uuid(), {sentence(6)},
+                       (ARRAY['true','false','mixed','unverified'])[1 + (i %% 4)],
+                       {sentence(40)}, '[]'::jsonb,
+                       now() - (i || ' seconds')::interval
+                FROM generate_series(1, %s) AS i
+            """, [rows])
+            cursor.execute("ANALYZE dashboard_factcheckhistory")
+        self.stdout.write(f"📦 Generated {rows} rows in {time.perf_counter() - started:.1f}s")
+
+    def _candidates(self, term):
+        base = FactCheckHistory.objects.only('id', 'query', 'created_at')
+        yield 'ilike (query|talk)', base.filter(Q(query__icontains=term) | Q(talk__icontains=term)).order_by('-created_at')
+        ts_query = SearchQuery(term, config='arabic', search_type='websearch')
+        yield 'full-text only', base.filter(search_vector=ts_query).order_by('-created_at')
+        # يستعمل فهرس GIN للنص الكامل مع فهرس trigram (إن وُجد pg_trgm) عبر BitmapOr
+        yield 'search_history', search_history(base, term).order_by('-rank', '-created_at')
+
+    def _measure(self, label, queryset, repeat):
+        page = queryset[:50]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(page.all())  # نسخة جديدة في كل مرة حتى لا تُستعمل النتائج المخزنة
+            timings.append((time.perf_counter() - started) * 1000)
+        plan = page.explain().splitlines()
+        scans = sorted({match.group(0).strip() for line in plan for match in [SCAN_RE.search(line)] if match})
+        self.stdout.write(
+            f"  {label:<20} median {statistics.median(timings):8.1f} ms"
+            f"  max {max(timings):8.1f} ms  [{'; '.join(scans)}]"
+        )
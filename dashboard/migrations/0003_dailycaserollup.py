@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:19
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    FactCheckHistory = apps.get_model('dashboard', 'FactCheckHistory')
+    DailyCaseRollup = apps.get_model('dashboard', 'DailyCaseRollup')
+    rows = (
+        FactCheckHistory.objects
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'case')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    DailyCaseRollup.objects.bulk_create(
+        [DailyCaseRollup(date=row['day'], case=row['case'], count=row['n']) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_recreate_with_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCaseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='اليوم')),
+                ('case', models.CharField(max_length=20, verbose_name='النتيجة')),
+                ('count', models.IntegerField(default=0, verbose_name='العدد')),
+            ],
+            options={
+                'verbose_name': 'ملخص يومي للنتائج',
+                'verbose_name_plural': 'ملخصات يومية للنتائج',
+            },
+        ),
+        migrations.RenameIndex(
+            model_name='factcheckhistory',
+            new_name='dashboard_f_created_2f6582_idx',
+            old_name='dashboard_f_created_538c3e_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='factcheckhistory',
+            new_name='dashboard_f_case_2e3b1c_idx',
+            old_name='dashboard_f_case_f87e29_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='factcheckhistory',
+            new_name='dashboard_f_ip_addr_04164e_idx',
+            old_name='dashboard_f_ip_addr_b8e0b5_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='dailycaserollup',
+            constraint=models.UniqueConstraint(fields=('date', 'case'), name='unique_rollup_date_case'),
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:21
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import DatabaseError, migrations, models, transaction
+
+TRIGRAM_INDEX = 'factcheck_query_trgm_gin'
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Indexes UPPER(query) because that is what Django's icontains compiles to.
+    pg_trgm is a contrib extension: hosts without it (or without the rights to
+    create it) still get full-text search, just no trigram-accelerated ILIKE.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            print("\n  ⚠️ pg_trgm is not available, skipping the trigram index")
+            return
+    # savepoint: a failed CREATE EXTENSION (no privilege) must not abort the migration
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON dashboard_factcheckhistory USING gin (UPPER(query) gin_trgm_ops)'
+            )
+    except DatabaseError as e:
+        print(f"\n  ⚠️ Could not create pg_trgm / the trigram index, skipping it: {e}")
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_dailycaserollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factcheckhistory',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('query', config='arabic', weight='A'), '||', django.contrib.postgres.search.SearchVector('query', config='simple', weight='A'), django.contrib.postgres.search.SearchConfig('arabic')), '||', django.contrib.postgres.search.SearchVector('talk', config='arabic', weight='B'), django.contrib.postgres.search.SearchConfig('arabic')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='factcheckhistory',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='factcheck_search_vector_gin'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
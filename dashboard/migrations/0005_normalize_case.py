@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:27
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from dashboard.verdicts import normalize_case
+
+CASES = ['true', 'false', 'mixed', 'unverified']
+
+
+def normalize_existing_cases(apps, schema_editor):
+    FactCheckHistory = apps.get_model('dashboard', 'FactCheckHistory')
+    DailyCaseRollup = apps.get_model('dashboard', 'DailyCaseRollup')
+    raw_cases = list(
+        FactCheckHistory.objects.exclude(case__in=CASES).values_list('case', flat=True).distinct().order_by()
+    )
+    if not raw_cases:
+        return
+    # تحديث واحد لكل قيمة محلية مختلفة (عددها صغير مهما كبر الجدول)
+    for raw in raw_cases:
+        FactCheckHistory.objects.filter(case=raw).update(case=normalize_case(raw), case_label=(raw or '')[:50])
+        print(f"  🔁 {raw!r} → {normalize_case(raw)}")
+
+    # الملخص اليومي كان يعدّ القيم الخام → نعيد بناءه
+    rows = (
+        FactCheckHistory.objects
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'case')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    DailyCaseRollup.objects.all().delete()
+    DailyCaseRollup.objects.bulk_create(
+        [DailyCaseRollup(date=row['day'], case=row['case'], count=row['n']) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factcheckhistory',
+            name='case_label',
+            field=models.CharField(blank=True, default='', help_text='النتيجة بلغة الفحص كما أعادها النموذج (مثل Vrai أو غير مؤكد)', max_length=50, verbose_name='النتيجة كما وردت'),
+        ),
+        migrations.RunPython(normalize_existing_cases, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='factcheckhistory',
+            constraint=models.CheckConstraint(condition=models.Q(('case__in', ['true', 'false', 'mixed', 'unverified'])), name='factcheck_case_valid'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:29
+
+import dashboard.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_normalize_case'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='factcheckhistory',
+            name='id',
+            field=models.UUIDField(default=dashboard.ids.new_history_id, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
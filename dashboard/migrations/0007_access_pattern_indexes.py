@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_time_ordered_ids'),
+    ]
+
+    operations = [
+        # الفهارس الجديدة أولاً حتى لا تبقى الاستعلامات بلا فهرس أثناء الترحيل
+        migrations.AddIndex(
+            model_name='factcheckhistory',
+            index=models.Index(fields=['case', 'created_at'], name='factcheck_case_created'),
+        ),
+        migrations.AddIndex(
+            model_name='factcheckhistory',
+            index=models.Index(condition=models.Q(('ip_address__isnull', False)), fields=['ip_address', 'created_at'], name='factcheck_ip_created'),
+        ),
+        migrations.RemoveIndex(
+            model_name='factcheckhistory',
+            name='dashboard_f_created_2f6582_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='factcheckhistory',
+            name='dashboard_f_case_2e3b1c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='factcheckhistory',
+            name='dashboard_f_ip_addr_04164e_idx',
+        ),
+    ]
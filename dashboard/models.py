@@ -1,6 +1,37 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models.functions import Coalesce, Substr
 from django.utils import timezone
-import uuid
+
+from .ids import new_history_id
+from .verdicts import normalize_case
+
+QUERY_PREVIEW_LENGTH = 100
+
+# الأعمدة التي تحتاجها شاشات القوائم (API والإدارة)
+LIST_FIELDS = ('id', 'case', 'ip_address', 'created_at')
+
+
+class FactCheckHistoryQuerySet(models.QuerySet):
+    def for_list(self, *fields):
+        """
+        صفوف خفيفة للقوائم: بدون talk/sources/news_article/x_tweet/user_agent،
+        مع بداية النص وعدد المصادر محسوبين في قاعدة البيانات
+        (query_preview و sources_count يستعملانهما تلقائياً)
+        """
+        return self.only(*LIST_FIELDS, *fields).annotate(
+            query_head=Substr('query', 1, QUERY_PREVIEW_LENGTH + 1),
+            sources_total=Coalesce(
+                models.Func(models.F('sources'), function='jsonb_array_length', output_field=models.IntegerField()), 0
+            ),
+        )
+
+
+class FactCheckHistoryManager(models.Manager.from_queryset(FactCheckHistoryQuerySet)):
+    def get_queryset(self):
+        # search_vector بحجم التحليل تقريباً ولا يُعرض أبداً → لا نجلبه افتراضياً
+        return super().get_queryset().defer('search_vector')
 
 
 class FactCheckHistory(models.Model):
@@ -16,8 +47,8 @@ class FactCheckHistory(models.Model):
         ('unverified', 'غير موثق'),
     ]
 
-    # Primary Key as UUID
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Primary Key as UUID (UUIDv7 مرتب زمنياً افتراضياً، انظر ids.py)
+    id = models.UUIDField(primary_key=True, default=new_history_id, editable=False)
 
     # البيانات الأساسية
     query = models.TextField(
@@ -32,6 +63,14 @@ class FactCheckHistory(models.Model):
         help_text='نتيجة الفحص: حقيقي، كاذب، مختلط، أو غير موثق'
     )
 
+    case_label = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        verbose_name='النتيجة كما وردت',
+        help_text='النتيجة بلغة الفحص كما أعادها النموذج (مثل Vrai أو غير مؤكد)'
+    )
+
     talk = models.TextField(
         verbose_name='التحليل',
         help_text='التحليل الكامل للخبر'
@@ -81,24 +120,80 @@ class FactCheckHistory(models.Model):
         db_index=True
     )
 
+    # فهرس البحث النصي: يحسبه Postgres عند كل إدراج/تعديل (عمود مولّد مخزَّن)
+    # arabic للتجذيع العربي + simple للكلمات كما هي (أسماء لاتينية، أرقام)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('query', config='arabic', weight='A')
+            + SearchVector('query', config='simple', weight='A')
+            + SearchVector('talk', config='arabic', weight='B')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        editable=False,
+    )
+
+    objects = FactCheckHistoryManager()
+
     class Meta:
         verbose_name = 'سجل فحص الحقائق'
         verbose_name_plural = 'سجلات فحص الحقائق'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['-created_at']),
-            models.Index(fields=['case']),
-            models.Index(fields=['ip_address']),
+            # created_at وحده: db_index على الحقل (يُمسح بالاتجاهين فلا حاجة لفهرس -created_at)
+            # (case | ip_address) + مدى created_at، ويخدمان أيضاً الفلترة على العمود الأول وحده
+            models.Index(fields=['case', 'created_at'], name='factcheck_case_created'),
+            models.Index(
+                fields=['ip_address', 'created_at'], name='factcheck_ip_created',
+                condition=models.Q(ip_address__isnull=False),
+            ),
+            GinIndex(fields=['search_vector'], name='factcheck_search_vector_gin'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(case__in=['true', 'false', 'mixed', 'unverified']),
+                name='factcheck_case_valid',
+            ),
         ]
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.normalize_verdict() and update_fields is not None and 'case' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'case_label'}
+        super().save(*args, **kwargs)
+
+    def normalize_verdict(self) -> bool:
+        """
+        النتيجة قد تصل بلغة الفحص ("حقيقي", "Vrai") → نخزن القيمة الموحدة في case
+        ونحتفظ بالأصل في case_label. bulk_create لا يمر بـ save() فيستدعيها بنفسه.
+        """
+        if self.case in dict(self.CASE_CHOICES):
+            return False
+        self.case_label = self.case_label or (self.case or '')[:50]
+        self.case = normalize_case(self.case)
+        return True
+
     def __str__(self):
         return f"{self.query[:50]}... - {self.get_case_display()} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
     @property
     def sources_count(self):
         """عدد المصادر"""
+        total = getattr(self, 'sources_total', None)
+        if total is not None:
+            return total
         return len(self.sources) if self.sources else 0
 
+    @property
+    def query_preview(self):
+        """أول 100 حرف من النص"""
+        text = getattr(self, 'query_head', None)
+        if text is None:
+            text = self.query
+        if len(text) > QUERY_PREVIEW_LENGTH:
+            return f"{text[:QUERY_PREVIEW_LENGTH]}..."
+        return text
+
     @property
     def is_fake(self):
         """هل الخبر كاذب؟"""
@@ -108,3 +203,24 @@ class FactCheckHistory(models.Model):
     def is_verified(self):
         """هل الخبر موثق؟"""
         return self.case in ['true', 'false', 'mixed']
+
+
+class DailyCaseRollup(models.Model):
+    """
+    عدد الفحوص لكل (يوم × نتيجة) — تُحدَّث تدريجياً عند كل إدراج/تعديل/حذف
+    (انظر dashboard/rollups.py) وتُعاد بناؤها بالأمر backfill_case_rollup
+    """
+
+    date = models.DateField(verbose_name='اليوم')
+    case = models.CharField(max_length=20, verbose_name='النتيجة')
+    count = models.IntegerField(default=0, verbose_name='العدد')
+
+    class Meta:
+        verbose_name = 'ملخص يومي للنتائج'
+        verbose_name_plural = 'ملخصات يومية للنتائج'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'case'], name='unique_rollup_date_case'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.case}: {self.count}"
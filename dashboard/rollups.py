@@ -0,0 +1,145 @@
+"""
+Incremental maintenance of DailyCaseRollup.
+
+Single-row saves and deletes are handled by the signals in dashboard/signals.py.
+Paths that bypass signals must report their changes explicitly:
+- ``record_created(objs)`` after ``bulk_create`` (history write-behind queue),
+- ``move_case(queryset, new_case)`` before ``queryset.update(case=...)`` (admin actions),
+- ``clear()`` when all history is wiped.
+``rebuild()`` recomputes everything from FactCheckHistory (backfill command).
+
+Every change also bumps a stamp in the shared cache (``changes_stamp()``), which
+versions the cached time series (dashboard/timeseries.py) across workers.
+"""
+import os
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyCaseRollup, FactCheckHistory
+
+CASES = [value for value, _ in FactCheckHistory.CASE_CHOICES]
+
+ROLLUP_CACHE_ALIAS = os.getenv("DASHBOARD_CACHE_ALIAS", "shared")
+_STAMP_KEY = "dashboard:rollup:stamp"
+
+
+def dashboard_cache():
+    from django.core.cache import caches
+    return caches[ROLLUP_CACHE_ALIAS]
+
+
+def _write_stamp() -> None:
+    try:
+        # قيمة جديدة (لا incr): كتابتان متزامنتان تنتهيان بقيمة جديدة في الحالتين
+        dashboard_cache().set(_STAMP_KEY, time.time_ns(), None)
+    except Exception as e:
+        print(f"⚠️ Could not bump dashboard cache stamp: {e}")
+
+
+def mark_changed() -> None:
+    """Invalidate everything cached from the rollup, once the current transaction commits"""
+    transaction.on_commit(_write_stamp)
+
+
+def changes_stamp():
+    try:
+        return dashboard_cache().get_or_set(_STAMP_KEY, time.time_ns(), None)
+    except Exception:
+        return None
+
+
+def rollup_date(created_at) -> date:
+    """اليوم بتوقيت المشروع (نفس تقسيم created_at__date)"""
+    return timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """
+    [بداية اليوم، بداية اليوم التالي) بتوقيت المشروع: created_at__gte/__lt تستعمل
+    فهارس created_at، بينما created_at__date يحوّل العمود فلا يُستعمل أي فهرس
+    """
+    midnight = datetime.min.time()
+    start = timezone.make_aware(datetime.combine(day, midnight))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), midnight))
+
+
+def apply_deltas(deltas: Dict[Tuple[date, str], int]) -> None:
+    """Add ``n`` to the (date, case) counters in one upsert statement"""
+    rows = [(day, case, n) for (day, case), n in deltas.items() if n]
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    table = qn(DailyCaseRollup._meta.db_table)
+    values = ", ".join(["(%s, %s, %s)"] * len(rows))
+    sql = (
+        f"INSERT INTO {table} ({qn('date')}, {qn('case')}, {qn('count')}) VALUES {values} "
+        f"ON CONFLICT ({qn('date')}, {qn('case')}) "
+        f"DO UPDATE SET {qn('count')} = {table}.{qn('count')} + EXCLUDED.{qn('count')}"
+    )
+    params = [value for row in rows for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    mark_changed()
+
+
+def record_created(objs: Iterable[FactCheckHistory]) -> None:
+    apply_deltas(Counter((rollup_date(obj.created_at), obj.case) for obj in objs))
+
+
+def move_case(queryset, new_case: str) -> None:
+    """Call before ``queryset.update(case=new_case)``"""
+    deltas: Counter = Counter()
+    changed = queryset.exclude(case=new_case).annotate(day=TruncDate('created_at')).values('day', 'case').annotate(n=Count('id'))
+    for row in changed:
+        deltas[(row['day'], row['case'])] -= row['n']
+        deltas[(row['day'], new_case)] += row['n']
+    apply_deltas(deltas)
+
+
+def rebuild() -> int:
+    """Recompute the whole rollup table from FactCheckHistory; returns the number of rows written"""
+    rows = (
+        FactCheckHistory.objects
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'case')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        clear()
+        created = DailyCaseRollup.objects.bulk_create(
+            [DailyCaseRollup(date=row['day'], case=row['case'], count=row['n']) for row in rows],
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def clear() -> None:
+    DailyCaseRollup.objects.all().delete()
+    mark_changed()
+
+
+def summary(today: date | None = None) -> dict:
+    """
+    كل العدّادات التي تحتاجها لوحة التحكم في استعلام واحد.
+    last_7_days / last_30_days are calendar days including today.
+    """
+    today = today or timezone.localdate()
+    counts = {
+        'total_checks': Sum('count'),
+        'today_checks': Sum('count', filter=Q(date=today)),
+        'yesterday_checks': Sum('count', filter=Q(date=today - timedelta(days=1))),
+        'last_7_days': Sum('count', filter=Q(date__gt=today - timedelta(days=7))),
+        'last_30_days': Sum('count', filter=Q(date__gt=today - timedelta(days=30))),
+    }
+    for case in CASES:
+        counts[f'{case}_count'] = Sum('count', filter=Q(case=case))
+    data = DailyCaseRollup.objects.aggregate(**counts)
+    return {key: value or 0 for key, value in data.items()}
@@ -0,0 +1,41 @@
+"""
+Indexed search over FactCheckHistory for the dashboard API and the admin.
+
+- Full-text: the stored ``search_vector`` column (arabic + simple configs, GIN index),
+  queried with websearch syntax ("quoted phrases", -exclusions, OR).
+- Substring: ``query__icontains`` for partial words and names the stemmer does not
+  produce; accelerated by the pg_trgm index on UPPER(query) when it exists.
+- An IP address searches ``ip_address`` exactly.
+
+Results are annotated with ``rank`` (ts_rank, query weighted above talk).
+"""
+import ipaddress
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q, Value, FloatField
+
+
+def _is_ip(term: str) -> bool:
+    try:
+        ipaddress.ip_address(term)
+    except ValueError:
+        return False
+    return True
+
+
+def search_history(queryset, term: str):
+    term = (term or '').strip()
+    if not term:
+        return queryset
+    if _is_ip(term):
+        return queryset.filter(ip_address=term).annotate(rank=Value(1.0, output_field=FloatField()))
+
+    ts_query = (
+        SearchQuery(term, config='arabic', search_type='websearch')
+        | SearchQuery(term, config='simple', search_type='websearch')
+    )
+    return (
+        queryset
+        .filter(Q(search_vector=ts_query) | Q(query__icontains=term))
+        .annotate(rank=SearchRank(F('search_vector'), ts_query))
+    )
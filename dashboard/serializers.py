@@ -18,6 +18,7 @@ class FactCheckHistorySerializer(serializers.ModelSerializer):
             'query',
             'case',
             'case_display',
+            'case_label',
             'talk',
             'sources',
             'sources_count',
@@ -33,17 +34,22 @@ class FactCheckHistorySerializer(serializers.ModelSerializer):
             'id',
             'created_at',
             'case_display',
+            'case_label',
             'sources_count',
             'is_fake',
             'is_verified',
         ]
 
 
+TALK_EXCERPT_LENGTH = 300
+
+
 class FactCheckHistoryListSerializer(serializers.ModelSerializer):
     """
-    Lighter serializer for list views
+    Lighter serializer for list views (talk excerpt instead of the full analysis)
     """
     query_preview = serializers.SerializerMethodField()
+    talk_excerpt = serializers.SerializerMethodField()
 
     class Meta:
         model = FactCheckHistory
@@ -51,14 +57,20 @@ class FactCheckHistoryListSerializer(serializers.ModelSerializer):
             'id',
             'query_preview',
             'case',
-            'talk',
+            'talk_excerpt',
+            'created_at',
         ]
 
     def get_query_preview(self, obj):
         """Return first 100 characters of query"""
-        if len(obj.query) > 100:
-            return f"{obj.query[:100]}..."
-        return obj.query
+        return obj.query_preview
+
+    def get_talk_excerpt(self, obj):
+        """First TALK_EXCERPT_LENGTH characters of talk (annotated by the list queryset when available)"""
+        excerpt = getattr(obj, 'talk_excerpt', None)
+        if excerpt is None:
+            excerpt = (obj.talk or '')[:TALK_EXCERPT_LENGTH]
+        return excerpt
 
 
 class StatisticsSerializer(serializers.Serializer):
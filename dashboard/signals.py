@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import FactCheckHistory
+from . import rollups
+
+
+@receiver(pre_save, sender=FactCheckHistory)
+def remember_rollup_key(sender, instance, **kwargs):
+    """نحفظ (اليوم، النتيجة) القديمين قبل التعديل لنعرف ما الذي يجب نقله"""
+    instance._rollup_previous = None
+    if not instance._state.adding:
+        instance._rollup_previous = (
+            sender.objects.filter(pk=instance.pk).values_list('created_at', 'case').first()
+        )
+
+
+@receiver(post_save, sender=FactCheckHistory)
+def update_rollup_on_save(sender, instance, created, **kwargs):
+    new_key = (rollups.rollup_date(instance.created_at), instance.case)
+    previous = getattr(instance, '_rollup_previous', None)
+    if created or previous is None:
+        rollups.apply_deltas({new_key: 1})
+        return
+    old_key = (rollups.rollup_date(previous[0]), previous[1])
+    if old_key != new_key:
+        rollups.apply_deltas({old_key: -1, new_key: 1})
+
+
+@receiver(post_delete, sender=FactCheckHistory)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    rollups.apply_deltas({(rollups.rollup_date(instance.created_at), instance.case): -1})
@@ -1,3 +1,369 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import time
+import uuid
+from datetime import date, timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import DailyCaseRollup, FactCheckHistory
+from .ids import uuid7, uuid7_time
+from .verdicts import normalize_case
+from . import rollups, timeseries
+
+
+def _rollup():
+    return {(r.date, r.case): r.count for r in DailyCaseRollup.objects.exclude(count=0)}
+
+
+class DailyCaseRollupTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.today = timezone.localdate(self.now)
+
+    def _create(self, case='true', days_ago=0, **extra):
+        return FactCheckHistory.objects.create(
+            query='زلزال يضرب تركيا', case=case, talk='...',
+            created_at=self.now - timedelta(days=days_ago), **extra
+        )
+
+    def test_signals_keep_rollup_in_sync(self):
+        first = self._create('true')
+        self._create('true')
+        old = self._create('false', days_ago=3)
+        self.assertEqual(_rollup(), {
+            (self.today, 'true'): 2,
+            (self.today - timedelta(days=3), 'false'): 1,
+        })
+
+        first.case = 'mixed'
+        first.save()
+        old.delete()
+        self.assertEqual(_rollup(), {(self.today, 'true'): 1, (self.today, 'mixed'): 1})
+
+    def test_bulk_paths_and_backfill_agree(self):
+        objs = [
+            FactCheckHistory(query='q', case='true', talk='...', created_at=self.now - timedelta(days=i % 3))
+            for i in range(6)
+        ]
+        FactCheckHistory.objects.bulk_create(objs)
+        rollups.record_created(objs)
+        start, end = rollups.day_bounds(self.today)
+        queryset = FactCheckHistory.objects.filter(created_at__gte=start, created_at__lt=end)
+        rollups.move_case(queryset, 'false')
+        queryset.update(case='false')
+        incremental = _rollup()
+
+        DailyCaseRollup.objects.all().delete()
+        call_command('backfill_case_rollup', stdout=open('/dev/null', 'w'))
+        self.assertEqual(_rollup(), incremental)
+        self.assertEqual(incremental[(self.today, 'false')], 2)
+
+    def test_statistics_served_from_rollup(self):
+        for case, days_ago in [('true', 0), ('true', 1), ('false', 5), ('mixed', 20), ('unverified', 40)]:
+            self._create(case, days_ago=days_ago)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/dashboard/fact-checks/statistics/')
+        data = response.json()
+        self.assertEqual(data['total_checks'], 5)
+        self.assertEqual(data['today_checks'], 1)
+        self.assertEqual(data['yesterday_checks'], 1)
+        self.assertEqual(data['last_7_days'], 3)
+        self.assertEqual(data['last_30_days'], 4)
+        self.assertEqual(data['true_count'], 2)
+        self.assertEqual(data['true_percentage'], 40.0)
+        self.assertEqual(len(data['top_queries']), 5)
+        self.assertEqual(len(data['recent_checks']), 5)
+
+    def test_delete_all_clears_rollup(self):
+        self._create('true')
+        self._create('false')
+        response = self.client.delete('/dashboard/fact-checks/delete_all/')
+        self.assertEqual(response.json()['deleted_count'], 2)
+        self.assertFalse(FactCheckHistory.objects.exists())
+        self.assertEqual(rollups.summary(self.today)['total_checks'], 0)
+
+
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        for i, case in enumerate(['true', 'false', 'true']):
+            FactCheckHistory.objects.create(
+                query=f'خبر {i}', case=case, talk='تحليل ' * 100,
+                sources=[{'title': 't', 'url': 'https://a.example'}] * (i + 1),
+                created_at=now - timedelta(days=i),
+            )
+
+    def _body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_is_streamed_with_filters(self):
+        response = self.client.get('/dashboard/fact-checks/export/', {'case': 'true'})
+        self.assertTrue(response.streaming)
+        lines = self._body(response).decode('utf-8').splitlines()
+        self.assertTrue(lines[0].startswith('\ufeffID,'))
+        self.assertEqual(len(lines), 3)
+        row = next(csv.reader([lines[1]]))
+        self.assertEqual(row[2], 'حقيقي')
+        self.assertEqual(len(row[3]), 200)
+        self.assertEqual(row[4], '1')
+
+    def test_gzip_jsonl(self):
+        response = self.client.get('/dashboard/fact-checks/export/', {'export_format': 'jsonl', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('fact_checks.jsonl.gz', response['Content-Disposition'])
+        records = [json.loads(line) for line in gzip.decompress(self._body(response)).decode('utf-8').splitlines()]
+        self.assertEqual([r['query'] for r in records], ['خبر 0', 'خبر 1', 'خبر 2'])
+        self.assertEqual(len(records[2]['sources']), 3)
+
+    def test_unknown_format_rejected(self):
+        response = self.client.get('/dashboard/fact-checks/export/', {'export_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_asgi_export_streams_from_an_async_iterator(self):
+        # AsyncClient يمر عبر ASGIHandler: لا يُجمع الملف بـ sync_to_async(list)
+        response = await self.async_client.get('/dashboard/fact-checks/export/', {'export_format': 'jsonl', 'gzip': '1'})
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        records = [json.loads(line) for line in gzip.decompress(body).decode('utf-8').splitlines()]
+        self.assertEqual([r['query'] for r in records], ['خبر 0', 'خبر 1', 'خبر 2'])
+
+    def test_wsgi_export_stays_synchronous(self):
+        response = self.client.get('/dashboard/fact-checks/export/')
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(self._body(response).decode('utf-8').splitlines()), 4)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        base = timezone.now()
+        # created_at مكرر عمداً لاختبار كسر التعادل بالمعرّف
+        for i in range(7):
+            FactCheckHistory.objects.create(
+                query=f'خبر {i}', case='true', talk='تحليل ' * 200,
+                created_at=base - timedelta(minutes=i // 2),
+            )
+
+    def test_walks_all_rows_once_in_order(self):
+        seen = []
+        url = '/dashboard/fact-checks/?page_size=3'
+        while url:
+            with self.assertNumQueries(1):
+                body = self.client.get(url).json()
+            seen.extend(body['results'])
+            url = body['next']
+        expected = list(FactCheckHistory.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in seen], [str(pk) for pk in expected])
+        self.assertEqual(len(seen[0]['talk_excerpt']), 300)
+        self.assertNotIn('talk', seen[0])
+
+    def test_filters_apply_and_bad_cursor_is_rejected(self):
+        body = self.client.get('/dashboard/fact-checks/', {'case': 'false'}).json()
+        self.assertEqual(body['results'], [])
+        self.assertIsNone(body['next'])
+        self.assertEqual(self.client.get('/dashboard/fact-checks/', {'cursor': 'nope'}).status_code, 404)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.in_query = FactCheckHistory.objects.create(
+            query='اللقاحات تسبب العقم في تركيا', case='false', talk='لا توجد مصادر', created_at=now,
+        )
+        self.in_talk = FactCheckHistory.objects.create(
+            query='خبر عن الاقتصاد', case='true', talk='لا علاقة بين اللقاح والعقم',
+            created_at=now - timedelta(minutes=1),
+        )
+        FactCheckHistory.objects.create(
+            query='زلزال يضرب المغرب', case='true', talk='...', ip_address='10.0.0.7',
+            created_at=now - timedelta(minutes=2),
+        )
+
+    def _search(self, term):
+        return [row['id'] for row in self.client.get('/dashboard/fact-checks/', {'search': term}).json()['results']]
+
+    def test_stemmed_match_ranks_query_above_talk(self):
+        self.assertEqual(self._search('لقاح'), [str(self.in_query.id), str(self.in_talk.id)])
+
+    def test_partial_word_and_ip(self):
+        self.assertEqual(self._search('ترك'), [str(self.in_query.id)])
+        self.assertEqual(len(self._search('10.0.0.7')), 1)
+        self.assertEqual(self._search('لقاح -تركيا'), [str(self.in_talk.id)])
+
+    def test_search_vector_is_not_loaded(self):
+        obj = FactCheckHistory.objects.get(pk=self.in_query.pk)
+        self.assertIn('search_vector', obj.get_deferred_fields())
+
+
+class ListQueryTests(TestCase):
+    def setUp(self):
+        self.obj = FactCheckHistory.objects.create(
+            query='خبر ' * 60, case='true', talk='تحليل ' * 500, news_article='مقال ' * 500,
+            sources=[{'title': 't', 'url': 'https://a.example'}] * 3,
+        )
+
+    def test_for_list_skips_heavy_columns(self):
+        row = FactCheckHistory.objects.for_list().get()
+        self.assertTrue({'query', 'talk', 'sources', 'news_article', 'x_tweet', 'user_agent'} <= row.get_deferred_fields())
+        with self.assertNumQueries(0):
+            self.assertEqual(row.sources_count, 3)
+            self.assertEqual(row.query_preview, self.obj.query_preview)
+        self.assertEqual(len(row.query_preview), 103)
+
+    def test_admin_changelist_uses_previews(self):
+        from django.contrib.auth import get_user_model
+        admin_user = get_user_model().objects.create(username='admin', email='admin@example.com', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        response = self.client.get('/admin/dashboard/factcheckhistory/')
+        self.assertEqual(response.status_code, 200)
+        row = response.context['cl'].result_list[0]
+        self.assertIn('talk', row.get_deferred_fields())
+        self.assertContains(response, '<span style="font-weight: bold;">3</span> مصدر', html=False)
+
+
+class VerdictNormalizationTests(TestCase):
+    def test_localized_labels_map_to_choices(self):
+        self.assertEqual(normalize_case('حقيقي'), 'true')
+        self.assertEqual(normalize_case(' "Vrai". '), 'true')
+        self.assertEqual(normalize_case('غير مؤكد'), 'mixed')
+        self.assertEqual(normalize_case('NEJISTÉ'), 'mixed')
+        self.assertEqual(normalize_case('كاذب'), 'false')
+        self.assertEqual(normalize_case('unverified'), 'unverified')
+        self.assertEqual(normalize_case('???'), 'unverified')
+        self.assertEqual(normalize_case(None), 'unverified')
+
+    def test_save_stores_enum_and_label(self):
+        saved = FactCheckHistory.objects.create(query='q', case='Vrai', talk='...')
+        FactCheckHistory.objects.create(query='q', case='غير مؤكد', talk='...')
+        rows = set(FactCheckHistory.objects.values_list('case', 'case_label'))
+        self.assertEqual(rows, {('true', 'Vrai'), ('mixed', 'غير مؤكد')})
+
+        saved.case = 'false'
+        saved.save(update_fields=['case'])
+        saved.refresh_from_db()
+        self.assertEqual((saved.case, saved.case_label), ('false', 'Vrai'))
+
+        stats = rollups.summary(timezone.localdate())
+        self.assertEqual((stats['false_count'], stats['mixed_count'], stats['total_checks']), (1, 1, 2))
+
+
+class TimeOrderedIdTests(SimpleTestCase):
+    def test_uuid7_layout_and_order(self):
+        before = time.time()
+        ids = [uuid7() for _ in range(5000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(value.version == 7 and value.variant == uuid.RFC_4122 for value in ids))
+        self.assertAlmostEqual(uuid7_time(ids[0]), before, delta=1)
+
+    def test_counter_overflow_stays_monotonic(self):
+        with patch('dashboard.ids.time.time_ns', return_value=1_700_000_000_000_000_000):
+            ids = [uuid7() for _ in range(10000)]
+        self.assertEqual(ids, sorted(ids))
+
+
+class QueryPlanTests(TestCase):
+    """
+    The SQL each dashboard endpoint actually runs, EXPLAINed with seq scans
+    disabled: the expected index must be usable (a cast such as
+    created_at::date or a missing composite index would fail these).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        FactCheckHistory.objects.bulk_create([
+            FactCheckHistory(
+                # 'false' نادر كما في الواقع (الخط لا يعيد إلا حقيقي/غير مؤكد)
+                query=f'خبر {i}', case='false' if i % 25 == 0 else ('true' if i % 2 else 'mixed'), talk='...',
+                ip_address=f'10.0.{i % 7}.{i % 200}' if i % 3 else None,
+                created_at=now - timedelta(hours=i),
+            )
+            for i in range(500)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE dashboard_factcheckhistory')
+
+    def _plan(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + queries.captured_queries[-1]['sql'])
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def test_case_with_date_range_uses_composite_index(self):
+        plan = self._plan('/dashboard/fact-checks/', {'case': 'false', 'start_date': '2026-01-01', 'end_date': '2026-12-31'})
+        self.assertIn('factcheck_case_created', plan)
+
+    def test_ip_with_time_uses_partial_composite_index(self):
+        plan = self._plan('/dashboard/fact-checks/', {'ip_address': '10.0.1.1', 'start_date': '2026-01-01'})
+        self.assertIn('factcheck_ip_created', plan)
+        plan = self._plan('/dashboard/fact-checks/', {'search': '10.0.1.1'})
+        self.assertIn('factcheck_ip_created', plan)
+
+    def test_day_filters_are_half_open_ranges(self):
+        today = timezone.localdate().isoformat()
+        plan = self._plan('/dashboard/fact-checks/export/', {'start_date': today, 'end_date': today})
+        self.assertRegex(plan, r'Index (Only )?Scan (Backward )?using \S*created_at')
+        self.assertNotIn('::date', plan)
+
+    def test_bad_date_is_rejected(self):
+        response = self.client.get('/dashboard/fact-checks/', {'start_date': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TimeseriesTests(TestCase):
+    url = '/dashboard/fact-checks/timeseries/'
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        noon = rollups.day_bounds(self.today)[0] + timedelta(hours=12)
+        with self.captureOnCommitCallbacks(execute=True):
+            for case, days_ago, hour in [('true', 0, 0), ('true', 0, 0), ('false', 0, 3), ('mixed', 1, 0), ('true', 9, 0)]:
+                FactCheckHistory.objects.create(
+                    query='q', case=case, talk='...', created_at=noon - timedelta(days=days_ago) + timedelta(hours=hour),
+                )
+
+    def test_day_and_week_buckets_come_from_rollup(self):
+        body = self.client.get(self.url, {'bucket': 'day'}).json()
+        self.assertEqual(len(body['series']), 30)
+        last = body['series'][-1]
+        self.assertEqual((last['bucket'], last['true'], last['false'], last['total']), (self.today.isoformat(), 2, 1, 3))
+        self.assertEqual(body['series'][-2]['mixed'], 1)
+
+        body = self.client.get(self.url, {'bucket': 'week', 'start': (self.today - timedelta(days=13)).isoformat()}).json()
+        self.assertEqual(sum(point['total'] for point in body['series']), 5)
+        self.assertTrue(all(date.fromisoformat(point['bucket']).weekday() == 0 for point in body['series']))
+
+    def test_hour_bucket(self):
+        today = self.today.isoformat()
+        series = self.client.get(self.url, {'bucket': 'hour', 'start': today, 'end': today}).json()['series']
+        self.assertEqual(len(series), 24)
+        self.assertEqual([(point['bucket'][11:13], point['total']) for point in series if point['total']], [('12', 2), ('15', 1)])
+
+    def test_cached_until_next_insert(self):
+        with patch('dashboard.timeseries.build_series', wraps=timeseries.build_series) as build:
+            self.client.get(self.url)
+            self.client.get(self.url)
+            self.assertEqual(build.call_count, 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                FactCheckHistory.objects.create(query='q', case='false', talk='...')
+            body = self.client.get(self.url).json()
+            self.assertEqual(build.call_count, 2)
+        self.assertEqual(body['series'][-1]['false'], 2)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url, {'bucket': 'minute'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'bucket': 'hour', 'start': '2020-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': '2026-02-01', 'end': '2026-01-01'}).status_code, 400)
@@ -0,0 +1,124 @@
+"""
+Per-bucket counts by case for dashboard charts.
+
+- day / week: read from DailyCaseRollup (one grouped query over at most
+  days x 4 rows, whatever the history size);
+- hour: one ``TruncHour``-grouped query over FactCheckHistory, restricted to a
+  half-open created_at range (created_at index).
+
+Results are cached in the shared cache under the rollup change stamp
+(rollups.changes_stamp), so any insert/update/delete invalidates them on every
+worker. Empty buckets are filled with zeros so charts get a continuous axis.
+"""
+import os
+from datetime import date, timedelta, timezone as dt_timezone
+from typing import Dict, List
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour, TruncWeek
+from django.utils import timezone
+
+from .models import DailyCaseRollup, FactCheckHistory
+from . import rollups
+
+BUCKETS = ('hour', 'day', 'week')
+TIMESERIES_CACHE_TTL = int(os.getenv("DASHBOARD_TIMESERIES_CACHE_TTL", "300"))
+TIMESERIES_MAX_BUCKETS = int(os.getenv("DASHBOARD_TIMESERIES_MAX_BUCKETS", "2000"))
+
+# المدى الافتراضي لكل نوع (بالأيام، شاملاً اليوم)
+DEFAULT_SPAN_DAYS = {'hour': 2, 'day': 30, 'week': 84}
+
+
+class TimeseriesRangeError(ValueError):
+    """Raised when the requested range is inverted or has too many buckets"""
+
+
+def default_range(bucket: str, today: date | None = None):
+    today = today or timezone.localdate()
+    return today - timedelta(days=DEFAULT_SPAN_DAYS[bucket] - 1), today
+
+
+def _bucket_keys(bucket: str, start: date, end: date) -> List:
+    if bucket == 'hour':
+        # نخطو بالساعات في UTC حتى لا يتكرر أو يضيع أي bucket عند تغيير التوقيت الصيفي
+        first, last = (moment.astimezone(dt_timezone.utc) for moment in (
+            rollups.day_bounds(start)[0], rollups.day_bounds(end)[1]
+        ))
+        return [first + timedelta(hours=i) for i in range(int((last - first).total_seconds() // 3600))]
+    if bucket == 'week':
+        start = start - timedelta(days=start.weekday())
+        return [start + timedelta(weeks=i) for i in range((end - start).days // 7 + 1)]
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def _grouped_rows(bucket: str, start: date, end: date):
+    if bucket == 'hour':
+        first, last = rollups.day_bounds(start)[0], rollups.day_bounds(end)[1]
+        return (
+            FactCheckHistory.objects
+            .filter(created_at__gte=first, created_at__lt=last)
+            .annotate(bucket=TruncHour('created_at'))
+            .values('bucket', 'case')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+    truncate = TruncWeek('date') if bucket == 'week' else F('date')
+    return (
+        DailyCaseRollup.objects
+        .filter(date__gte=start, date__lte=end)
+        .annotate(bucket=truncate)
+        .values('bucket', 'case')
+        .annotate(n=Sum('count'))
+        .order_by()
+    )
+
+
+def _label(bucket: str, key) -> str:
+    return timezone.localtime(key).isoformat() if bucket == 'hour' else key.isoformat()
+
+
+def build_series(bucket: str, start: date, end: date) -> Dict:
+    if end < start:
+        raise TimeseriesRangeError('end must not be before start')
+    keys = _bucket_keys(bucket, start, end)
+    if len(keys) > TIMESERIES_MAX_BUCKETS:
+        raise TimeseriesRangeError(f'range too large: {len(keys)} {bucket} buckets (max {TIMESERIES_MAX_BUCKETS})')
+
+    counts = {key: dict.fromkeys(rollups.CASES, 0) for key in keys}
+    for row in _grouped_rows(bucket, start, end):
+        key = row['bucket']
+        if bucket == 'hour':
+            key = key.astimezone(dt_timezone.utc)
+        # TruncWeek يعيد يوم الاثنين، ومفاتيح الأسابيع تبدأ من اثنين أسبوع start
+        if key in counts and row['case'] in counts[key]:
+            counts[key][row['case']] += row['n'] or 0
+
+    return {
+        'bucket': bucket,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'cases': rollups.CASES,
+        'series': [
+            {'bucket': _label(bucket, key), **values, 'total': sum(values.values())}
+            for key, values in counts.items()
+        ],
+    }
+
+
+def cached_series(bucket: str, start: date, end: date) -> Dict:
+    stamp = rollups.changes_stamp()
+    if stamp is None:
+        return build_series(bucket, start, end)
+    key = f"dashboard:timeseries:{stamp}:{bucket}:{start.isoformat()}:{end.isoformat()}"
+    cache = rollups.dashboard_cache()
+    try:
+        data = cache.get(key)
+    except Exception:
+        data = None
+    if data is None:
+        data = build_series(bucket, start, end)
+        try:
+            cache.set(key, data, TIMESERIES_CACHE_TTL)
+        except Exception as e:
+            print(f"⚠️ Could not cache timeseries: {e}")
+    return data
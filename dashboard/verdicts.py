@@ -0,0 +1,50 @@
+"""
+Mapping of the localized verdicts returned by the pipeline ("حقيقي", "True",
+"Vrai", "غير مؤكد", ...) onto FactCheckHistory.CASE_CHOICES.
+
+``case`` always stores the enum value (so the ``case`` index serves every
+count and filter); the verdict as the model wrote it is kept in ``case_label``.
+
+No model imports here: migration 0005 uses ``normalize_case`` as well.
+"""
+import re
+
+# القيم الأساسية تُطابق نفسها
+CASE_LABELS = {
+    'true': {
+        'true', 'حقيقي', 'صحيح', 'vrai', 'verdadero', 'verdadeiro', 'pravda', 'pravdivé',
+        'wahr', 'richtig', 'doğru', 'gerçek', 'правда', 'верно', 'vero',
+    },
+    'false': {
+        'false', 'كاذب', 'خاطئ', 'مزيف', 'faux', 'falso', 'nepravda', 'nepravdivé',
+        'falsch', 'yanlış', 'sahte', 'ложь', 'неверно',
+    },
+    # التسمية المعروضة لـ mixed في CASE_CHOICES هي "غير مؤكد/مختلط"
+    'mixed': {
+        'mixed', 'غير مؤكد/مختلط', 'غير مؤكد', 'مختلط', 'uncertain', 'incertain', 'incierto',
+        'incerto', 'nejisté', 'nejiste', 'nejistá', 'unsicher', 'belirsiz',
+        'неопределенно', 'неопределённо', 'неопределенный', 'mixte', 'mixto', 'smíšené',
+        'gemischt', 'karışık', 'смешанно',
+    },
+    'unverified': {
+        'unverified', 'غير موثق', 'non vérifié', 'no verificado', 'neověřeno',
+        'nicht verifiziert', 'doğrulanmamış', 'не проверено',
+    },
+}
+
+DEFAULT_CASE = 'unverified'
+
+_LOOKUP = {label: case for case, labels in CASE_LABELS.items() for label in labels}
+_STRIP_RE = re.compile(r'^[\s"\'«»“”.!:،]+|[\s"\'«»“”.!:،]+$')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _key(label: str) -> str:
+    return _SPACE_RE.sub(' ', _STRIP_RE.sub('', label)).casefold()
+
+
+def normalize_case(label) -> str:
+    """Localized verdict → 'true' / 'false' / 'mixed' / 'unverified' (unknown → 'unverified')"""
+    if not label:
+        return DEFAULT_CASE
+    return _LOOKUP.get(_key(str(label)), DEFAULT_CASE)
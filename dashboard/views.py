@@ -1,17 +1,45 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser, AllowAny
-from django.db.models import Count, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection, transaction
+from django.db.models.functions import Substr
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date, parse_datetime
 
 from .models import FactCheckHistory
+from . import rollups
+from .timeseries import BUCKETS, TimeseriesRangeError, cached_series, default_range
+from .exports import EXPORT_FORMATS, stream_export
 from .serializers import (
     FactCheckHistorySerializer,
     FactCheckHistoryListSerializer,
-    StatisticsSerializer
+    StatisticsSerializer,
+    TALK_EXCERPT_LENGTH,
 )
+from .pagination import KeysetPagination
+from .search import search_history
+
+
+def _parse_bound(name, value):
+    """'YYYY-MM-DD' → بداية اليوم، أو datetime كامل كما هو"""
+    day = parse_date(value)
+    if day is not None:
+        return rollups.day_bounds(day)[0]
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValidationError({name: 'Expected YYYY-MM-DD or an ISO 8601 datetime'})
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def _parse_day(name, value):
+    """'YYYY-MM-DD' (أو datetime كامل) → اليوم بتوقيت المشروع"""
+    day = parse_date(value)
+    if day is None:
+        day = timezone.localdate(_parse_bound(name, value))
+    return day
 
 
 class FactCheckHistoryViewSet(viewsets.ModelViewSet):
@@ -21,7 +49,7 @@ class FactCheckHistoryViewSet(viewsets.ModelViewSet):
     """
     queryset = FactCheckHistory.objects.all()
     permission_classes = [AllowAny]
-    pagination_class = None  # Disable pagination
+    pagination_class = KeysetPagination  # keyset on (created_at, id), see pagination.py
     filterset_fields = ['case', 'created_at']
     search_fields = ['query', 'talk', 'ip_address']
     ordering_fields = ['created_at', 'case']
@@ -40,19 +68,38 @@ class FactCheckHistoryViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
 
         # Filter by date range
+        # تاريخ بدون وقت → مدى نصف مفتوح [بداية start_date، بداية اليوم التالي لـ end_date)
         start_date = self.request.query_params.get('start_date', None)
         end_date = self.request.query_params.get('end_date', None)
 
         if start_date:
-            queryset = queryset.filter(created_at__gte=start_date)
+            queryset = queryset.filter(created_at__gte=_parse_bound('start_date', start_date))
         if end_date:
-            queryset = queryset.filter(created_at__lte=end_date)
+            day = parse_date(end_date)
+            if day is not None:
+                queryset = queryset.filter(created_at__lt=rollups.day_bounds(day)[1])
+            else:
+                queryset = queryset.filter(created_at__lte=_parse_bound('end_date', end_date))
+
+        # Filter by IP (فهرس (ip_address, created_at))
+        ip_address = self.request.query_params.get('ip_address', None)
+        if ip_address:
+            queryset = queryset.filter(ip_address=ip_address)
 
         # Filter by case
         case = self.request.query_params.get('case', None)
         if case:
             queryset = queryset.filter(case=case)
 
+        # بحث نصي مفهرس ومرتب حسب الصلة (انظر search.py)
+        search = self.request.query_params.get('search', None)
+        if search:
+            queryset = search_history(queryset, search)
+
+        if self.action == 'list':
+            # القائمة لا تحتاج الحقول الكبيرة؛ المعاينات تُقتطع في قاعدة البيانات
+            queryset = queryset.for_list().annotate(talk_excerpt=Substr('talk', 1, TALK_EXCERPT_LENGTH))
+
         return queryset
 
     @action(detail=False, methods=['get'])
@@ -61,32 +108,9 @@ class FactCheckHistoryViewSet(viewsets.ModelViewSet):
         Get comprehensive statistics
         Endpoint: /api/admin/fact-checks/statistics/
         """
-        now = timezone.now()
-        today = now.date()
-        yesterday = today - timedelta(days=1)
-
-        # Count checks
-        total_checks = FactCheckHistory.objects.count()
-        today_checks = FactCheckHistory.objects.filter(
-            created_at__date=today
-        ).count()
-        yesterday_checks = FactCheckHistory.objects.filter(
-            created_at__date=yesterday
-        ).count()
-        last_7_days = FactCheckHistory.objects.filter(
-            created_at__gte=now - timedelta(days=7)
-        ).count()
-        last_30_days = FactCheckHistory.objects.filter(
-            created_at__gte=now - timedelta(days=30)
-        ).count()
-
-        # Count by case
-        stats = FactCheckHistory.objects.aggregate(
-            true_count=Count('id', filter=Q(case='true')),
-            false_count=Count('id', filter=Q(case='false')),
-            mixed_count=Count('id', filter=Q(case='mixed')),
-            unverified_count=Count('id', filter=Q(case='unverified')),
-        )
+        # كل العدّادات من جدول الملخص اليومي في استعلام واحد
+        stats = rollups.summary(timezone.localdate())
+        total_checks = stats['total_checks']
 
         # Calculate percentages
         true_percentage = (stats['true_count'] / total_checks * 100) if total_checks > 0 else 0
@@ -94,20 +118,21 @@ class FactCheckHistoryViewSet(viewsets.ModelViewSet):
         mixed_percentage = (stats['mixed_count'] / total_checks * 100) if total_checks > 0 else 0
         unverified_percentage = (stats['unverified_count'] / total_checks * 100) if total_checks > 0 else 0
 
-        # Top queries (most recent 10)
-        top_queries = FactCheckHistory.objects.values(
-            'query', 'case', 'created_at'
-        ).order_by('-created_at')[:10]
-
-        # Recent checks (last 5)
-        recent_checks = FactCheckHistory.objects.all().order_by('-created_at')[:5]
+        # Most recent 10 checks: top_queries uses all of them, recent_checks the first 5
+        recent = list(
+            FactCheckHistory.objects.for_list('query')
+            .annotate(talk_excerpt=Substr('talk', 1, TALK_EXCERPT_LENGTH))
+            .order_by('-created_at')[:10]
+        )
+        top_queries = [{'query': obj.query, 'case': obj.case, 'created_at': obj.created_at} for obj in recent]
+        recent_checks = recent[:5]
 
         data = {
             'total_checks': total_checks,
-            'today_checks': today_checks,
-            'yesterday_checks': yesterday_checks,
-            'last_7_days': last_7_days,
-            'last_30_days': last_30_days,
+            'today_checks': stats['today_checks'],
+            'yesterday_checks': stats['yesterday_checks'],
+            'last_7_days': stats['last_7_days'],
+            'last_30_days': stats['last_30_days'],
             'true_count': stats['true_count'],
             'false_count': stats['false_count'],
             'mixed_count': stats['mixed_count'],
@@ -116,41 +141,57 @@ class FactCheckHistoryViewSet(viewsets.ModelViewSet):
             'false_percentage': round(false_percentage, 2),
             'mixed_percentage': round(mixed_percentage, 2),
             'unverified_percentage': round(unverified_percentage, 2),
-            'top_queries': list(top_queries),
-            'recent_checks': FactCheckHistoryListSerializer(recent_checks, many=True).data,
+            'top_queries': top_queries,
+            # StatisticsSerializer serializes these itself (passing .data here made it re-serialize dicts)
+            'recent_checks': recent_checks,
         }
 
         serializer = StatisticsSerializer(data)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
-    def export(self, request):
+    def timeseries(self, request):
         """
-        Export fact checks to CSV
-        Endpoint: /api/admin/fact-checks/export/
+        Per-bucket counts by case for charts
+        Endpoint: /api/admin/fact-checks/timeseries/?bucket=hour|day|week&start=YYYY-MM-DD&end=YYYY-MM-DD
+        start/end are inclusive days (defaults: last 2 days / 30 days / 12 weeks).
         """
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-        response['Content-Disposition'] = 'attachment; filename="fact_checks.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['ID', 'النص', 'النتيجة', 'التحليل', 'عدد المصادر', 'IP', 'التاريخ'])
-
-        queryset = self.get_queryset()
-        for obj in queryset:
-            writer.writerow([
-                obj.id,
-                obj.query,
-                obj.get_case_display(),
-                obj.talk[:200],  # First 200 chars of analysis
-                obj.sources_count,
-                obj.ip_address,
-                obj.created_at.strftime('%Y-%m-%d %H:%M')
-            ])
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in BUCKETS:
+            return Response(
+                {'error': f'bucket must be one of: {", ".join(BUCKETS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start, end = default_range(bucket)
+        if request.query_params.get('start'):
+            start = _parse_day('start', request.query_params['start'])
+        if request.query_params.get('end'):
+            end = _parse_day('end', request.query_params['end'])
+
+        try:
+            data = cached_series(bucket, start, end)
+        except TimeseriesRangeError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
 
-        return response
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream fact checks as CSV (default) or JSONL, optionally gzip-compressed
+        Endpoint: /api/admin/fact-checks/export/?export_format=csv|jsonl&gzip=1
+        Honors the start_date / end_date / case filters.
+        ("format" is reserved by DRF for renderer selection, hence export_format)
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'export_format must be one of: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        # تحت ASGI: مولّد غير متزامن فوق aiterator() وإلا جمّع Django الملف كاملاً في الذاكرة
+        asynchronous = isinstance(request._request, ASGIRequest)
+        return stream_export(self.get_queryset(), export_format, compress, asynchronous)
 
     @action(detail=True, methods=['patch'])
     def update_case(self, request, pk=None):
@@ -179,8 +220,12 @@ class FactCheckHistoryViewSet(viewsets.ModelViewSet):
         Delete all fact check history records
         Endpoint: /api/admin/fact-checks/delete_all/
         """
-        count = FactCheckHistory.objects.count()
-        FactCheckHistory.objects.all().delete()
+        # DELETE مباشر بدل QuerySet.delete() الذي يجلب كل الصفوف لإرسال إشارات الحذف
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {connection.ops.quote_name(FactCheckHistory._meta.db_table)}")
+                count = cursor.rowcount
+            rollups.clear()
 
         return Response(
             {
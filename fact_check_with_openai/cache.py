@@ -0,0 +1,215 @@
+"""
+Result caching for the fact-check pipeline.
+
+Two tiers:
+- an in-process LRU with per-entry TTL (answers in microseconds, per worker)
+- a shared Django cache alias (``FACT_CACHE_SHARED_ALIAS``, "shared" by default)
+  so every gunicorn/uvicorn worker benefits from a claim checked by another one.
+
+Keys are built from a normalized form of the claim, so trivial variations of the
+same rumor (diacritics, alef/yaa forms, tatweel, extra spaces) hit the same entry.
+"""
+import os
+import re
+import copy
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+from . import metrics
+
+RESULT_CACHE_TTL = int(os.getenv("FACT_CACHE_TTL", "3600"))
+RESULT_CACHE_NEGATIVE_TTL = int(os.getenv("FACT_CACHE_NEGATIVE_TTL", "600"))  # حكم "لا نتائج بحث"
+RESULT_CACHE_MAXSIZE = int(os.getenv("FACT_CACHE_MAXSIZE", "1024"))
+SHARED_CACHE_ALIAS = os.getenv("FACT_CACHE_SHARED_ALIAS", "shared")
+
+# تشكيل عربي + علامات قرآنية + الألف الخنجرية
+_ARABIC_DIACRITICS_RE = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
+_TATWEEL = "\u0640"
+_ALEF_VARIANTS_RE = re.compile(r"[\u0622\u0623\u0625\u0671]")  # آ أ إ ٱ → ا
+_YAA_VARIANTS_RE = re.compile(r"[\u0649\u06CC]")  # ى ی → ي
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_claim(text: str) -> str:
+    """
+    توحيد شكل الادعاء قبل استخدامه كمفتاح:
+    إزالة التشكيل والتطويل، توحيد أشكال الألف والياء، توحيد المسافات وحالة الأحرف
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _ARABIC_DIACRITICS_RE.sub("", text)
+    text = text.replace(_TATWEEL, "")
+    text = _ALEF_VARIANTS_RE.sub("ا", text)
+    text = _YAA_VARIANTS_RE.sub("ي", text)
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text.casefold()
+
+
+def make_result_key(claim_text: str, k_sources: int = 5, generate_news: bool = False,
+                    preserve_sources: bool = False, generate_tweet: bool = False) -> str:
+    """Cache key for a pipeline result: normalized claim + the request flags that change the output"""
+    raw = json.dumps(
+        [normalize_claim(claim_text), int(k_sources), bool(generate_news), bool(preserve_sources), bool(generate_tweet)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    In-process LRU cache with per-entry expiry.
+    Thread-safe so it can be shared by sync views, async views and background threads.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def get_shared_backend(alias: str = SHARED_CACHE_ALIAS):
+    """Django cache backend for ``alias``, or None outside Django / when the alias is not configured"""
+    if not alias:
+        return None
+    try:
+        from django.conf import settings
+        if not settings.configured or alias not in getattr(settings, "CACHES", {}):
+            return None
+        from django.core.cache import caches
+        return caches[alias]
+    except Exception:
+        return None
+
+
+class TieredCache:
+    """
+    In-process TTLCache in front of a shared Django cache alias.
+    The shared tier is optional: outside Django, with an empty alias, or while the
+    backend is failing, the cache silently degrades to the local tier only.
+    """
+
+    # بعد فشل الطبقة المشتركة نتوقف عن استخدامها لهذه المدة (ثوانٍ)
+    SHARED_RETRY_AFTER = 60
+
+    def __init__(self, namespace: str, maxsize: int, ttl: float, shared_alias: str = SHARED_CACHE_ALIAS):
+        self.namespace = namespace
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared_alias = shared_alias
+        self.shared_hits = 0
+        self._shared_disabled_until = 0.0
+
+    def _shared_backend(self):
+        if time.monotonic() < self._shared_disabled_until:
+            return None
+        return get_shared_backend(self.shared_alias)
+
+    def _shared_failed(self, error: Exception) -> None:
+        print(f"⚠️ Shared cache '{self.shared_alias}' unavailable, using local tier only: {error}")
+        self._shared_disabled_until = time.monotonic() + self.SHARED_RETRY_AFTER
+
+    def _shared_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def aget(self, key: str) -> Any:
+        value = self.local.get(key)
+        if value is not None:
+            return copy.deepcopy(value)
+
+        backend = self._shared_backend()
+        if backend is None:
+            return None
+        try:
+            value = await backend.aget(self._shared_key(key))
+        except Exception as e:
+            self._shared_failed(e)
+            return None
+        if value is None:
+            return None
+        # الطبقة المشتركة تحفظ (وقت الانتهاء, القيمة) حتى لا تعيش النسخة المحلية أطول من الأصل
+        if isinstance(value, tuple):
+            expires_at, value = value
+            ttl = expires_at - time.time()
+            if ttl <= 0:
+                return None
+        else:
+            ttl = None
+        self.shared_hits += 1
+        self.local.set(key, value, ttl)
+        return copy.deepcopy(value)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        value = copy.deepcopy(value)
+        self.local.set(key, value, ttl)
+
+        backend = self._shared_backend()
+        if backend is None:
+            return
+        ttl = self.local.ttl if ttl is None else ttl
+        try:
+            await backend.aset(self._shared_key(key), (time.time() + ttl, value), timeout=ttl)
+        except Exception as e:
+            self._shared_failed(e)
+
+    def stats(self) -> dict:
+        data = self.local.stats()
+        data["shared_hits"] = self.shared_hits
+        data["shared_alias"] = self.shared_alias or None
+        return data
+
+
+# كاش نتائج الفحص الكاملة (check_fact_simple_async)
+result_cache = TieredCache("fact_result", maxsize=RESULT_CACHE_MAXSIZE, ttl=RESULT_CACHE_TTL)
+metrics.register_gauge("result_cache", lambda: result_cache.stats())
@@ -0,0 +1,176 @@
+"""
+Evidence context for the verdict prompt.
+
+``build_context(results)`` turns the merged search results into the "السياق"
+block of the prompt:
+
+1. URLs are canonicalized (scheme/host case, www./m./mobile./amp. hosts, AMP
+   paths, utm_*/fbclid/... parameters, fragments) and exact duplicates merged;
+2. near-duplicate snippets — the same wire story syndicated by several sites —
+   are detected with MinHash over word 3-shingles and folded into the first
+   copy, whose entry lists the other URLs ("نسخ أخرى") so no source is lost;
+3. entries are diversified by domain: each domain's first EVIDENCE_MAX_PER_DOMAIN
+   entries keep their rank order, its later ones move behind every other domain;
+4. entries are packed in that order until EVIDENCE_TOKEN_BUDGET (estimated
+   tokens) is reached; the first entry is always kept.
+"""
+import os
+import random
+import re
+import zlib
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .cache import normalize_claim
+
+EVIDENCE_TOKEN_BUDGET = int(os.getenv("EVIDENCE_TOKEN_BUDGET", "1500"))
+EVIDENCE_DUP_THRESHOLD = float(os.getenv("EVIDENCE_DUP_THRESHOLD", "0.6"))
+EVIDENCE_MAX_PER_DOMAIN = int(os.getenv("EVIDENCE_MAX_PER_DOMAIN", "2"))
+EVIDENCE_TITLE_CHARS = 100
+EVIDENCE_SNIPPET_CHARS = 200
+EVIDENCE_MAX_ALTERNATES = 3
+
+_MOBILE_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+_TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "igshid", "ocid", "mc_cid", "mc_eid", "ref", "ref_src", "amp"}
+_TRACKING_PREFIXES = ("utm_", "at_", "__twitter")
+_AMP_PATH_RE = re.compile(r"(/amp)+/?$|/amp(?=/)|\.amp(?=\.html?$)")
+_WORD_RE = re.compile(r"\w+")
+
+_SHINGLE_SIZE = 3
+_NUM_PERM = 64
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(20240601)  # معاملات ثابتة: نفس التوقيع في كل عملية
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(_NUM_PERM)]
+
+
+def canonical_url(url: str) -> str:
+    parts = urlsplit((url or "").strip())
+    if not parts.netloc:
+        return (url or "").strip()
+    host = (parts.hostname or "").lower()
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in _MOBILE_HOST_PREFIXES:
+            if host.startswith(prefix) and host.count(".") > 1:
+                host, stripped = host[len(prefix):], True
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS
+        and not key.lower().startswith(_TRACKING_PREFIXES)
+        and (key.lower(), value.lower()) != ("output", "amp")
+    ]
+    path = _AMP_PATH_RE.sub("", parts.path).rstrip("/") or "/"
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def url_domain(url: str) -> str:
+    return urlsplit(canonical_url(url)).netloc
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    تقدير محلي بلا tokenizer: ~4 بايت UTF-8 لكل token
+    (حرف عربي = بايتان، فالعربية ≈ حرفان لكل token واللاتينية ≈ 4 أحرف)
+    """
+    return -(-len((text or "").encode("utf-8")) // 4)
+
+
+def _shingles(text: str) -> set:
+    words = _WORD_RE.findall(normalize_claim(text))
+    if len(words) <= _SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in _shingles(text)]
+    if not hashes:
+        return ()
+    return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    if not left or not right:
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / _NUM_PERM
+
+
+def clip(text: str, n: int) -> str:
+    text = (text or "").strip()
+    return text if len(text) <= n else text[:n] + "…"
+
+
+def dedupe(results: List[Dict], threshold: float = EVIDENCE_DUP_THRESHOLD) -> List[Dict]:
+    """
+    Unique evidence entries in rank order: {"title", "snippet", "link", "domain", "alternates"}.
+    URL duplicates and near-duplicate snippets are merged into the first copy.
+    """
+    entries, by_url, signatures = [], {}, []
+    for result in results:
+        link = result.get("link", "")
+        if not link:
+            continue
+        url = canonical_url(link)
+        if url in by_url:
+            continue
+        text = f"{result.get('title', '')} {result.get('snippet', '')}"
+        signature = minhash(text)
+        original = next((i for i, other in enumerate(signatures) if similarity(signature, other) >= threshold), None)
+        if original is not None:
+            entries[original]["alternates"].append(link)
+            by_url[url] = entries[original]
+            continue
+        entry = {
+            "title": result.get("title", ""),
+            "snippet": result.get("snippet", ""),
+            "link": link,
+            "domain": url_domain(link),
+            "alternates": [],
+        }
+        entries.append(entry)
+        signatures.append(signature)
+        by_url[url] = entry
+    return entries
+
+
+def diversify(entries: List[Dict], max_per_domain: int = EVIDENCE_MAX_PER_DOMAIN) -> List[Dict]:
+    """Rank order, but no domain gets more than max_per_domain entries before every domain had its turn"""
+    first, rest, seen = [], [], {}
+    for entry in entries:
+        seen[entry["domain"]] = seen.get(entry["domain"], 0) + 1
+        (first if seen[entry["domain"]] <= max_per_domain else rest).append(entry)
+    return first + rest
+
+
+def format_entry(entry: Dict) -> str:
+    text = (
+        f"عنوان: {clip(entry['title'], EVIDENCE_TITLE_CHARS)}\n"
+        f"ملخص: {clip(entry['snippet'], EVIDENCE_SNIPPET_CHARS)}\n"
+        f"رابط: {entry['link']}"
+    )
+    if entry["alternates"]:
+        text += "\nنسخ أخرى: " + " ، ".join(entry["alternates"][:EVIDENCE_MAX_ALTERNATES])
+    return text
+
+
+def build_context(results: List[Dict], token_budget: int = EVIDENCE_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """Returns (context, stats) — stats: results, entries, packed, merged, tokens"""
+    entries = diversify(dedupe(results))
+    blocks, tokens = [], 0
+    for entry in entries:
+        block = format_entry(entry)
+        cost = estimate_tokens(block) + 2
+        if blocks and tokens + cost > token_budget:
+            break
+        blocks.append(block)
+        tokens += cost
+    stats = {
+        "results": len(results),
+        "entries": len(entries),
+        "packed": len(blocks),
+        "merged": sum(len(entry["alternates"]) for entry in entries),
+        "tokens": tokens,
+    }
+    return "\n\n---\n\n".join(blocks), stats
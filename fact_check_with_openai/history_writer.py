@@ -0,0 +1,163 @@
+"""
+Write-behind persistence of FactCheckHistory rows.
+
+Views call ``enqueue(...)`` / ``aenqueue(...)`` (non-blocking) and return immediately; a background
+thread collects records and writes them with ``bulk_create`` every
+``HISTORY_FLUSH_INTERVAL_MS`` milliseconds or every ``HISTORY_BATCH_SIZE`` rows,
+whichever comes first. ``created_at`` is stamped at enqueue time, so rows keep
+their request time even though they are written later.
+
+The queue is drained on shutdown: ASGI lifespan (Config/asgi.py) and atexit for
+WSGI workers. ``HISTORY_WRITE_BEHIND=0`` writes synchronously instead
+(from async code: ``aenqueue``, which runs the write in Django's sync thread).
+"""
+import os
+import queue
+import atexit
+import threading
+import time
+from typing import List, Optional
+
+from django.utils import timezone
+
+from . import metrics
+
+HISTORY_WRITE_BEHIND = os.getenv("HISTORY_WRITE_BEHIND", "1") == "1"
+HISTORY_FLUSH_INTERVAL_MS = int(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "500"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+HISTORY_QUEUE_MAXSIZE = int(os.getenv("HISTORY_QUEUE_MAXSIZE", "10000"))
+
+_STOP = object()
+
+_queue: "queue.Queue" = queue.Queue(maxsize=HISTORY_QUEUE_MAXSIZE)
+_thread: Optional[threading.Thread] = None
+_thread_lock = threading.Lock()
+
+
+def _model():
+    from dashboard.models import FactCheckHistory
+    return FactCheckHistory
+
+
+def enqueue(**fields) -> None:
+    """Queue one FactCheckHistory record (same keyword arguments as objects.create)"""
+    fields.setdefault("created_at", timezone.now())
+    if not HISTORY_WRITE_BEHIND:
+        _write([_model()(**fields)])
+        return
+    _ensure_thread()
+    try:
+        _queue.put_nowait(fields)
+        metrics.incr("history.enqueued")
+    except queue.Full:
+        # لا نبطئ الطلب أبداً؛ السجل يُفقد ويُحسب
+        metrics.incr("history.dropped")
+        print("⚠️ History queue full, dropping record")
+
+
+async def aenqueue(**fields) -> None:
+    """
+    ``enqueue`` for async callers (views): with HISTORY_WRITE_BEHIND=0 the synchronous
+    ORM write runs through sync_to_async instead of inside the event loop
+    (where Django raises SynchronousOnlyOperation).
+    """
+    if HISTORY_WRITE_BEHIND:
+        enqueue(**fields)
+        return
+    from asgiref.sync import sync_to_async
+    await sync_to_async(enqueue)(**fields)
+
+
+def _ensure_thread() -> None:
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="history-writer", daemon=True)
+            _thread.start()
+
+
+def _run() -> None:
+    interval = HISTORY_FLUSH_INTERVAL_MS / 1000
+    stop = False
+    while not stop:
+        items = [_queue.get()]
+        deadline = time.monotonic() + interval
+        while items[-1] is not _STOP and len(items) < HISTORY_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        stop = items[-1] is _STOP
+        if stop:
+            # نكتب ما تبقى قبل التوقف
+            while True:
+                try:
+                    items.append(_queue.get_nowait())
+                except queue.Empty:
+                    break
+        records = [fields for fields in items if fields is not _STOP]
+        if records:
+            Model = _model()
+            _write([Model(**fields) for fields in records])
+        for _ in items:
+            _queue.task_done()
+
+    from django.db import connection
+    connection.close()
+
+
+def _write(objs: List) -> None:
+    from django.db import close_old_connections, connection, transaction
+    from dashboard import rollups
+    close_old_connections()
+    for obj in objs:
+        obj.normalize_verdict()
+    for attempt in (1, 2):
+        try:
+            with transaction.atomic():
+                _model().objects.bulk_create(objs, batch_size=HISTORY_BATCH_SIZE)
+                # bulk_create لا يرسل إشارات → نحدّث الملخص اليومي بأنفسنا
+                rollups.record_created(objs)
+            metrics.incr("history.written", len(objs))
+            return
+        except Exception as e:
+            if attempt == 2:
+                metrics.incr("history.failed", len(objs))
+                print(f"❌ Error saving {len(objs)} history records: {e}")
+            else:
+                # الاتصال قد يكون انقطع أثناء الخمول → اتصال جديد ومحاولة ثانية
+                connection.close()
+
+
+def flush(timeout: float = 10.0) -> bool:
+    """Block until everything queued so far is written. Returns False on timeout."""
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def shutdown(timeout: float = 10.0) -> None:
+    """Drain the queue and stop the writer thread"""
+    global _thread
+    thread = _thread
+    if thread is None or not thread.is_alive():
+        return
+    _queue.put(_STOP)
+    thread.join(timeout)
+    _thread = None
+
+
+def depth() -> int:
+    return _queue.qsize()
+
+
+metrics.register_gauge("history_queue_depth", depth)
+atexit.register(shutdown)
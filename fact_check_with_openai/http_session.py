@@ -0,0 +1,76 @@
+"""
+Process-wide shared aiohttp session.
+
+Reusing one session keeps TCP/TLS connections to serpapi.com alive between
+requests and caches DNS lookups, instead of paying the setup cost every time.
+
+The shared session only makes sense when the worker owns a long-lived event loop,
+i.e. under an ASGI server with lifespan support: Config/asgi.py calls
+``enable_shared_session()`` on startup and ``close_sessions()`` on shutdown.
+Under WSGI (gunicorn sync workers, runserver) every async view runs in its own
+short-lived loop, so ``client_session()`` falls back to a per-call session.
+"""
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+
+_shared_enabled = False
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def new_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        use_dns_cache=True,
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
+def enable_shared_session() -> None:
+    """Called once the worker's event loop is known to be long-lived (ASGI lifespan startup)"""
+    global _shared_enabled
+    _shared_enabled = True
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the shared session, creating it lazily on the running loop"""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = new_session()
+        _session_loop = loop
+    return _session
+
+
+@asynccontextmanager
+async def client_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """
+    Yield the shared session when enabled, otherwise a session scoped to this block.
+    Callers must not close the yielded session themselves.
+    """
+    if _shared_enabled:
+        yield get_session()
+        return
+    async with new_session() as session:
+        yield session
+
+
+async def close_sessions() -> None:
+    """Close the shared session (ASGI lifespan shutdown)"""
+    global _session, _session_loop, _shared_enabled
+    session, _session, _session_loop = _session, None, None
+    _shared_enabled = False
+    if session is not None and not session.closed:
+        await session.close()
@@ -0,0 +1,413 @@
+"""
+Local (no network) language detection for claims.
+
+1. Unicode script ranges decide Arabic / Cyrillic / Latin. Arabic-script text
+   with Persian/Urdu letters (پ چ ژ گ ک ی ٹ ڈ ں ے ...) is reported as fa / ur
+   with a low confidence, so the LLM has the last word.
+2. Latin text is scored (naive Bayes over character trigrams) against profiles
+   built from a few paragraphs of news prose per language (en / fr / es / cs / de / tr),
+   plus letters that only exist in one of them. Accent-free text starts with a
+   prior towards English, and the posterior is tempered: a three-word headline of
+   proper nouns ("Saudi Arabia bans TikTok") is not evidence enough for a
+   confident answer either way. Short accent-free text ("Putin ist tot",
+   "Macron est mort") is never confident: the English prior outweighs its few
+   trigrams, so it is left to the LLM.
+
+``detect_language`` returns ``(lang, confidence)``; callers fall back to the LLM
+only when the confidence is below ``LANG_DETECT_MIN_CONFIDENCE``.
+"""
+import os
+import math
+import re
+from collections import Counter
+from typing import Optional, Tuple
+
+LANG_DETECT_MIN_CONFIDENCE = float(os.getenv("LANG_DETECT_MIN_CONFIDENCE", "0.6"))
+
+_ARABIC_RANGES = ((0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF))
+_CYRILLIC_RANGES = ((0x0400, 0x04FF), (0x0500, 0x052F))
+_LATIN_RANGES = ((0x0041, 0x005A), (0x0061, 0x007A), (0x00C0, 0x024F))
+
+# حروف فارسية/أردية لا تُستعمل في العربية
+_URDU_LETTERS = set("ٹڈڑںےۓھ")
+_PERSIAN_LETTERS = set("پچژگکی")
+_ARABIC_SCRIPT_OTHER_CONFIDENCE = 0.4
+
+# فقرات من نصوص إخبارية عادية لكل لغة ثم مفردات العناوين الشائعة (أفعال بصيغة العنوان، أرقام، أسماء)،
+# تُبنى منها نماذج الـ trigram مرة واحدة عند الاستيراد
+_SEED_TEXT = {
+    "en": (
+        "The government said on Monday that it would raise the minimum wage next year, after weeks of "
+        "talks with unions and business groups. The prime minister told reporters that the decision was "
+        "the right one for working families, but the opposition called it too little and too late. "
+        "Police arrested three people in connection with the attack, which killed at least twelve "
+        "people and injured dozens more, officials said. The suspects are being held for questioning. "
+        "Heavy rain caused floods across the north of the country, forcing thousands of residents to "
+        "leave their homes as rivers burst their banks. Emergency services were working through the "
+        "night. The company reported record profits for the third quarter, driven by strong demand for "
+        "its new phone, and shares rose sharply in early trading. Analysts had expected weaker results. "
+        "The president will travel to the summit with other world leaders to discuss climate change, "
+        "trade and security. Scientists warned that global temperatures could rise faster than "
+        "previously thought. The health ministry confirmed new cases of the virus and urged people to "
+        "get vaccinated. Doctors say there is no evidence that the vaccine causes serious side effects. "
+        "The club announced that its star player has signed a new contract until the end of the season, "
+        "ending months of speculation about his future. Fans celebrated the win in the streets. "
+        "Prices of food and fuel have risen again this month, according to official figures published "
+        "on Thursday, putting pressure on the central bank to act. A spokesman for the ministry denied "
+        "reports that the minister had resigned, saying the claims were false and misleading. "
+        "Millions of people watched the final, which was won by the home team after extra time. "
+        "The airline said flights would resume on Friday after the storm. Workers went on strike over "
+        "pay and conditions, and the union threatened further action if talks fail. The court ruled "
+        "that the law was unconstitutional. The actor, who starred in dozens of films, died at his home "
+        "surrounded by family. Researchers found that drinking coffee may reduce the risk of heart "
+        "disease. The new bridge will connect the two cities and is expected to open within two years. "
+        "Video shared on social media shows smoke rising from the building, but the footage is old and "
+        "was filmed in another country, fact checkers found."
+        " bans ban banned fines fined fine buys bought sells sold contains contain "
+        "joins joined join dies died death hits hit wins won loses lost confirms confirmed denies "
+        "denied unveils launches launched reveals revealed warns warned plans planned calls called "
+        "claims claimed kills killed shows showed seeks signs signed leaves left quits returns "
+        "slams urges vows backs blocks cuts raises opens closes closed orders ordered approves "
+        "rejects arrests charged jailed sentenced accused sued suspends suspended resigns resign "
+        "elected faces expected billion billions million thousands hundreds percent dollars pounds "
+        "euros shares stocks sales profit tax taxes rates growth jobs workers school schools "
+        "children women men police border migrants refugees troops soldiers strike strikes attack "
+        "protest protests crash fire floods drought heat hottest coldest biggest largest first "
+        "last never again still already really because should could might must without within "
+        "across around behind between under against toward free cheap water food meat pork beef "
+        "chicken milk sugar salt oil gas power phone phones app apps online internet data users "
+        "study studies scientists doctors hospital patients cancer disease virus vaccines vaccine "
+        "vaccinated drug drugs pill found finds discovered mystery secret hidden fake false true "
+        "real rumor hoax viral photo photos video footage image post posts shared"
+    ),
+    "fr": (
+        "Le gouvernement a annoncé lundi qu'il augmenterait le salaire minimum l'année prochaine, après "
+        "plusieurs semaines de discussions avec les syndicats et le patronat. Le Premier ministre a "
+        "déclaré aux journalistes que cette décision était la bonne pour les familles, mais l'opposition "
+        "l'a jugée insuffisante. La police a arrêté trois personnes en lien avec l'attaque, qui a fait "
+        "au moins douze morts et des dizaines de blessés, selon les autorités. Les suspects sont en "
+        "garde à vue. De fortes pluies ont provoqué des inondations dans le nord du pays, obligeant des "
+        "milliers d'habitants à quitter leurs maisons. Les secours ont travaillé toute la nuit. "
+        "L'entreprise a publié des bénéfices records pour le troisième trimestre, portés par la demande "
+        "pour son nouveau téléphone, et l'action a fortement progressé à l'ouverture de la Bourse. "
+        "Le président se rendra au sommet avec les autres dirigeants du monde pour parler du climat, "
+        "du commerce et de la sécurité. Les scientifiques ont averti que les températures pourraient "
+        "augmenter plus vite que prévu. Le ministère de la Santé a confirmé de nouveaux cas du virus et "
+        "appelé la population à se faire vacciner. Les médecins affirment qu'aucune preuve ne montre "
+        "que le vaccin entraîne des effets graves. Le club a annoncé que son joueur vedette avait signé "
+        "un nouveau contrat jusqu'à la fin de la saison. Les supporters ont fêté la victoire dans les "
+        "rues. Les prix de l'alimentation et du carburant ont encore augmenté ce mois-ci, d'après les "
+        "chiffres officiels publiés jeudi. Un porte-parole du ministère a démenti les informations "
+        "selon lesquelles le ministre aurait démissionné, affirmant qu'elles étaient fausses. "
+        "Des millions de téléspectateurs ont regardé la finale, remportée par l'équipe locale après "
+        "prolongation. La compagnie aérienne a indiqué que les vols reprendraient vendredi après la "
+        "tempête. Les salariés sont en grève pour les salaires et les conditions de travail. Le tribunal "
+        "a estimé que la loi était contraire à la Constitution. L'acteur, qui a joué dans des dizaines "
+        "de films, est décédé chez lui entouré de sa famille. Selon une étude, boire du café pourrait "
+        "réduire le risque de maladies du cœur. Le nouveau pont reliera les deux villes. Une vidéo "
+        "partagée sur les réseaux sociaux montre de la fumée au-dessus du bâtiment, mais les images "
+        "sont anciennes et ont été tournées dans un autre pays."
+        " interdit interdiction amende condamné achète rachète vend contient rejoint meurt "
+        "mort décès frappe gagne remporte perd confirme dément dévoile lance révèle avertit "
+        "prévoit appelle affirme tue montre cherche signe quitte démissionne revient exhorte "
+        "promet bloque réduit augmente ouvre ferme ordonne approuve rejette arrêté inculpé "
+        "emprisonné condamnée accusé suspendu élu attendu milliards millions milliers centaines "
+        "pourcent dollars euros actions ventes bénéfices impôts taux croissance emplois "
+        "travailleurs école enfants femmes hommes policiers frontière migrants réfugiés soldats "
+        "grève manifestation accident incendie sécheresse chaleur record premier dernier jamais "
+        "encore toujours déjà vraiment parce que devrait pourrait doit sans dans autour derrière "
+        "entre sous contre gratuit eau nourriture viande porc bœuf poulet lait sucre sel pétrole "
+        "gaz électricité téléphone applications internet données utilisateurs étude chercheurs "
+        "médecins hôpital patients cancer maladie vaccins médicament découvert secret caché faux "
+        "vrai rumeur canular photo vidéo image publication partagée"
+    ),
+    "es": (
+        "El gobierno anunció el lunes que subirá el salario mínimo el próximo año, tras varias semanas "
+        "de negociaciones con los sindicatos y la patronal. El presidente del Gobierno dijo a los "
+        "periodistas que la decisión era la correcta para las familias, pero la oposición la calificó "
+        "de insuficiente. La policía detuvo a tres personas en relación con el ataque, que dejó al menos "
+        "doce muertos y decenas de heridos, según las autoridades. Los sospechosos están siendo "
+        "interrogados. Las fuertes lluvias provocaron inundaciones en el norte del país y obligaron a "
+        "miles de vecinos a abandonar sus casas. Los servicios de emergencia trabajaron durante toda la "
+        "noche. La empresa presentó beneficios récord en el tercer trimestre gracias a la demanda de su "
+        "nuevo teléfono, y sus acciones subieron con fuerza en la apertura de la bolsa. El presidente "
+        "viajará a la cumbre con otros líderes mundiales para hablar del clima, el comercio y la "
+        "seguridad. Los científicos advirtieron que las temperaturas podrían aumentar más rápido de lo "
+        "previsto. El Ministerio de Sanidad confirmó nuevos casos del virus y pidió a la población que "
+        "se vacune. Los médicos aseguran que no hay pruebas de que la vacuna cause efectos graves. "
+        "El club anunció que su jugador estrella ha firmado un nuevo contrato hasta el final de la "
+        "temporada. Los aficionados celebraron la victoria en las calles. Los precios de los alimentos y "
+        "del combustible volvieron a subir este mes, según las cifras oficiales publicadas el jueves. "
+        "Un portavoz del ministerio desmintió que el ministro hubiera dimitido y dijo que la información "
+        "era falsa. Millones de personas vieron la final, que ganó el equipo local en la prórroga. "
+        "La aerolínea informó de que los vuelos se reanudarán el viernes después de la tormenta. Los "
+        "trabajadores están en huelga por los salarios y las condiciones laborales. El tribunal "
+        "consideró que la ley era inconstitucional. El actor, que protagonizó decenas de películas, "
+        "murió en su casa rodeado de su familia. Según un estudio, beber café podría reducir el riesgo "
+        "de enfermedades del corazón. El nuevo puente unirá las dos ciudades. Un vídeo compartido en "
+        "las redes sociales muestra humo sobre el edificio, pero las imágenes son antiguas y fueron "
+        "grabadas en otro país."
+        " prohíbe prohibición multa multado compra vende contiene ficha fichaje muere "
+        "murió muerte golpea gana ganó pierde confirma niega presenta lanza revela advierte planea "
+        "pide afirma mata muestra busca firma deja abandona dimite vuelve exige promete bloquea "
+        "recorta aumenta abre cierra ordena aprueba rechaza detenido acusado condenado encarcelado "
+        "suspendido elegido esperado millones miles cientos por ciento dólares euros acciones "
+        "ventas ganancias impuestos tasas crecimiento empleo trabajadores escuela niños mujeres "
+        "hombres policías frontera migrantes refugiados soldados huelga protesta accidente "
+        "incendio sequía calor récord primero último nunca todavía ya realmente porque debería "
+        "podría debe sin dentro alrededor detrás entre bajo contra gratis agua comida carne cerdo "
+        "ternera pollo leche azúcar sal petróleo gas electricidad teléfono aplicaciones internet "
+        "datos usuarios estudio científicos médicos hospital pacientes cáncer enfermedad vacunas "
+        "medicamento descubierto secreto oculto falso verdadero rumor bulo foto vídeo imagen "
+        "publicación compartida"
+    ),
+    "cs": (
+        "Vláda v pondělí oznámila, že příští rok zvýší minimální mzdu, po několika týdnech jednání s "
+        "odbory a zaměstnavateli. Premiér novinářům řekl, že rozhodnutí je správné pro rodiny, opozice "
+        "ho však označila za nedostatečné. Policie zadržela tři lidi v souvislosti s útokem, při kterém "
+        "podle úřadů zemřelo nejméně dvanáct lidí a desítky dalších byly zraněny. Podezřelí jsou ve "
+        "vazbě. Silné deště způsobily povodně na severu země a tisíce obyvatel musely opustit své domovy. "
+        "Záchranáři pracovali celou noc. Společnost vykázala rekordní zisk za třetí čtvrtletí díky "
+        "poptávce po novém telefonu a její akcie na začátku obchodování výrazně posílily. Prezident "
+        "odcestuje na summit s dalšími světovými lídry, kde se bude jednat o klimatu, obchodu a "
+        "bezpečnosti. Vědci varovali, že teploty mohou stoupat rychleji, než se čekalo. Ministerstvo "
+        "zdravotnictví potvrdilo nové případy nákazy a vyzvalo lidi, aby se nechali očkovat. Lékaři "
+        "tvrdí, že neexistují důkazy, že by vakcína způsobovala vážné vedlejší účinky. Klub oznámil, že "
+        "jeho hvězdný hráč podepsal novou smlouvu do konce sezóny. Fanoušci slavili vítězství v ulicích. "
+        "Ceny potravin a pohonných hmot tento měsíc opět vzrostly, vyplývá z oficiálních údajů "
+        "zveřejněných ve čtvrtek. Mluvčí ministerstva popřel zprávy, že ministr rezignoval, a uvedl, "
+        "že jde o nepravdivé informace. Finále sledovaly miliony diváků, domácí tým zvítězil až v "
+        "prodloužení. Letecká společnost uvedla, že lety budou po bouři obnoveny v pátek. Zaměstnanci "
+        "stávkují kvůli mzdám a pracovním podmínkám. Soud rozhodl, že zákon je v rozporu s ústavou. "
+        "Herec, který hrál v desítkách filmů, zemřel doma v kruhu rodiny. Podle studie může pití kávy "
+        "snížit riziko nemocí srdce. Nový most propojí obě města. Video sdílené na sociálních sítích "
+        "ukazuje kouř nad budovou, záběry jsou ale staré a byly natočeny v jiné zemi."
+        " zakázal zakazuje zákaz pokuta pokutu koupil kupuje prodává obsahuje přestoupil "
+        "zemřel úmrtí zasáhl vyhrál vyhrává prohrál potvrdil popřel představil spustil odhalil "
+        "varuje plánuje vyzval tvrdí zabil ukazuje hledá podepsal opustil odstoupil vrací slibuje "
+        "blokuje snižuje zvyšuje otevírá zavírá nařídil schválil odmítl zatčen obviněn odsouzen "
+        "uvězněn pozastaven zvolen očekává miliardy miliony tisíce stovky procent dolarů korun eur "
+        "akcie prodeje zisk daně sazby růst práce pracovníci škola děti ženy muži policisté "
+        "hranice migranti uprchlíci vojáci stávka protest nehoda požár sucho vedra rekord první "
+        "poslední nikdy ještě stále již opravdu protože měl mohl musí bez uvnitř kolem mezi pod "
+        "proti zdarma voda jídlo maso vepřové hovězí kuře mléko cukr sůl ropa plyn elektřina "
+        "telefon aplikace internet data uživatelé studie vědci lékaři nemocnice pacienti rakovina "
+        "nemoc očkování léky objevil tajemství skrytý falešný pravdivý fáma hoax fotka video "
+        "snímek příspěvek sdílený"
+    ),
+    "de": (
+        "Die Regierung hat am Montag angekündigt, den Mindestlohn im nächsten Jahr zu erhöhen, nach "
+        "wochenlangen Gesprächen mit Gewerkschaften und Arbeitgebern. Der Kanzler sagte vor Journalisten, "
+        "die Entscheidung sei richtig für die Familien, die Opposition nannte sie jedoch unzureichend. "
+        "Die Polizei hat drei Personen im Zusammenhang mit dem Anschlag festgenommen, bei dem nach "
+        "Angaben der Behörden mindestens zwölf Menschen getötet und dutzende verletzt wurden. Die "
+        "Verdächtigen werden verhört. Starke Regenfälle haben im Norden des Landes Überschwemmungen "
+        "ausgelöst, tausende Bewohner mussten ihre Häuser verlassen. Die Rettungskräfte arbeiteten die "
+        "ganze Nacht. Das Unternehmen meldete einen Rekordgewinn im dritten Quartal, getragen von der "
+        "Nachfrage nach seinem neuen Telefon, und die Aktie legte zum Handelsstart deutlich zu. Der "
+        "Präsident reist mit anderen Staats- und Regierungschefs zum Gipfel, um über Klima, Handel und "
+        "Sicherheit zu sprechen. Wissenschaftler warnten, dass die Temperaturen schneller steigen "
+        "könnten als erwartet. Das Gesundheitsministerium bestätigte neue Fälle des Virus und rief die "
+        "Bevölkerung auf, sich impfen zu lassen. Ärzte sagen, es gebe keine Belege dafür, dass der "
+        "Impfstoff schwere Nebenwirkungen verursacht. Der Verein gab bekannt, dass sein Starspieler "
+        "einen neuen Vertrag bis zum Ende der Saison unterschrieben hat. Die Fans feierten den Sieg auf "
+        "den Straßen. Die Preise für Lebensmittel und Kraftstoff sind in diesem Monat erneut gestiegen, "
+        "wie aus den am Donnerstag veröffentlichten amtlichen Zahlen hervorgeht. Ein Sprecher des "
+        "Ministeriums wies Berichte zurück, wonach der Minister zurückgetreten sei, und sprach von "
+        "Falschmeldungen. Millionen Zuschauer sahen das Finale, das die Heimmannschaft nach "
+        "Verlängerung gewann. Die Fluggesellschaft teilte mit, dass die Flüge nach dem Sturm am Freitag "
+        "wieder aufgenommen werden. Die Beschäftigten streiken für höhere Löhne und bessere "
+        "Arbeitsbedingungen. Das Gericht entschied, dass das Gesetz verfassungswidrig ist. Der "
+        "Schauspieler, der in dutzenden Filmen mitspielte, starb im Kreis seiner Familie. Laut einer "
+        "Studie könnte Kaffeetrinken das Risiko von Herzkrankheiten senken. Die neue Brücke wird die "
+        "beiden Städte verbinden. Ein in sozialen Netzwerken geteiltes Video zeigt Rauch über dem "
+        "Gebäude, die Aufnahmen sind jedoch alt und stammen aus einem anderen Land."
+        " verbietet verboten Verbot Strafe bestraft kauft verkauft enthält wechselt "
+        "stirbt gestorben Tod trifft gewinnt verliert bestätigt dementiert bestreitet stellt vor "
+        "startet enthüllt warnt plant fordert behauptet tötet zeigt sucht unterzeichnet verlässt "
+        "tritt zurück kehrt zurück verspricht blockiert senkt erhöht öffnet schließt ordnet an "
+        "genehmigt lehnt ab festgenommen angeklagt verurteilt inhaftiert suspendiert gewählt "
+        "erwartet Milliarden Millionen Tausende Hunderte Prozent Dollar Euro Aktien Umsatz Gewinn "
+        "Steuern Zinsen Wachstum Arbeitsplätze Arbeiter Schule Kinder Frauen Männer Polizisten "
+        "Grenze Migranten Flüchtlinge Soldaten Streik Protest Unfall Feuer Dürre Hitze Rekord "
+        "erste letzte niemals noch immer schon wirklich weil sollte könnte muss ohne innerhalb um "
+        "hinter zwischen unter gegen kostenlos Wasser Essen Fleisch Schweinefleisch Rindfleisch "
+        "Hähnchen Milch Zucker Salz Öl Gas Strom Handy Apps Internet Daten Nutzer Studie Forscher "
+        "Ärzte Krankenhaus Patienten Krebs Krankheit Impfstoffe Medikament entdeckt geheim "
+        "versteckt falsch wahr Gerücht Fälschung Foto Video Bild Beitrag geteilt"
+    ),
+    "tr": (
+        "Hükümet pazartesi günü yaptığı açıklamada, sendikalar ve işverenlerle haftalarca süren "
+        "görüşmelerin ardından asgari ücretin gelecek yıl artırılacağını duyurdu. Başbakan gazetecilere "
+        "kararın aileler için doğru olduğunu söyledi, ancak muhalefet kararı yetersiz buldu. Polis, "
+        "yetkililere göre en az on iki kişinin öldüğü ve onlarca kişinin yaralandığı saldırıyla "
+        "bağlantılı olarak üç kişiyi gözaltına aldı. Şüpheliler sorgulanıyor. Şiddetli yağışlar ülkenin "
+        "kuzeyinde sellere yol açtı ve binlerce kişi evlerini terk etmek zorunda kaldı. Acil durum "
+        "ekipleri bütün gece çalıştı. Şirket, yeni telefonuna olan güçlü talep sayesinde üçüncü "
+        "çeyrekte rekor kâr açıkladı ve hisseleri borsanın açılışında sert yükseldi. Cumhurbaşkanı, "
+        "iklim, ticaret ve güvenlik konularını görüşmek üzere diğer dünya liderleriyle birlikte zirveye "
+        "katılacak. Bilim insanları sıcaklıkların beklenenden daha hızlı artabileceği konusunda uyardı. "
+        "Sağlık Bakanlığı virüsün yeni vakalarını doğruladı ve vatandaşları aşı olmaya çağırdı. "
+        "Doktorlar aşının ciddi yan etkilere neden olduğuna dair hiçbir kanıt bulunmadığını söylüyor. "
+        "Kulüp, yıldız oyuncusunun sezon sonuna kadar yeni bir sözleşme imzaladığını açıkladı. "
+        "Taraftarlar galibiyeti sokaklarda kutladı. Perşembe günü yayımlanan resmi verilere göre gıda "
+        "ve akaryakıt fiyatları bu ay yeniden arttı. Bakanlık sözcüsü, bakanın istifa ettiği yönündeki "
+        "haberleri yalanladı ve bu iddiaların doğru olmadığını söyledi. Milyonlarca kişinin izlediği "
+        "finali ev sahibi takım uzatmalarda kazandı. Havayolu şirketi, fırtınanın ardından seferlerin "
+        "cuma günü yeniden başlayacağını bildirdi. İşçiler ücretler ve çalışma koşulları nedeniyle greve "
+        "gitti. Mahkeme, yasanın anayasaya aykırı olduğuna karar verdi. Onlarca filmde rol alan oyuncu, "
+        "ailesinin yanında evinde hayata gözlerini yumdu. Bir araştırmaya göre kahve içmek kalp "
+        "hastalığı riskini azaltabilir. Yeni köprü iki şehri birbirine bağlayacak. Sosyal medyada "
+        "paylaşılan videoda binanın üzerinden duman yükseldiği görülüyor, ancak görüntüler eski ve "
+        "başka bir ülkede çekilmiş."
+        " yasakladı yasak ceza cezası satın aldı sattı içeriyor transfer oldu öldü ölüm "
+        "vurdu kazandı kaybetti doğruladı yalanladı tanıttı başlattı ortaya çıkardı uyardı "
+        "planlıyor çağrı iddia etti öldürdü gösteriyor arıyor imzaladı ayrıldı istifa etti döndü "
+        "söz verdi engelledi düşürdü artırdı açtı kapattı emretti onayladı reddetti tutuklandı "
+        "suçlandı mahkum edildi hapis askıya alındı seçildi bekleniyor milyar milyon binlerce "
+        "yüzlerce yüzde dolar lira euro hisse satış kâr vergi faiz büyüme istihdam işçiler okul "
+        "çocuklar kadınlar erkekler polisler sınır göçmenler mülteciler askerler grev protesto "
+        "kaza yangın kuraklık sıcak rekor ilk son asla hala zaten gerçekten çünkü olmalı olabilir "
+        "zorunda olmadan içinde etrafında arkasında arasında altında karşı ücretsiz su yemek et "
+        "domuz sığır tavuk süt şeker tuz petrol doğalgaz elektrik telefon uygulamalar internet "
+        "veri kullanıcılar araştırma bilim insanları doktorlar hastane hastalar kanser hastalık "
+        "aşılar ilaç keşfedildi gizli saklı sahte gerçek söylenti yalan fotoğraf video görüntü "
+        "paylaşım paylaşıldı"
+    ),
+}
+
+# حروف حكر على لغة واحدة من اللغات المدعومة (ç و ü و ö و á مشتركة، فلا تُعد هنا)
+_DISTINCTIVE_CHARS = {
+    "fr": set("œèêëîûùà"),
+    "es": set("ñ¿¡"),
+    "cs": set("řěůťďňšžčý"),
+    "de": set("ßä"),
+    "tr": set("şğı"),
+}
+# كل حرف مميز يضيف هذا المقدار (nats) إلى درجة اللغة، لثلاثة أحرف على الأكثر
+_DISTINCTIVE_BONUS = 4.0
+_SMOOTHING = 0.5
+# الـ trigrams المتداخلة ليست مستقلة: نقسم مجموع الاحتمال اللوغاريتمي قبل softmax
+_TEMPERATURE = 3.0
+# نص لاتيني بلا أي حرف معلَّم: أرجح أن يكون إنجليزياً (nats)
+_ASCII_PRIOR = {"en": 2.0}
+# عدد الـ trigrams الذي تبلغ عنده الثقة حدها الكامل؛ العناوين الأقصر تُخفَّض ثقتها
+_FULL_EVIDENCE_GRAMS = 16
+# وزن كلمات الأسماء (بحرف كبير بعد الكلمة الأولى) مقارنة ببقية الكلمات
+_NAME_WEIGHT = 0.5
+# نص بلا حرف معلَّم وأقل من هذا الدليل: الثقة تبقى دون LANG_DETECT_MIN_CONFIDENCE
+_ASCII_MIN_EVIDENCE = 18
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def _in_ranges(cp: int, ranges) -> bool:
+    return any(lo <= cp <= hi for lo, hi in ranges)
+
+
+def _trigrams(text: str):
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            yield padded[i:i + 3]
+
+
+def _weighted_trigrams(text: str):
+    """(trigram, weight): capitalized words after the first are mostly names, which say little about the language"""
+    for n, word in enumerate(_WORD_RE.findall(text)):
+        weight = _NAME_WEIGHT if n and not word.islower() else 1.0
+        padded = f" {word.lower()} "
+        for i in range(len(padded) - 2):
+            yield padded[i:i + 3], weight
+
+
+def _build_profiles():
+    profiles = {}
+    for lang, seed in _SEED_TEXT.items():
+        counts = Counter(_trigrams(seed))
+        total = sum(counts.values())
+        vocab = len(counts) + 1
+        logprobs = {g: math.log((c + _SMOOTHING) / (total + _SMOOTHING * vocab)) for g, c in counts.items()}
+        unseen = math.log(_SMOOTHING / (total + _SMOOTHING * vocab))
+        profiles[lang] = (logprobs, unseen)
+    return profiles
+
+
+_PROFILES = _build_profiles()
+
+
+def _detect_latin(text: str) -> Tuple[str, float]:
+    grams = list(_weighted_trigrams(text))
+    if not grams:
+        return "en", 0.0
+    evidence = sum(weight for _, weight in grams)
+
+    lowered = text.lower()
+    ascii_only = all(ord(ch) < 128 for ch in lowered if ch.isalpha())
+    scores = {}
+    for lang, (logprobs, unseen) in _PROFILES.items():
+        score = sum(weight * logprobs.get(g, unseen) for g, weight in grams) / _TEMPERATURE
+        bonus = sum(1 for ch in lowered if ch in _DISTINCTIVE_CHARS.get(lang, ()))
+        prior = _ASCII_PRIOR.get(lang, 0.0) if ascii_only else 0.0
+        scores[lang] = score + _DISTINCTIVE_BONUS * min(bonus, 3) + prior
+    best = max(scores.values())
+    weights = {lang: math.exp(s - best) for lang, s in scores.items()}
+    lang = max(weights, key=weights.get)
+    posterior = weights[lang] / sum(weights.values())
+    # عنوان قصير بلا حرف مميز: الثقة تتناسب مع كمية الدليل
+    if not any(ch in _DISTINCTIVE_CHARS.get(lang, ()) for ch in lowered):
+        posterior *= min(1.0, evidence / _FULL_EVIDENCE_GRAMS) ** 0.5
+    # ("Putin ist tot" يبدو إنجليزياً بسبب الـ prior) — نترك القرار للـ LLM
+    if ascii_only and evidence < _ASCII_MIN_EVIDENCE:
+        posterior = min(posterior, 0.9 * LANG_DETECT_MIN_CONFIDENCE)
+    return lang, posterior
+
+
+def _detect_arabic_script(text: str) -> Tuple[str, float]:
+    urdu = sum(1 for ch in text if ch in _URDU_LETTERS)
+    persian = sum(1 for ch in text if ch in _PERSIAN_LETTERS)
+    if urdu:
+        return "ur", _ARABIC_SCRIPT_OTHER_CONFIDENCE
+    if persian:
+        return "fa", _ARABIC_SCRIPT_OTHER_CONFIDENCE
+    return "ar", 1.0
+
+
+def detect_language(text: str) -> Tuple[str, float]:
+    """
+    Detect the language of ``text`` locally.
+    Returns (ISO 639-1 code, confidence in [0, 1]).
+    """
+    arabic = cyrillic = latin = other = 0
+    for ch in text or "":
+        if not ch.isalpha():
+            continue
+        cp = ord(ch)
+        if _in_ranges(cp, _ARABIC_RANGES):
+            arabic += 1
+        elif _in_ranges(cp, _CYRILLIC_RANGES):
+            cyrillic += 1
+        elif _in_ranges(cp, _LATIN_RANGES):
+            latin += 1
+        else:
+            other += 1
+
+    letters = arabic + cyrillic + latin + other
+    if not letters:
+        return "en", 0.0
+
+    if arabic >= max(cyrillic, latin, other):
+        lang, confidence = _detect_arabic_script(text)
+        return lang, confidence * arabic / letters
+    if cyrillic >= max(latin, other):
+        return "ru", cyrillic / letters
+    if latin >= other:
+        lang, confidence = _detect_latin(text)
+        return lang, confidence * latin / letters
+    # سكربت غير مدعوم محلياً (صيني، عبري...) → نترك القرار للنموذج
+    return "en", 0.0
+
+
+def detect_lang_hint(text: str, default: Optional[str] = "ar") -> Optional[str]:
+    """Return the detected language code, or ``default`` when the detector is not confident"""
+    lang, confidence = detect_language(text)
+    return lang if confidence >= LANG_DETECT_MIN_CONFIDENCE else default
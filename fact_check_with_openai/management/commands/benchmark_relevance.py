@@ -0,0 +1,91 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fact_check_with_openai import relevance
+
+# فلتر الصلة السابق كما كان في check_fact_simple_async (للمقارنة فقط)
+_LEGACY_STOP_WORDS = {'في', 'من', 'إلى', 'على', 'عن', 'مع', 'هذا', 'هذه', 'ذلك', 'التي', 'الذي',
+                      'و', 'أو', 'لكن', 'ف', 'ب', 'ك', 'ل', 'the', 'a', 'an', 'and', 'or', 'but', 'in',
+                      'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were'}
+
+
+def legacy_relevant(claim_text, source):
+    claim_words = set(w.lower() for w in claim_text.split() if w.lower() not in _LEGACY_STOP_WORDS and len(w) > 2)
+    text = f"{source.get('title', '')} {source.get('snippet', '')}".lower()
+    source_words = set(w for w in text.split() if w not in _LEGACY_STOP_WORDS and len(w) > 2)
+    if not claim_words or not source_words:
+        return bool(source.get("title"))
+    common = claim_words & source_words
+    return len(common) >= max(1, int(len(claim_words) * 0.2)) or len(common) / len(claim_words) >= 0.2
+
+
+def new_relevant(claim_text, sources):
+    return [relevance.is_relevant(claim_text, s) for s in relevance.score_sources(claim_text, sources)]
+
+
+def load_recordings(path):
+    """
+    JSONL, one claim per line: {"claim", "results": [{title, snippet, link}], "relevant": [links]?}
+    Recordings of benchmark_search_plans ({"claim", "responses": {...}}) are accepted as well.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    except OSError as e:
+        raise CommandError(str(e))
+    for row in rows:
+        if "results" not in row:
+            seen, results = set(), []
+            for response in row.get("responses", {}).values():
+                for r in response:
+                    if r.get("link") and r["link"] not in seen:
+                        seen.add(r["link"])
+                        results.append(r)
+            row["results"] = results
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the previous split()-based source relevance filter with relevance.py "
+        "(stemmed terms + batch BM25) on recorded search results: time per claim, "
+        "sources kept and, for rows labelled with \"relevant\" links, precision and recall."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('recordings')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rows = load_recordings(options['recordings'])
+        if not rows:
+            raise CommandError("No recordings")
+        repeat = max(options['repeat'], 1)
+        scorers = {
+            'legacy': lambda claim, results: [legacy_relevant(claim, r) for r in results],
+            'bm25': new_relevant,
+        }
+        self.stdout.write(f"📊 {len(rows)} claims, {sum(len(r['results']) for r in rows)} results, {repeat} repeats")
+        self.stdout.write(f"{'scorer':<8} {'µs/claim':>10} {'kept':>6} {'precision':>10} {'recall':>8}")
+        for name, scorer in scorers.items():
+            relevance.claim_terms.cache_clear()
+            started = time.perf_counter()
+            for _ in range(repeat):
+                for row in rows:
+                    scorer(row['claim'], row['results'])
+            micros = (time.perf_counter() - started) / (repeat * len(rows)) * 1e6
+
+            kept = hits = labelled = expected = 0
+            for row in rows:
+                flags = scorer(row['claim'], row['results'])
+                links = {r['link'] for r, keep in zip(row['results'], flags) if keep}
+                kept += len(links)
+                if 'relevant' in row:
+                    labelled += len(links)
+                    hits += len(links & set(row['relevant']))
+                    expected += len(row['relevant'])
+            precision = f"{hits / labelled:.0%}" if labelled else "-"
+            recall = f"{hits / expected:.0%}" if expected else "-"
+            self.stdout.write(f"{name:<8} {micros:>10.1f} {kept / len(rows):>6.1f} {precision:>10} {recall:>8}")
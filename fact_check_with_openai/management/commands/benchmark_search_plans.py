@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fact_check_with_openai import query_planner
+from fact_check_with_openai.query_planner import PLANS
+
+
+def _response_key(query: str, num: int) -> str:
+    return f"{num}\t{query}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare SerpAPI search plans (fanout / combined / adaptive) offline over recorded "
+        "responses: queries per claim, agency coverage and overlap with the fanout results. "
+        "--record fetches the responses for a claims file first (spends SerpAPI quota)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('recordings', help='JSONL file: {"claim", "k_sources", "responses": {"<num>\\t<query>": [...]}}')
+        parser.add_argument('--record', metavar='CLAIMS_FILE', help='One claim per line; fetch every plan\'s queries and write RECORDINGS')
+        parser.add_argument('--agencies', default=os.getenv("NEWS_AGENCIES", "aljazeera.net,una-oic.org,bbc.com"))
+        parser.add_argument('--k-sources', type=int, default=5)
+
+    def handle(self, *args, **options):
+        agencies = [d.strip() for d in options['agencies'].split(",") if d.strip()]
+        if options['record']:
+            self._record(options['record'], options['recordings'], agencies, options['k_sources'])
+        try:
+            with open(options['recordings'], encoding='utf-8') as f:
+                recordings = [json.loads(line) for line in f if line.strip()]
+        except OSError as e:
+            raise CommandError(str(e))
+        if not recordings:
+            raise CommandError("No recordings")
+        self._report(recordings, agencies)
+
+    def _record(self, claims_file, recordings_file, agencies, k_sources):
+        from fact_check_with_openai.search import fetch_serp_async
+
+        with open(claims_file, encoding='utf-8') as f:
+            claims = [line.strip() for line in f if line.strip()]
+
+        async def record(claim):
+            responses = {}
+
+            async def fetch(query, num):
+                key = _response_key(query, num)
+                if key not in responses:
+                    responses[key] = await fetch_serp_async(None, query, num=num)
+                return responses[key]
+
+            # كل خطة تُنفذ فعلياً حتى تُسجَّل استعلامات الموجة الثانية للخطة التكيفية أيضاً
+            for plan in PLANS:
+                await query_planner.run_plan_async(claim, k_sources, fetch, agencies, plan)
+            return {"claim": claim, "k_sources": k_sources, "responses": responses}
+
+        with open(recordings_file, 'w', encoding='utf-8') as out:
+            for claim in claims:
+                out.write(json.dumps(asyncio.run(record(claim)), ensure_ascii=False) + "\n")
+        self.stdout.write(f"📼 Recorded {len(claims)} claims → {recordings_file}")
+
+    def _report(self, recordings, agencies):
+        totals = {plan: {"queries": 0, "results": 0, "agencies": 0, "overlap": 0.0, "agency_recall": 0.0, "missing": 0} for plan in PLANS}
+        for recording in recordings:
+            responses = recording["responses"]
+            outcomes = {}
+            for plan in PLANS:
+                calls = []
+
+                def fetch(query, num):
+                    calls.append(query)
+                    key = _response_key(query, num)
+                    if key not in responses:
+                        totals[plan]["missing"] += 1
+                    return responses.get(key, [])
+
+                results = query_planner.run_plan(recording["claim"], recording.get("k_sources", 5), fetch, agencies, plan)
+                outcomes[plan] = (len(calls), results)
+
+            reference = {r["link"] for r in outcomes["fanout"][1]}
+            reference_agency = {link for link in reference if any(query_planner.matches_domain(link, d) for d in agencies)}
+            for plan, (queries, results) in outcomes.items():
+                links = {r["link"] for r in results}
+                row = totals[plan]
+                row["queries"] += queries
+                row["results"] += len(results)
+                row["agencies"] += len(query_planner.covered_agencies(results, agencies))
+                row["overlap"] += len(links & reference) / len(reference) if reference else 1.0
+                row["agency_recall"] += len(links & reference_agency) / len(reference_agency) if reference_agency else 1.0
+
+        n = len(recordings)
+        self.stdout.write(f"📊 {n} claims, {len(agencies)} agencies (reference plan: fanout)")
+        self.stdout.write(f"{'plan':<10} {'queries/claim':>14} {'results':>8} {'agencies hit':>13} {'overlap':>8} {'agency recall':>14}")
+        for plan, row in totals.items():
+            self.stdout.write(
+                f"{plan:<10} {row['queries'] / n:>14.2f} {row['results'] / n:>8.1f} {row['agencies'] / n:>13.2f} "
+                f"{row['overlap'] / n:>8.0%} {row['agency_recall'] / n:>14.0%}"
+                + (f"  ⚠️ {row['missing']} unrecorded queries" if row['missing'] else "")
+            )
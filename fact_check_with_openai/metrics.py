@@ -0,0 +1,38 @@
+"""
+Lightweight in-process counters and gauges (per worker).
+Exposed by MetricsView at /fact_check/metrics/.
+"""
+import threading
+from collections import Counter
+from typing import Callable, Dict
+
+_lock = threading.Lock()
+_counters: Counter = Counter()
+_gauges: Dict[str, Callable[[], object]] = {}
+
+
+def incr(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] += n
+
+
+def get(name: str) -> int:
+    return _counters.get(name, 0)
+
+
+def register_gauge(name: str, fn: Callable[[], object]) -> None:
+    """Register a callable evaluated on every snapshot (queue depth, cache stats...)"""
+    _gauges[name] = fn
+
+
+def snapshot() -> dict:
+    with _lock:
+        data = {"counters": dict(sorted(_counters.items()))}
+    gauges = {}
+    for name, fn in _gauges.items():
+        try:
+            gauges[name] = fn()
+        except Exception as e:
+            gauges[name] = f"error: {e}"
+    data["gauges"] = gauges
+    return data
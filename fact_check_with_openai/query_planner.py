@@ -0,0 +1,126 @@
+"""
+Search plans for a claim: which SerpAPI queries to run, and in what order.
+
+- ``fanout``   : one ``site:<domain>`` query per NEWS_AGENCIES entry (num=2) + one
+                 general query — the original behaviour, len(NEWS_AGENCIES)+1 queries.
+- ``combined`` : the agencies folded into ``(site:a OR site:b ...)`` queries of at
+                 most FACT_SEARCH_MAX_SITES domains each + the general query.
+- ``adaptive`` : the general query first; agencies that already appear in its
+                 results are skipped and the rest are fetched with one combined
+                 query. 1 query when the general search covers the agencies, 2 otherwise.
+
+A plan is two waves of (query, num) pairs; the second wave is computed from the
+results of the first, so the same plan runs in the async and sync pipelines.
+``FACT_SEARCH_PLAN`` selects the plan (default: adaptive).
+"""
+import os
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple
+from urllib.parse import urlsplit
+
+from . import metrics
+
+PLANS = ("fanout", "combined", "adaptive")
+SEARCH_PLAN = os.getenv("FACT_SEARCH_PLAN", "adaptive")
+# Google يقصّ الاستعلامات الطويلة (~32 كلمة) → نقسم النطاقات على عدة استعلامات
+SEARCH_MAX_SITES = int(os.getenv("FACT_SEARCH_MAX_SITES", "8"))
+AGENCY_RESULTS_PER_DOMAIN = 2
+
+Query = Tuple[str, int]
+
+
+def domain_of(url: str) -> str:
+    host = (urlsplit(url or "").hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def matches_domain(url: str, domain: str) -> bool:
+    """arabic.bbc.com / www.bbc.com تنتمي إلى bbc.com"""
+    host = domain_of(url)
+    domain = domain.lower()
+    return host == domain or host.endswith("." + domain)
+
+
+def covered_agencies(results: Iterable[Dict], agencies: List[str]) -> List[str]:
+    links = [r.get("link", "") for r in results]
+    return [domain for domain in agencies if any(matches_domain(link, domain) for link in links)]
+
+
+def combined_queries(claim_text: str, agencies: List[str]) -> List[Query]:
+    size = max(SEARCH_MAX_SITES, 1)
+    queries = []
+    for i in range(0, len(agencies), size):
+        group = agencies[i:i + size]
+        sites = " OR ".join(f"site:{d}" for d in group)
+        query = f"{claim_text} {sites}" if len(group) == 1 else f"{claim_text} ({sites})"
+        queries.append((query, AGENCY_RESULTS_PER_DOMAIN * len(group)))
+    return queries
+
+
+def first_wave(claim_text: str, k_sources: int, agencies: List[str], plan: str = SEARCH_PLAN) -> List[Query]:
+    general = (claim_text, k_sources)
+    if plan == "fanout":
+        return [(f"{claim_text} site:{d}", AGENCY_RESULTS_PER_DOMAIN) for d in agencies] + [general]
+    if plan == "combined":
+        return combined_queries(claim_text, agencies) + [general]
+    return [general]
+
+
+def second_wave(claim_text: str, results: List[Dict], agencies: List[str], plan: str = SEARCH_PLAN) -> List[Query]:
+    if plan != "adaptive":
+        return []
+    covered = set(covered_agencies(results, agencies))
+    missing = [d for d in agencies if d not in covered]
+    if not missing:
+        metrics.incr("search_plan.agency_queries_skipped")
+    return combined_queries(claim_text, missing)
+
+
+def max_queries(agencies: List[str], plan: str = SEARCH_PLAN) -> int:
+    """أقصى عدد لاستعلامات SerpAPI لكل ادعاء في هذه الخطة"""
+    groups = -(-len(agencies) // max(SEARCH_MAX_SITES, 1))
+    return len(agencies) + 1 if plan == "fanout" else groups + 1
+
+
+def merge_results(result_lists: Iterable[List[Dict]]) -> List[Dict]:
+    """دمج القوائم بالترتيب مع إزالة المكرر حسب الرابط"""
+    results, seen_urls = [], set()
+    for result_list in result_lists:
+        for result in result_list:
+            url = result.get("link", "")
+            if url and url not in seen_urls:
+                results.append(result)
+                seen_urls.add(url)
+    return results
+
+
+async def run_plan_async(
+    claim_text: str,
+    k_sources: int,
+    fetch: Callable[[str, int], Awaitable[List[Dict]]],
+    agencies: List[str],
+    plan: str = SEARCH_PLAN,
+) -> List[Dict]:
+    first = first_wave(claim_text, k_sources, agencies, plan)
+    print(f"🚀 Running {len(first)} parallel search queries ({plan} plan)...")
+    first_results = await asyncio.gather(*(fetch(q, num) for q, num in first))
+    second = second_wave(claim_text, merge_results(first_results), agencies, plan)
+    second_results = await asyncio.gather(*(fetch(q, num) for q, num in second)) if second else []
+    metrics.incr(f"search_plan.{plan}.queries", len(first) + len(second))
+    # نتائج الوكالات أولاً ثم البحث العام (نفس ترتيب خطة fanout)
+    return merge_results([*second_results, *first_results])
+
+
+def run_plan(
+    claim_text: str,
+    k_sources: int,
+    fetch: Callable[[str, int], List[Dict]],
+    agencies: List[str],
+    plan: str = SEARCH_PLAN,
+) -> List[Dict]:
+    first = first_wave(claim_text, k_sources, agencies, plan)
+    first_results = [fetch(q, num) for q, num in first]
+    second = second_wave(claim_text, merge_results(first_results), agencies, plan)
+    second_results = [fetch(q, num) for q, num in second]
+    metrics.incr(f"search_plan.{plan}.queries", len(first) + len(second))
+    return merge_results([*second_results, *first_results])
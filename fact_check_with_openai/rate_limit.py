@@ -0,0 +1,309 @@
+"""
+Process-wide adaptive rate limiting for outbound OpenAI and SerpAPI calls.
+
+One ``AdaptiveLimiter`` per (provider, model):
+- a token bucket caps the request rate (``*_RATE_LIMIT_RPS`` / ``*_RATE_LIMIT_BURST``);
+- an AIMD window caps concurrency: +1/limit per success, halved on HTTP 429,
+  reduced gently when OpenAI's ``x-ratelimit-remaining-*`` headers run low,
+  and paused until the advertised reset when they hit zero.
+
+Callers queue (up to ``RATE_LIMIT_MAX_WAIT`` seconds) instead of failing.
+State is guarded by a threading.Lock and waiting is done by polling, so one
+limiter works across event loops (WSGI threads each run their own loop).
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import DefaultAsyncHttpxClient, RateLimitError
+
+from . import metrics
+
+OPENAI_RATE_LIMIT_RPS = float(os.getenv("OPENAI_RATE_LIMIT_RPS", "8"))
+OPENAI_RATE_LIMIT_BURST = float(os.getenv("OPENAI_RATE_LIMIT_BURST", "16"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+SERPAPI_RATE_LIMIT_RPS = float(os.getenv("SERPAPI_RATE_LIMIT_RPS", "5"))
+SERPAPI_RATE_LIMIT_BURST = float(os.getenv("SERPAPI_RATE_LIMIT_BURST", "10"))
+SERPAPI_MAX_CONCURRENCY = int(os.getenv("SERPAPI_MAX_CONCURRENCY", "10"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+
+# مدة التوقف بعد 429 إن لم يحدد المزود retry-after (ثوانٍ)
+DEFAULT_BACKOFF = 1.0
+_MAX_POLL = 0.25
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited RATE_LIMIT_MAX_WAIT seconds without getting a slot"""
+
+
+class AdaptiveLimiter:
+    def __init__(self, name: str, rate: float, burst: float, max_concurrency: int, min_concurrency: int = 1):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_concurrency = max(max_concurrency, 1)
+        self.min_concurrency = max(min(min_concurrency, self.max_concurrency), 1)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> float:
+        """0 → slot taken; otherwise the number of seconds worth waiting before retrying"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            if self.in_flight >= int(self.limit):
+                return _MAX_POLL
+            if self.rate > 0:
+                if self._tokens < 1:
+                    return (1 - self._tokens) / self.rate
+                self._tokens -= 1
+            self.in_flight += 1
+            return 0.0
+
+    @asynccontextmanager
+    async def slot(self, max_wait: Optional[float] = None):
+        await self.acquire(max_wait)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, max_wait: Optional[float] = None) -> None:
+        """Take a slot (queueing up to max_wait seconds); pair with release(), or use slot()"""
+        deadline = time.monotonic() + (RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait)
+        queued = False
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                break
+            if not queued:
+                queued = True
+                metrics.incr(f"rate_limit.{self.name}.queued")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                metrics.incr(f"rate_limit.{self.name}.timeouts")
+                raise RateLimitTimeout(f"{self.name}: no slot after waiting")
+            await asyncio.sleep(min(wait, remaining, _MAX_POLL))
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> None:
+        metrics.incr(f"rate_limit.{self.name}.throttled")
+        with self._lock:
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            self._pause(retry_after or DEFAULT_BACKOFF)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._pause(seconds)
+
+    def _pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe(self, remaining_requests: Optional[int], remaining_tokens: Optional[int], reset: Optional[float]) -> None:
+        """Feed OpenAI's x-ratelimit-* headers from a successful response"""
+        if remaining_requests == 0 or remaining_tokens == 0:
+            with self._lock:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self._pause(reset or DEFAULT_BACKOFF)
+            return
+        if remaining_requests is not None and remaining_requests < self.limit:
+            # الحصة تقترب من النفاد → نخفض النافذة تدريجياً بدل انتظار 429
+            with self._lock:
+                self.limit = max(self.min_concurrency, self.limit * 0.75)
+            return
+        self.on_success()
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+        }
+
+
+_limiters: Dict[Tuple[str, Optional[str]], AdaptiveLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_limiter(provider: str, model: Optional[str] = None) -> AdaptiveLimiter:
+    key = (provider, model)
+    limiter = _limiters.get(key)
+    if limiter is not None:
+        return limiter
+    with _registry_lock:
+        if key not in _limiters:
+            name = f"{provider}:{model}" if model else provider
+            if provider == "openai":
+                _limiters[key] = AdaptiveLimiter(name, OPENAI_RATE_LIMIT_RPS, OPENAI_RATE_LIMIT_BURST, OPENAI_MAX_CONCURRENCY)
+            else:
+                _limiters[key] = AdaptiveLimiter(name, SERPAPI_RATE_LIMIT_RPS, SERPAPI_RATE_LIMIT_BURST, SERPAPI_MAX_CONCURRENCY)
+        return _limiters[key]
+
+
+metrics.register_gauge("rate_limiters", lambda: {limiter.name: limiter.stats() for limiter in list(_limiters.values())})
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """'6m0s' / '1.5s' / '120ms' / '20' → seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def retry_after(headers) -> Optional[float]:
+    if headers is None:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+
+def _request_model(request: httpx.Request) -> Optional[str]:
+    try:
+        return json.loads(request.content).get("model")
+    except Exception:
+        return None
+
+
+async def _observe_openai_response(response: httpx.Response) -> None:
+    """httpx response hook: sees every attempt, including the SDK's own retries"""
+    limiter = get_limiter("openai", _request_model(response.request))
+    if response.status_code == 429:
+        limiter.on_throttled(retry_after(response.headers))
+    elif response.status_code < 400:
+        remaining_requests = _int_header(response.headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _int_header(response.headers, "x-ratelimit-remaining-tokens")
+        # ننتظر حتى تتجدد الحصة التي نفدت؛ وإن نفدت الاثنتان فالأبعد موعداً
+        resets = [
+            parse_duration(response.headers.get(f"x-ratelimit-reset-{quota}"))
+            for quota, remaining in (("requests", remaining_requests), ("tokens", remaining_tokens))
+            if remaining == 0
+        ]
+        resets = [reset for reset in resets if reset is not None]
+        limiter.observe(remaining_requests, remaining_tokens, max(resets) if resets else None)
+
+
+def openai_http_client() -> httpx.AsyncClient:
+    """http_client for AsyncOpenAI(...) that reports rate-limit headers to the limiters"""
+    return DefaultAsyncHttpxClient(event_hooks={"response": [_observe_openai_response]})
+
+
+class _SlotStream:
+    """
+    A streamed completion that keeps its limiter slot until the stream is exhausted,
+    fails or is closed — the generation (and the provider's concurrency) lasts that long,
+    not just until the first response headers. Anything else is delegated to the SDK stream.
+    """
+
+    def __init__(self, stream, limiter: AdaptiveLimiter):
+        self._limiter = limiter
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._iterator.__anext__()
+        except BaseException:
+            # StopAsyncIteration، خطأ شبكة أو إلغاء: انتهى البث في كل الحالات
+            await self.close()
+            raise
+
+    async def close(self) -> None:
+        self._release()
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            await close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _release(self) -> None:
+        limiter, self._limiter = self._limiter, None
+        if limiter is not None:
+            limiter.release()
+
+    def __del__(self):
+        # بث تُرك دون إغلاق: لا نفقد الخانة إلى الأبد
+        self._release()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+async def chat_completion(client, **kwargs):
+    """
+    ``client.chat.completions.create(**kwargs)`` behind the (openai, model) limiter.
+    A 429 that survives the SDK's own retries is queued and retried until
+    RATE_LIMIT_MAX_WAIT instead of surfacing as a failed check.
+    With stream=True the slot is held until the returned stream is exhausted or closed.
+    """
+    limiter = get_limiter("openai", kwargs.get("model"))
+    deadline = time.monotonic() + RATE_LIMIT_MAX_WAIT
+    while True:
+        await limiter.acquire(max_wait=max(0.0, deadline - time.monotonic()))
+        try:
+            response = await client.chat.completions.create(**kwargs)
+        except RateLimitError as e:
+            limiter.release()
+            # نفاد الرصيد لا يُحل بالانتظار
+            if getattr(e, "code", None) == "insufficient_quota" or time.monotonic() >= deadline:
+                raise
+            metrics.incr(f"rate_limit.{limiter.name}.retries")
+            # hook الاستجابة خفّض النافذة؛ هنا نضمن التوقف فقط
+            limiter.pause(retry_after(getattr(e.response, "headers", None)) or DEFAULT_BACKOFF)
+            continue
+        except BaseException:
+            limiter.release()
+            raise
+        if kwargs.get("stream"):
+            return _SlotStream(response, limiter)
+        limiter.release()
+        return response
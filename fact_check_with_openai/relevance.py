@@ -0,0 +1,186 @@
+"""
+Relevance of the verdict sources to the claim.
+
+- Terms: ``normalize_claim`` (diacritics, alef/yaa variants, case), ``\\w+`` tokens,
+  stopwords dropped (one frozenset built at import), then ``light_stem``: Arabic
+  prefixes (ال with و ف ب ك ل) and suffixes (ات ون ين ها ...) are stripped, so
+  "الهلال" / "هلال" / "بالهلال" and "اللقاحات" / "لقاح" give the same term.
+- ``claim_terms`` is cached per claim text (the pipeline filters, then pads, with
+  the same claim).
+- ``score_sources`` scores every candidate in one pass with BM25 over the candidate
+  set itself (document frequencies and average length come from the batch).
+- ``filter_sources`` is the step of the pipeline: keeps the model's sources whose
+  terms cover enough of the claim (``is_relevant``), pads with the best-scoring
+  relevant search results when fewer than RELEVANCE_MIN_SOURCES remain, and caps
+  the list.
+"""
+import os
+import re
+import math
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List
+
+from .cache import normalize_claim
+
+RELEVANCE_MIN_COVERAGE = float(os.getenv("RELEVANCE_MIN_COVERAGE", "0.3"))
+RELEVANCE_MIN_SOURCES = int(os.getenv("RELEVANCE_MIN_SOURCES", "3"))
+RELEVANCE_PAD_TO = 5
+RELEVANCE_MAX_SOURCES = 10
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# بعد normalize_claim (أ/إ/آ → ا، ى → ي) — الكلمات هنا بصيغتها الموحدة
+STOP_WORDS = frozenset({
+    "في", "من", "الي", "علي", "عن", "مع", "هذا", "هذه", "ذلك", "تلك", "التي", "الذي", "الذين",
+    "و", "او", "ثم", "لكن", "بل", "ف", "ب", "ك", "ل", "ان", "انه", "انها", "كان", "كانت", "قد",
+    "لقد", "ما", "لا", "لم", "لن", "هل", "هو", "هي", "هم", "كل", "بعد", "قبل", "عند", "حتي",
+    "اي", "منذ", "خلال", "بين", "حول", "ضد", "اليوم", "امس", "غدا", "عبر", "تم", "وفق",
+    "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by",
+    "is", "are", "was", "were", "be", "been", "has", "have", "had", "it", "its", "this", "that",
+    "from", "as", "after", "before", "over", "new", "says", "said",
+    "le", "la", "les", "de", "des", "du", "un", "une", "et", "en", "au", "aux", "est",
+    "el", "los", "las", "del", "y", "por", "con", "para", "es",
+})
+
+_WORD_RE = re.compile(r"\w+")
+_AR_LETTER_RE = re.compile(r"[ء-ي]")
+# الأطول أولاً؛ تُحذف سابقة واحدة فقط
+_AR_PREFIXES = ("وبال", "وكال", "فبال", "وال", "بال", "كال", "فال", "لل", "ال")
+_AR_SUFFIXES = ("يات", "ات", "ون", "ين", "ان", "ها", "هم", "هن", "كم", "نا", "ية", "يه", "ه", "ة", "ي")
+_AR_CONJUNCTIONS = ("و", "ف")
+
+
+# مفردات الأخبار محدودة ومتكررة: كل كلمة تُجذَّع مرة واحدة لكل عملية
+@lru_cache(maxsize=65536)
+def light_stem(word: str) -> str:
+    """Light10-style stem for Arabic words (without the و/ف conjunction, see terms); Latin words only lose a plural -s"""
+    if not _AR_LETTER_RE.search(word):
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            return word[:-1]
+        return word
+    for prefix in _AR_PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+            word = word[len(prefix):]
+            break
+    for suffix in _AR_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            word = word[:-len(suffix)]
+            break
+    return word
+
+
+def terms(text: str, variants: bool = False) -> List[str]:
+    """
+    Stems of the non-stopword words. variants=True (source side) also adds the stem
+    without a leading و/ف: "وتركيا" matches "تركيا" while "وزير" still matches "الوزير".
+    """
+    out = []
+    for word in _WORD_RE.findall(normalize_claim(text)):
+        if word in STOP_WORDS or word.isdigit() and len(word) < 3:
+            continue
+        stem = light_stem(word)
+        if len(stem) >= 2 and stem not in STOP_WORDS:
+            out.append(stem)
+        if variants and len(word) > 3 and word[0] in _AR_CONJUNCTIONS and not word.startswith(_AR_PREFIXES):
+            bare = light_stem(word[1:])
+            if bare != stem and len(bare) >= 2 and bare not in STOP_WORDS:
+                out.append(bare)
+    return out
+
+
+@lru_cache(maxsize=1024)
+def claim_terms(claim_text: str) -> frozenset:
+    return frozenset(terms(claim_text))
+
+
+def _source_text(source: Dict, snippets: Dict[str, str]) -> str:
+    url = source.get("url") or source.get("link") or ""
+    # مصادر النموذج بلا ملخص (title/url فقط): نستعير ملخص نتيجة البحث ذات الرابط نفسه
+    return f"{source.get('title', '')} {source.get('snippet') or snippets.get(url, '')}"
+
+
+def score_sources(claim_text: str, sources: List[Dict], snippets: Dict[str, str] | None = None) -> List[Dict]:
+    """
+    One entry per source: {"score": BM25, "matched": claim terms found, "coverage": matched / claim terms}.
+    """
+    query = claim_terms(claim_text)
+    docs = [Counter(terms(_source_text(source, snippets or {}), variants=True)) for source in sources]
+    if not docs:
+        return []
+    avg_len = sum(sum(doc.values()) for doc in docs) / len(docs) or 1.0
+    df = Counter(term for doc in docs for term in query if term in doc)
+    idf = {term: math.log(1 + (len(docs) - n + 0.5) / (n + 0.5)) for term, n in df.items()}
+
+    scores = []
+    for doc in docs:
+        length = sum(doc.values())
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len)
+        matched = [term for term in query if term in doc]
+        score = sum(idf[term] * doc[term] * (BM25_K1 + 1) / (doc[term] + norm) for term in matched)
+        scores.append({
+            "score": score,
+            "matched": len(matched),
+            "coverage": len(matched) / len(query) if query else 0.0,
+        })
+    return scores
+
+
+def is_relevant(claim_text: str, scored: Dict) -> bool:
+    """
+    One/two-term claims: one shared term. Longer claims: at least two terms and
+    RELEVANCE_MIN_COVERAGE of them — a single shared word ("السعودية", "هلال" رمضان)
+    is not enough for a four-word claim.
+    """
+    n = len(claim_terms(claim_text))
+    needed = 1 if n <= 2 else max(2, math.ceil(n * RELEVANCE_MIN_COVERAGE))
+    return scored["matched"] >= needed
+
+
+def filter_sources(claim_text: str, sources: List[Dict], results: List[Dict]) -> List[Dict]:
+    """Model sources → unique relevant sources, padded from the search results, at most RELEVANCE_MAX_SOURCES"""
+    snippets = {r.get("link", ""): r.get("snippet", "") for r in results}
+    debug = os.getenv("FACT_DEBUG", "0") == "1"
+    kept, seen_urls = [], set()
+
+    unique = []
+    for source in sources:
+        url = source.get("url", "")
+        if url and url not in seen_urls:
+            unique.append(source)
+            seen_urls.add(url)
+
+    has_terms = bool(claim_terms(claim_text))
+    for source, scored in zip(unique, score_sources(claim_text, unique, snippets)):
+        if has_terms:
+            relevant = is_relevant(claim_text, scored)
+        else:
+            # لا كلمات مفيدة في الادعاء: يكفي أن يكون للمصدر عنوان
+            relevant = bool(source.get("title"))
+        if relevant:
+            kept.append(source)
+        if debug:
+            mark = "✓ Relevant source" if relevant else "✗ Filtered out"
+            print(f"{mark}: {source.get('title', '')[:50]}... (bm25: {scored['score']:.2f}, coverage: {scored['coverage']:.2f})")
+
+    if len(kept) < RELEVANCE_MIN_SOURCES and results:
+        print(f"⚠️ Only {len(kept)} sources after filtering, adding more from search results...")
+        kept_urls = {source.get("url", "") for source in kept}
+        candidates = [r for r in results[:RELEVANCE_MAX_SOURCES] if r.get("link") and r.get("link") not in kept_urls]
+        scored = score_sources(claim_text, candidates)
+        # الأعلى صلة أولاً؛ لا نضيف إلا النتائج التي تجتاز نفس شرط الصلة
+        ranked = sorted(
+            (i for i, s in enumerate(scored) if not has_terms or is_relevant(claim_text, s)),
+            key=lambda i: -scored[i]["score"],
+        )
+        for i in ranked:
+            if len(kept) >= RELEVANCE_PAD_TO:
+                break
+            r = candidates[i]
+            kept.append({"title": r.get("title", ""), "url": r["link"], "snippet": r.get("snippet", "")})
+        print(f"📚 Now have {len(kept)} sources after adding from search results")
+
+    if len(kept) > RELEVANCE_MAX_SOURCES:
+        print(f"📚 Limited sources to top {RELEVANCE_MAX_SOURCES} (from {len(kept)})")
+        kept = kept[:RELEVANCE_MAX_SOURCES]
+    return kept
@@ -0,0 +1,142 @@
+"""
+SerpAPI access shared by the text (fact_check_with_openai) and image (image_fact_check) pipelines.
+
+Every call goes through ``serp_cache`` keyed on (q, hl, gl, num, extra), so repeated
+queries such as "<claim> site:aljazeera.net" do not spend SerpAPI quota again.
+Empty result lists are cached too (negative entries) with a shorter TTL.
+``RequestCounter`` counts the requests a search really sent (cache hits excluded),
+for per-claim accounting such as the speculative search metrics.
+Failed requests are never cached: ``fetch_serp_async`` returns [] for them, or raises
+``SerpAPIError`` with raise_errors=True so callers can tell an outage from zero hits.
+"""
+import os
+import json
+import time
+import hashlib
+from contextvars import ContextVar
+from typing import Awaitable, List, Dict, TypeVar
+
+import aiohttp
+from dotenv import load_dotenv
+
+from . import metrics
+from .cache import TieredCache
+from .http_session import client_session
+from .rate_limit import get_limiter, retry_after, RATE_LIMIT_MAX_WAIT
+
+load_dotenv()
+
+SERPAPI_URL = "https://serpapi.com/search.json"
+SERPAPI_KEY = os.getenv("SERPAPI_KEY")
+SERPAPI_HL = os.getenv("SERPAPI_HL", "ar")
+SERPAPI_GL = os.getenv("SERPAPI_GL", "")
+
+SERP_CACHE_TTL = int(os.getenv("SERP_CACHE_TTL", "21600"))  # 6 ساعات
+SERP_CACHE_NEGATIVE_TTL = int(os.getenv("SERP_CACHE_NEGATIVE_TTL", "600"))  # 10 دقائق للنتائج الفارغة
+SERP_CACHE_MAXSIZE = int(os.getenv("SERP_CACHE_MAXSIZE", "4096"))
+
+serp_cache = TieredCache("serp", maxsize=SERP_CACHE_MAXSIZE, ttl=SERP_CACHE_TTL)
+metrics.register_gauge("serp_cache", lambda: serp_cache.stats())
+
+
+T = TypeVar("T")
+
+# العدّاد النشط في سياق المهمة الحالية (المهام الفرعية من gather ترث نفس العدّاد)
+_request_counter: ContextVar["RequestCounter | None"] = ContextVar("serpapi_request_counter", default=None)
+
+
+class RequestCounter:
+    """SerpAPI requests sent while running ``run(coro)`` — 429 retries included, cache hits excluded"""
+
+    def __init__(self):
+        self.count = 0
+
+    async def run(self, coro: Awaitable[T]) -> T:
+        token = _request_counter.set(self)
+        try:
+            return await coro
+        finally:
+            _request_counter.reset(token)
+
+
+class SerpAPIError(RuntimeError):
+    """A SerpAPI request failed (network, HTTP error, rate-limit wait exceeded)"""
+
+
+def make_serp_key(query: str, hl: str, gl: str, num: int, extra: Dict | None = None) -> str:
+    raw = json.dumps([query, hl, gl, int(num), extra or {}], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def fetch_serp_async(session: aiohttp.ClientSession | None, query: str, extra: Dict | None = None, num: int = 10, raise_errors: bool = False) -> List[Dict]:
+    """
+    session=None → use the process-wide shared session (see http_session.py)
+    raise_errors=True → a failed request raises SerpAPIError instead of returning []
+    """
+    key = make_serp_key(query, SERPAPI_HL, SERPAPI_GL, num, extra)
+    cached = await serp_cache.aget(key)
+    if cached is not None:
+        if not cached:
+            # نتيجة فارغة خدمها الكاش
+            metrics.incr("serpapi.negative_hits")
+        print(f"⚡ SerpAPI cache hit ({len(cached)} results): {query}")
+        return cached
+
+    if session is None:
+        async with client_session() as shared:
+            return await _fetch_and_store(shared, key, query, extra, num, raise_errors)
+    return await _fetch_and_store(session, key, query, extra, num, raise_errors)
+
+
+async def _get_serp_json(session: aiohttp.ClientSession, params: Dict) -> Dict:
+    """GET behind the SerpAPI limiter; HTTP 429 is queued and retried until RATE_LIMIT_MAX_WAIT"""
+    limiter = get_limiter("serpapi")
+    deadline = time.monotonic() + RATE_LIMIT_MAX_WAIT
+    while True:
+        async with limiter.slot(max_wait=max(0.0, deadline - time.monotonic())):
+            metrics.incr("serpapi.requests")
+            counter = _request_counter.get()
+            if counter is not None:
+                counter.count += 1
+            async with session.get(SERPAPI_URL, params=params, timeout=aiohttp.ClientTimeout(total=20)) as response:
+                if response.status == 429 and time.monotonic() < deadline:
+                    limiter.on_throttled(retry_after(response.headers))
+                    continue
+                response.raise_for_status()
+                data = await response.json()
+        limiter.on_success()
+        return data
+
+
+async def _fetch_and_store(session: aiohttp.ClientSession, key: str, query: str, extra: Dict | None, num: int, raise_errors: bool = False) -> List[Dict]:
+    params = {
+        "q": query,
+        "api_key": SERPAPI_KEY,
+        "hl": SERPAPI_HL,
+        "gl": SERPAPI_GL,
+        "num": num
+    }
+    if extra:
+        params.update(extra)
+    try:
+        print(f"🔍 Fetching: {query}")
+        data = await _get_serp_json(session, params)
+        results = []
+        for it in data.get("organic_results", []):
+            results.append({
+                "title": it.get("title") or "",
+                "snippet": it.get("snippet") or (it.get("snippet_highlighted_words", [""]) or [""])[0],
+                "link": it.get("link") or it.get("displayed_link") or "",
+            })
+        print(f"✅ Found {len(results)} results for query: {query}")
+        results = [r for r in results if r["title"] or r["snippet"] or r["link"]]
+    except Exception as e:
+        # الأخطاء لا تُخزَّن حتى تُعاد المحاولة في الطلب التالي
+        metrics.incr("serpapi.errors")
+        print(f"❌ Error fetching from SerpAPI: {e}")
+        if raise_errors:
+            raise SerpAPIError(str(e)) from e
+        return []
+
+    await serp_cache.aset(key, results, ttl=SERP_CACHE_TTL if results else SERP_CACHE_NEGATIVE_TTL)
+    return results
@@ -0,0 +1,145 @@
+"""
+Single-flight coalescing of identical in-flight fact checks.
+
+When a rumor goes viral the same claim arrives many times within a second.
+``SingleFlight.do(key, fn)`` runs ``fn`` once per key; concurrent callers with the
+same key await the leader's result instead of starting their own pipeline.
+
+- In-process: the in-flight map holds ``concurrent.futures.Future`` objects, so
+  callers on different event loops (WSGI threads via async_to_sync) can share them.
+- Across workers (optional, ``FACT_SINGLEFLIGHT_SHARED=1``): the leader takes a lease
+  in the shared cache table (``cache.add`` is atomic). A worker that finds the lease
+  taken polls ``wait_shared()`` (the shared result cache) until the result shows up,
+  the lease disappears, or ``FACT_SINGLEFLIGHT_WAIT`` seconds pass, then runs the
+  pipeline itself if it still has nothing.
+"""
+import os
+import copy
+import time
+import uuid
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from . import metrics
+from .cache import get_shared_backend, SHARED_CACHE_ALIAS
+
+SINGLEFLIGHT_SHARED = os.getenv("FACT_SINGLEFLIGHT_SHARED", "0") == "1"
+SINGLEFLIGHT_LEASE_TTL = int(os.getenv("FACT_SINGLEFLIGHT_LEASE_TTL", "90"))
+SINGLEFLIGHT_WAIT = float(os.getenv("FACT_SINGLEFLIGHT_WAIT", "60"))
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv("FACT_SINGLEFLIGHT_POLL_INTERVAL", "0.5"))
+
+
+def _settle(future: concurrent.futures.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    """set_result / set_exception unless the future is already done (never raises InvalidStateError)"""
+    if future.done():
+        return
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except concurrent.futures.InvalidStateError:
+        pass
+
+
+class SingleFlight:
+    def __init__(self, name: str, shared: bool = SINGLEFLIGHT_SHARED, shared_alias: str = SHARED_CACHE_ALIAS):
+        self.name = name
+        self.shared = shared
+        self.shared_alias = shared_alias
+        self._lock = threading.Lock()
+        self._calls: Dict[str, concurrent.futures.Future] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 wait_shared: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = concurrent.futures.Future()
+                    self._calls[key] = future
+
+            if leader:
+                return await self._lead(key, future, fn, wait_shared)
+
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+            try:
+                # shield: إلغاء هذا المتابع (انقطاع العميل) لا يلغي النتيجة المشتركة
+                result = await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                # الطلب القائد أُلغي (انقطع العميل) → نحاول من جديد بدل أن نفشل معه
+                if future.cancelled():
+                    continue
+                raise
+            return copy.deepcopy(result)
+
+    async def _lead(self, key: str, future: concurrent.futures.Future, fn, wait_shared) -> Any:
+        lease = None
+        try:
+            if self.shared:
+                lease, result = await self._acquire_lease(key, wait_shared)
+                if result is not None:
+                    _settle(future, result=result)
+                    return result
+            result = await fn()
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+            raise
+        except BaseException as e:
+            _settle(future, error=e)
+            raise
+        else:
+            _settle(future, result=result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            if lease is not None:
+                await self._release_lease(*lease)
+
+    def _lease_key(self, key: str) -> str:
+        return f"lease:{self.name}:{key}"
+
+    async def _acquire_lease(self, key: str, wait_shared):
+        """
+        Returns (lease, None) when this worker should run the pipeline,
+        or (None, result) when another worker produced the result meanwhile.
+        Fails open: any cache error means "run it here".
+        """
+        backend = get_shared_backend(self.shared_alias)
+        if backend is None:
+            return None, None
+        lease_key = self._lease_key(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + SINGLEFLIGHT_WAIT
+        try:
+            while True:
+                if await backend.aadd(lease_key, token, timeout=SINGLEFLIGHT_LEASE_TTL):
+                    return (backend, lease_key, token), None
+                metrics.incr(f"singleflight.{self.name}.lease_waits")
+                await asyncio.sleep(SINGLEFLIGHT_POLL_INTERVAL)
+                if wait_shared is not None:
+                    result = await wait_shared()
+                    if result is not None:
+                        metrics.incr(f"singleflight.{self.name}.coalesced_shared")
+                        return None, result
+                if time.monotonic() >= deadline:
+                    return None, None
+        except Exception as e:
+            print(f"⚠️ Single-flight lease unavailable, running locally: {e}")
+            return None, None
+
+    async def _release_lease(self, backend, lease_key: str, token: str) -> None:
+        try:
+            # لا نحذف عقداً انتهت صلاحيته وأخذه عامل آخر
+            if await backend.aget(lease_key) == token:
+                await backend.adelete(lease_key)
+        except Exception as e:
+            print(f"⚠️ Could not release single-flight lease: {e}")
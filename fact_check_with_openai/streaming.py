@@ -0,0 +1,114 @@
+"""
+Helpers for the streaming (server-sent events) fact-check endpoint.
+
+- ``sse_event`` formats one SSE frame.
+- ``JsonStringFieldStream`` decodes string fields of a JSON object while the
+  model is still generating it, so "الحالة" and "talk" can be forwarded to the
+  client before the whole answer (and the sources list) has arrived.
+"""
+import re
+import json
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+# (event name, payload) → awaited by the pipeline at each stage
+EventCallback = Callable[[str, dict], Awaitable[None]]
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+# هامش يُعاد فحصه من نهاية المخزن السابق حتى لا يضيع مفتاح انقسم بين دفعتين
+_KEY_SCAN_MARGIN = 64
+
+
+async def emit(on_event: Optional[EventCallback], name: str, data: dict) -> None:
+    if on_event is not None:
+        await on_event(name, data)
+
+
+def sse_event(name: str, data: dict) -> bytes:
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {name}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class JsonStringFieldStream:
+    """
+    Incrementally decode top-level string fields of a JSON object that arrives in chunks.
+
+    ``feed(chunk)`` returns ``[(field, decoded_delta, closed), ...]`` for every field
+    that made progress. Work per chunk is proportional to the chunk size.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.buffer = ""
+        self.values: Dict[str, str] = {}
+        self._patterns = {f: re.compile(r'"%s"\s*:\s*"' % re.escape(f)) for f in fields}
+        self._pos: Dict[str, int] = {}
+        self._closed = set()
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, bool]]:
+        scan_from = max(0, len(self.buffer) - _KEY_SCAN_MARGIN)
+        self.buffer += chunk
+        progress = []
+        for field, pattern in self._patterns.items():
+            if field in self._closed:
+                continue
+            if field not in self._pos:
+                match = pattern.search(self.buffer, scan_from)
+                if not match:
+                    continue
+                self._pos[field] = match.end()
+                self.values[field] = ""
+            delta, closed = self._decode(field)
+            if delta or closed:
+                self.values[field] += delta
+                progress.append((field, delta, closed))
+        return progress
+
+    def _decode(self, field: str) -> Tuple[str, bool]:
+        buf, i = self.buffer, self._pos[field]
+        out = []
+        closed = False
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                closed = True
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            # تسلسل هروب: ننتظر الدفعة التالية إن كان ناقصاً
+            if i + 1 >= len(buf):
+                break
+            esc = buf[i + 1]
+            if esc != "u":
+                out.append(_ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            if i + 6 > len(buf):
+                break
+            try:
+                code = int(buf[i + 2:i + 6], 16)
+            except ValueError:
+                i += 6
+                continue
+            if 0xD800 <= code <= 0xDBFF:
+                # زوج بديل (إيموجي): نحتاج \uXXXX الثاني قبل إخراج الحرف
+                if i + 12 > len(buf):
+                    break
+                try:
+                    low = int(buf[i + 8:i + 12], 16)
+                except ValueError:
+                    low = 0
+                if buf[i + 6:i + 8] == "\\u" and 0xDC00 <= low <= 0xDFFF:
+                    out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                    i += 12
+                    continue
+                i += 6
+                continue
+            if not 0xDC00 <= code <= 0xDFFF:
+                out.append(chr(code))
+            i += 6
+        self._pos[field] = i
+        if closed:
+            self._closed.add(field)
+        return "".join(out), closed
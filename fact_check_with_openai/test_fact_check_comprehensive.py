@@ -22,7 +22,9 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-from utils_async import check_fact_simple_async
+# utils_async uses package-relative imports, so load it through the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fact_check_with_openai.utils_async import check_fact_simple_async
 
 
 # ==================== TEST CASES ====================
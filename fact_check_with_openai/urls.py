@@ -1,14 +1,20 @@
 from django.urls import path
 from .views import (
     FactCheckWithOpenaiView, 
+    FactCheckStreamView,
+    FactCheckBatchView,
     AnalyticalNewsView,
     ComposeNewsView,
-    ComposeTweetView
+    ComposeTweetView,
+    MetricsView
 )
 
 urlpatterns = [
     path("", FactCheckWithOpenaiView.as_view(), name="fact_check"),
+    path("stream/", FactCheckStreamView.as_view(), name="fact_check_stream"),
+    path("batch/", FactCheckBatchView.as_view(), name="fact_check_batch"),
     path("analytical_news/", AnalyticalNewsView.as_view(), name="analytical-news"),
     path("compose_news/", ComposeNewsView.as_view(), name="compose-news"),
     path("compose_tweet/", ComposeTweetView.as_view(), name="compose-tweet"),
+    path("metrics/", MetricsView.as_view(), name="fact-check-metrics"),
 ]
@@ -1,9 +1,13 @@
-import os, traceback, requests, json
+import os, traceback, requests
 from typing import List, Dict
 from dotenv import load_dotenv
 from openai import OpenAI
 from datetime import datetime
 
+from . import prompts, query_planner, relevance, verdict_schema
+from .evidence import build_context
+from .lang_detect import detect_language, LANG_DETECT_MIN_CONFIDENCE
+
 load_dotenv()
 
 def translate_date_references(text: str) -> str:
@@ -33,7 +37,7 @@ def generate_professional_news_article_from_analysis(claim_text: str, case: str,
         ])
     
     # Determine the prompt based on the case
-    if case.lower() in {"حقيقي", "true", "vrai", "verdadero", "pravda"}:
+    if prompts.case_key(case) == "true":
         # TRUE case - Use the specific prompt for confirmed news
         FACT_CHECK_NEWS_PROMPT = f"""
 You are a senior international news agency journalist writing in {lang.upper()} language.
@@ -105,7 +109,7 @@ Write a professional news article in the style of international news agencies ba
         """
 
     # Create the user message
-    if case.lower() in {"حقيقي", "true", "vrai", "verdadero", "pravda"}:
+    if prompts.case_key(case) == "true":
         user_message = f"""
 **PROVIDED DATA:**
 Headline: {claim_text}
@@ -366,7 +370,7 @@ Generate a single, professional X tweet (max 280 characters) that:
 """
 
     # Prepare context based on fact-check result (only True or Uncertain)
-    if case.lower() in {"حقيقي", "true", "vrai", "verdadero", "pravda"}:
+    if prompts.case_key(case) == "true":
         result_emoji = "✅"
         result_text = "حقيقي" if lang == "ar" else "TRUE"
         tone = "confirming"
@@ -448,6 +452,11 @@ if not SERPAPI_KEY or not OPENAI_API_KEY:
 client = OpenAI(api_key=OPENAI_API_KEY)
 
 def _lang_hint_from_claim(text: str) -> str:
+    # كشف محلي أولاً (بدون شبكة)؛ نلجأ إلى النموذج فقط عند انخفاض الثقة
+    lang, confidence = detect_language(text)
+    if confidence >= LANG_DETECT_MIN_CONFIDENCE:
+        return lang
+
     try:
         resp = client.chat.completions.create(
             model=OPENAI_MODEL,
@@ -585,60 +594,6 @@ def _fetch_serp(query: str, extra: Dict | None = None, num: int = 10) -> List[Di
         print("❌ Error fetching from SerpAPI:", e)
         return []
 
-FACT_PROMPT_SYSTEM = (
-    "You are a rigorous fact-checking assistant. Use ONLY the sources provided below.\n"
-    "- You can ONLY return TWO possible verdicts: True OR Uncertain.\n"
-    "- If the claim is supported by credible sources with clear evidence → verdict: True\n"
-    "- If evidence is insufficient, conflicting, unclear, or off-topic → verdict: Uncertain\n"
-    "- IMPORTANT: There is NO 'False' option. If you cannot confirm something as True, mark it as Uncertain.\n"
-    "- Prefer official catalogs and reputable agencies over blogs or social posts.\n"
-    "- Match the claim's date/place/magnitude when relevant; do not infer beyond the given sources.\n\n"
-
-    "LANGUAGE POLICY:\n"
-    "- You MUST respond **entirely** in the language specified by LANG_HINT.\n"
-    "- Do NOT switch to another language or translate.\n"
-    "- Examples:\n"
-    "   • If LANG_HINT = 'fr' → respond fully in French.\n"
-    "   • If LANG_HINT = 'ar' → respond fully in Arabic.\n"
-    "   • If LANG_HINT = 'en' → respond fully in English.\n"
-    "   • If LANG_HINT = 'es' → respond fully in Spanish.\n"
-    "   • If LANG_HINT = 'cs' → respond fully in Czech.\n\n"
-
-    "FORMAT RULES:\n"
-    "• You MUST write all free-text fields strictly in LANG_HINT language.\n"
-    "• JSON keys must remain EXACTLY as: \"الحالة\", \"talk\", \"sources\" (do not translate keys).\n"
-    "• The value of \"الحالة\" must be ONLY one of these two options (localized):\n"
-    "   - Arabic: حقيقي / غير مؤكد (ONLY these two options)\n"
-    "   - English: True / Uncertain (ONLY these two options)\n"
-    "   - French: Vrai / Incertain (ONLY these two options)\n"
-    "   - Spanish: Verdadero / Incierto (ONLY these two options)\n"
-    "   - Czech: Pravda / Nejisté (ONLY these two options)\n"
-    "• NEVER use: False, Faux, Falso, Nepravda, كاذب - these are NOT valid options!\n"
-
-    "RESPONSE FORMAT (JSON ONLY — no extra text):\n"
-    "{\n"
-    '  \"الحالة\": \"<Localized verdict: True OR Uncertain ONLY>\",\n'
-    '  \"talk\": \"<Explanation paragraph ~350 words in LANG_HINT>\",\n'
-    '  \"sources\": [ {\"title\": \"<title>\", \"url\": \"<url>\"}, ... ]\n'
-    "}\n\n"
-
-    "SOURCES RULES:\n"
-    "1) Include ONLY sources that DIRECTLY support or relate to the claim.\n"
-    "2) Do NOT include unrelated sources, even if they mention similar topics.\n"
-    "3) If a source title/content is NOT relevant to the claim → DO NOT include it.\n"
-    "4) Maximum 10 sources (prioritize the most relevant and credible ones).\n"
-    "5) Remove duplicate URLs - include each source only once.\n"
-    "6) Each source must have both title AND url.\n\n"
-
-    "FINAL RULES:\n"
-    "1) Output STRICTLY valid JSON (UTF-8). No extra commentary before or after.\n"
-    "2) If the claim is Uncertain → keep 'sources' as an empty array [].\n"
-    "3) If the claim is True → include ONLY RELEVANT confirming sources (max 10).\n"
-    "4) Do not fabricate URLs or titles; use only provided sources.\n"
-    "5) REMEMBER: You can ONLY return True or Uncertain. There is NO False option.\n"
-    "6) ONLY include sources that are DIRECTLY related to the specific claim.\n"
-)
-
 
 def check_fact_simple(claim_text: str, k_sources: int = 5, generate_news: bool = False, preserve_sources: bool = False, generate_tweet: bool = False) -> dict:
     try:
@@ -647,23 +602,13 @@ def check_fact_simple(claim_text: str, k_sources: int = 5, generate_news: bool =
         print(f"🧠 Fact-checking: {processed_claim}")
         lang = _lang_hint_from_claim(processed_claim)
 
-        # Collect results from all sources and remove duplicates
-        all_results = []
-        for domain in NEWS_AGENCIES:
-            domain_results = _fetch_serp(f"{processed_claim} site:{domain}", extra={"hl": lang} if lang else None, num=2)
-            all_results.extend(domain_results)
-        google_results = _fetch_serp(processed_claim, extra={"hl": lang} if lang else None, num=k_sources)
-        all_results.extend(google_results)
-        
-        # Remove duplicates based on URL
-        results = []
-        seen_urls = set()
-        for result in all_results:
-            url = result.get("link", "")
-            # Only add if URL is not empty and not seen before
-            if url and url not in seen_urls:
-                results.append(result)
-                seen_urls.add(url)
+        # Collect results from all sources and remove duplicates (plan: query_planner.py)
+        results = query_planner.run_plan(
+            processed_claim,
+            k_sources,
+            lambda query, num: _fetch_serp(query, extra={"hl": lang} if lang else None, num=num),
+            NEWS_AGENCIES,
+        )
 
         print(f"🔎 Total combined results: {len(results)}")
 
@@ -680,15 +625,12 @@ def check_fact_simple(claim_text: str, k_sources: int = 5, generate_news: bool =
             }
             return {"case": "غير مؤكد", "talk": no_results_by_lang.get(lang, no_results_by_lang["en"]), "sources": [], "news_article": None}
 
-        def clip(s: str, n: int) -> str:
-            return s.strip() if len(s) <= n else s[:n] + "…"
-
-        context = "\n\n---\n\n".join(
-            f"عنوان: {clip(r['title'], 100)}\nملخص: {clip(r['snippet'], 200)}\nرابط: {r['link']}"
-            for r in results
-        )
+        # أدلة بلا نسخ مكررة من نفس الخبر، متنوعة المصادر وضمن ميزانية tokens (انظر evidence.py)
+        context, context_stats = build_context(results)
+        print(f"🧾 Evidence: {context_stats['packed']}/{context_stats['entries']} entries, "
+              f"{context_stats['merged']} duplicates merged, ~{context_stats['tokens']} tokens")
 
-        system_prompt = FACT_PROMPT_SYSTEM.replace("LANG_HINT", lang)
+        system_prompt = prompts.system_prompt("verdict", lang)
         user_msg = f"""
 LANG_HINT: {lang}
 CURRENT_DATE: {datetime.now().strftime('%Y-%m-%d')}
@@ -708,93 +650,17 @@ CURRENT_DATE: {datetime.now().strftime('%Y-%m-%d')}
                 {"role": "user", "content": user_msg},
             ],
             temperature=0.2,
-            response_format={"type": "json_object"},
+            response_format=verdict_schema.response_format(lang),
         )
-        answer = (resp.choices[0].message.content or "").strip()
-        if answer.startswith("```"):
-            answer = answer.strip("` \n")
-            if answer.lower().startswith("json"):
-                answer = answer[4:].strip()
-
-        parsed = json.loads(answer)
+        parsed, _ = verdict_schema.parse_verdict(resp.choices[0].message.content or "", lang)
 
         case = parsed.get("الحالة", "غير مؤكد")
         talk = parsed.get("talk", "")
         sources = parsed.get("sources", [])
         
-        # Remove duplicates and irrelevant sources
+        # إزالة المكرر والمصادر غير المتعلقة بالادعاء (انظر relevance.py)
         if sources:
-            unique_sources = []
-            seen_source_urls = set()
-            
-            # Extract key words from claim (ignore common stop words)
-            stop_words = {'في', 'من', 'إلى', 'على', 'عن', 'مع', 'هذا', 'هذه', 'ذلك', 'التي', 'الذي', 
-                         'و', 'أو', 'لكن', 'ف', 'ب', 'ك', 'ل', 'the', 'a', 'an', 'and', 'or', 'but', 'in', 
-                         'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were'}
-            claim_words = set(word.lower() for word in processed_claim.split() if word.lower() not in stop_words and len(word) > 2)
-            
-            for source in sources:
-                source_url = source.get("url", "")
-                source_title = source.get("title", "").lower()
-                source_snippet = source.get("snippet", "").lower()
-                
-                # Skip if URL is empty or already seen
-                if not source_url or source_url in seen_source_urls:
-                    continue
-                
-                # Check if source is relevant to the claim
-                # More strict relevance check: title + snippet should contain meaningful key words
-                title_words = set(word.lower() for word in source_title.split() if word.lower() not in stop_words and len(word) > 2)
-                snippet_words = set(word.lower() for word in source_snippet.split() if word.lower() not in stop_words and len(word) > 2)
-                all_source_words = title_words | snippet_words
-                
-                # Calculate relevance score
-                if claim_words and all_source_words:
-                    common_words = claim_words & all_source_words
-                    relevance_ratio = len(common_words) / len(claim_words) if claim_words else 0
-                    
-                    # More lenient threshold to ensure we get enough sources
-                    # Require at least 20% overlap OR at least 1-2 key words in common
-                    min_common = max(1, int(len(claim_words) * 0.2))
-                    
-                    # Accept if relevance is reasonable (20% or has at least min_common words)
-                    if len(common_words) >= min_common or relevance_ratio >= 0.2:
-                        unique_sources.append(source)
-                        seen_source_urls.add(source_url)
-                        if os.getenv("FACT_DEBUG", "0") == "1":
-                            print(f"✓ Relevant source: {source_title[:50]}... (score: {relevance_ratio:.2f}, common: {len(common_words)})")
-                    else:
-                        if os.getenv("FACT_DEBUG", "0") == "1":
-                            print(f"✗ Filtered out: {source_title[:50]}... (score: {relevance_ratio:.2f}, common: {len(common_words)})")
-                elif len(source_title) > 0:
-                    # If claim has no meaningful words, just check if source has title
-                    unique_sources.append(source)
-                    seen_source_urls.add(source_url)
-            
-            sources = unique_sources
-            
-            # Ensure we have at least 3 sources if available from original results
-            # If we filtered too aggressively and have < 3 sources, add more from results
-            if len(sources) < 3 and len(results) > 0:
-                print(f"⚠️ Only {len(sources)} sources after filtering, adding more from search results...")
-                # Add sources from original results that haven't been added yet
-                for r in results[:10]:
-                    url = r.get("link", "")
-                    if url and url not in seen_source_urls:
-                        sources.append({
-                            "title": r.get("title", ""),
-                            "url": url,
-                            "snippet": r.get("snippet", "")
-                        })
-                        seen_source_urls.add(url)
-                        if len(sources) >= 5:  # Target at least 5 sources
-                            break
-                print(f"📚 Now have {len(sources)} sources after adding from search results")
-            
-            # Limit sources to top 10 to avoid overwhelming response
-            if len(sources) > 10:
-                sources = sources[:10]
-                print(f"📚 Limited sources to top 10 (from {len(unique_sources)})")
+            sources = relevance.filter_sources(processed_claim, sources, results)
 
         uncertain_terms = {
             "ar": {"غير مؤكد"},
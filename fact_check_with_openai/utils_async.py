@@ -1,12 +1,21 @@
-import os, traceback, json
+import os, re, traceback, json
 import asyncio
-import re
-from typing import List, Dict
+from typing import AsyncIterator, Dict, List, Tuple
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 from datetime import datetime
 import aiohttp
 
+from . import metrics, prompts, query_planner, relevance, verdict_schema
+from .cache import result_cache, make_result_key, RESULT_CACHE_NEGATIVE_TTL
+from .search import RequestCounter, SerpAPIError, fetch_serp_async
+from .http_session import client_session
+from .singleflight import SingleFlight
+from .streaming import EventCallback, JsonStringFieldStream, emit
+from .rate_limit import chat_completion, openai_http_client
+from .evidence import build_context
+from .lang_detect import detect_language, LANG_DETECT_MIN_CONFIDENCE
+
 load_dotenv()
 
 def translate_date_references(text: str) -> str:
@@ -22,153 +31,19 @@ async def generate_professional_news_article_from_analysis_async(claim_text: str
     Generate a professional news article based on fact-check analysis and sources
     Uses the analysis (talk) and sources to create a balanced, journalistic piece
     """
-    
-    # Prepare sources context
-    if not sources:
-        sources_context = "No specific sources available for this investigation."
-    else:
-        sources_context = "\n\n".join([
-            f"**Source {i+1}:**\n"
-            f"Title: {source.get('title', 'N/A')}\n"
-            f"URL: {source.get('url', 'N/A')}\n"
-            f"Snippet: {source.get('snippet', 'N/A')}"
-            for i, source in enumerate(sources[:5])  # Limit to 5 sources
-        ])
-    
-    # Determine the prompt based on the case
-    if case.lower() in {"حقيقي", "true", "vrai", "verdadero", "pravda"}:
-        # TRUE case - Use the specific prompt for confirmed news
-        FACT_CHECK_NEWS_PROMPT = f"""
-You are a senior international news agency journalist writing in {lang.upper()} language.
-
-Write a professional news article in the style of international news agencies based on the provided headline and analysis.
-
-**MANDATORY REQUIREMENT:**
-- You MUST write about the headline and analysis provided in the user message
-- Extract ALL facts and details from the Fact-check Analysis provided by the user
-- Do NOT create unrelated news - only use information from the provided analysis
-- The headline is: "{claim_text}"
-- Use the analysis to write the news article about this specific headline
-
-**CRITICAL INSTRUCTIONS FOR TRUE NEWS:**
-- Start DIRECTLY with the news event/statement itself (e.g., "أرسلت [الدولة/الهيئة]..." or "[Entity] sent...")
-- Write as a DIRECT NEWS REPORT, NOT as analysis or verification
-- First paragraph: Report the main event naturally with details (who, what, when, where, participants, etc.) based on the provided analysis
-- Second paragraph: Discuss the topics, themes, or issues that were addressed/covered, using details from the analysis
-- Third paragraph: Provide additional context about sessions, discussions, or highlights from the analysis
-- AVOID any mention of "verification", "fact-check", "results", "تحقق", "نتائج التحقق" anywhere in the article
-- Write naturally and smoothly as if reporting events as they happened
-- Mention official sources and statements naturally from the analysis provided
-
-**STRUCTURE TEMPLATE FOR TRUE NEWS:**
-1. **Opening Paragraph**: Start directly with the event from the headline (e.g., "أرسلت [الدولة]..." or "[Entity] sent...") with key details from the analysis
-2. **Second Paragraph**: Discuss the details, quantities, beneficiaries, or specific information from the analysis
-3. **Third Paragraph**: Additional context about significance, continuation, or broader implications from the analysis
-
-**REQUIREMENTS:**
-- Language: {lang.upper()} entirely
-- Style: Professional news reporting (like AFP, Reuters, AP)
-- Tone: Neutral, factual, authoritative
-- Structure: Exactly 3 paragraphs following the template above
-- Length: 150-250 words
-- Must follow the exact structure template
-- Use professional journalistic language
-- NO mention of verification or fact-checking
-"""
-    else:
-        # UNCERTAIN case - Use the specific prompt for unconfirmed news
-        FACT_CHECK_NEWS_PROMPT = f"""
-You are a senior international news agency journalist writing in {lang.upper()} language.
-
-Write a professional news article in the style of international news agencies based on the provided headline and analysis.
-
-**CRITICAL INSTRUCTIONS FOR UNCERTAIN NEWS:**
-- Start with: "تداولت منصات التواصل الاجتماعي مزاعم تفيد بأن [الادعاء]" (or equivalent in the target language)
-- Follow immediately with: "غير أن نتائج التحقق أظهرت أن هذا الادعاء لا يمكن تأكيده" (or equivalent: "However, verification results showed that this claim cannot be confirmed")
-- Then explain the available information and why the claim cannot be confirmed
-- Provide historical context or relevant background information if available
-- End with a clear conclusion that the claim lacks reliable evidence
-
-**STRUCTURE TEMPLATE:**
-1. **Opening**: "تداولت منصات التواصل الاجتماعي مزاعم تفيد بأن [الادعاء]، غير أن نتائج التحقق أظهرت أن هذا الادعاء لا يمكن تأكيده."
-2. **Body**: Explain available information, historical context, and evidence that contradicts or doesn't support the claim
-3. **Conclusion**: "وبناءً على ذلك، يتبيّن أن الادعاء المتداول يفتقر إلى أي أساس من الأدلة الموثوقة، ولا توجد مصادر تدعم صحته."
-
-**REQUIREMENTS:**
-- Language: {lang.upper()} entirely
-- Style: Professional news reporting
-- Tone: Objective, transparent, informative
-- Structure: News article format with structured paragraphs
-- Length: 150-250 words
-- Must follow the exact structure template above
-- Use professional journalistic language
-"""
-    
-    # Create the user message
-    if case.lower() in {"حقيقي", "true", "vrai", "verdadero", "pravda"}:
-        user_message = f"""
-**PROVIDED DATA:**
-Headline: {claim_text}
-Fact-check Analysis: {talk}
-
-**AVAILABLE SOURCES:**
-{sources_context}
-
-**EXAMPLE FORMAT FOR TRUE NEWS (ARABIC):**
-أرسلت دولة قطر مساعدات إغاثية وإنسانية عاجلة إلى مدينة الدبة في الولاية الشمالية بجمهورية السودان، في إطار التزامها الثابت بدعم الشعب السوداني، لا سيما في ظل الظروف الإنسانية الصعبة التي يعيشها المدنيون من نقص حاد في الغذاء واحتياج متزايد لمستلزمات الإيواء والمواد الأساسية.
-
-وتشمل المساعدات نحو 3 آلاف سلة غذائية و1650 خيمة إيواء ومستلزمات أخرى، مقدمة من صندوق قطر للتنمية وقطر الخيرية، لدعم النازحين من مدينة الفاشر والمناطق المجاورة، ومن المقرر أن يستفيد منها أكثر من 50 ألف شخص، فضلا عن إنشاء مخيم خاص بالمساعدات القطرية تحت مسمى قطر الخير.
-
-ويعد هذا الدعم امتدادا لجهود دولة قطر المتواصلة في الوقوف إلى جانب الشعب السوداني الشقيق وتخفيف معاناته جراء النزاع المسلح، كما يجسد دورها الريادي في تعزيز الاستجابة الإنسانية وبناء جسور التضامن مع الشعوب المتضررة في مختلف أنحاء العالم.
-
-**CRITICAL REQUIREMENTS:**
-- The news article MUST be about the headline provided: "{claim_text}"
-- You MUST use ALL the information from the Fact-check Analysis provided below
-- The Fact-check Analysis contains the actual facts and details - extract them and write the news article based on them
-- Do NOT invent or create unrelated news - only use information from the analysis
-- Follow the exact structure shown in the example above
-- First paragraph: Start directly with the event from the headline (who, what, when, where, participants) using details from the analysis
-- Second paragraph: Discuss the details, quantities, beneficiaries, or specific information from the analysis
-- Third paragraph: Additional context about significance, continuation, or broader implications from the analysis
-- Write as a direct news report, NOT as verification or fact-check
-- AVOID any mention of "verification", "fact-check", "results", "تحقق", "نتائج التحقق"
-- Use the analysis data to inform your reporting, but present it as breaking news
-- The article MUST be relevant to the headline: "{claim_text}"
-- Adapt the structure to the target language ({lang.upper()}) while maintaining the same meaning
-"""
-    else:
-        user_message = f"""
-**PROVIDED DATA:**
-Headline: {claim_text}
-Fact-check Analysis: {talk}
-
-**AVAILABLE SOURCES:**
-{sources_context}
-
-**EXAMPLE FORMAT FOR UNCERTAIN NEWS (ARABIC):**
-تداولت منصات التواصل الاجتماعي مزاعم تفيد بأن [الادعاء]، غير أن نتائج التحقق أظهرت أن هذا الادعاء لا يمكن تأكيده.
-
-وبحسب المعلومات المتاحة، [شرح المعلومات المتاحة والسبب في عدم التأكيد]. [معلومات تاريخية أو سياق إذا كان متاحاً].
-
-وبناءً على ذلك، يتبيّن أن الادعاء المتداول يفتقر إلى أي أساس من الأدلة الموثوقة، ولا توجد مصادر تدعم صحته.
-
-**INSTRUCTIONS:**
-- Follow the exact structure shown in the example above
-- Use the analysis data to explain why the claim cannot be confirmed
-- Include historical context or relevant background when available
-- End with the conclusion that the claim lacks reliable evidence
-- Adapt the structure to the target language ({lang.upper()}) while maintaining the same meaning
-"""
-    
+    # الجزء الثابت (حسب اللغة والحالة) في رسالة النظام، والبيانات المتغيرة في النهاية (انظر prompts.py)
+    messages = [
+        {"role": "system", "content": prompts.system_prompt("news_article", lang, case)},
+        {"role": "user", "content": prompts.news_user_message(claim_text, talk, sources)},
+    ]
+
     try:
         print("📰 Generating news article...")
         
-        response = await client.chat.completions.create(
+        response = await chat_completion(
+            client,
             model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": FACT_CHECK_NEWS_PROMPT},
-                {"role": "user", "content": user_message}
-            ],
+            messages=messages,
             temperature=0.1,  # Very low temperature for factual, measured content
             max_tokens=400,   # Allow enough tokens for 150-250 words
             top_p=0.9,        # Focus on most likely responses
@@ -176,6 +51,7 @@ Fact-check Analysis: {talk}
             presence_penalty=0.1    # Encourage diverse vocabulary
         )
         
+        prompts.record_usage("news_article", getattr(response, "usage", None))
         article = response.choices[0].message.content.strip()
         print("✅ News article generated successfully")
         return article
@@ -195,106 +71,18 @@ async def generate_x_tweet_async(claim_text: str, case: str, talk: str, sources:
     Generate a professional X (Twitter) tweet based on fact-check results
     Optimized for X platform with proper formatting and engagement
     """
-    
-    # X/Twitter specific prompt
-    X_TWEET_PROMPT = f"""
-You are a professional social media journalist and X (Twitter) content creator with expertise in:
-
-**X PLATFORM EXPERTISE:**
-1. **Social Media Journalist**: Create engaging, accurate news content for X
-2. **Viral Content Creator**: Understand what drives engagement on X
-3. **Fact-Checking Specialist**: Present verified information clearly
-4. **Crisis Communication**: Handle sensitive information responsibly
-5. **Community Manager**: Engage audiences while maintaining credibility
-6. **Digital Storyteller**: Tell compelling stories in limited characters
-7. **Breaking News Reporter**: Handle urgent, time-sensitive information
-8. **Public Interest Communicator**: Serve public interest on social media
-
-**X PLATFORM REQUIREMENTS:**
-- Maximum 280 characters (strict limit)
-- Use hashtags strategically (2-3 relevant hashtags)
-- Include emojis appropriately for engagement
-- Write for mobile-first audience
-- Use clear, concise language
-- Include call-to-action when appropriate
-- Maintain professional credibility
-- Respect X community guidelines
-
-**TWEET STRUCTURE FOR FACT-CHECKING:**
-1. **Hook**: Attention-grabbing opening
-2. **Fact**: Clear statement of the fact-check result
-3. **Context**: Brief explanation or key detail
-4. **Hashtags**: Relevant, trending hashtags
-5. **Emojis**: Strategic use for engagement and clarity
-
-**LANGUAGE POLICY:**
-- Write ENTIRELY in {lang.upper()} language
-- Use professional but engaging tone
-- Adapt to social media communication style
-- Maintain journalistic credibility
-- Use appropriate emojis for the language/culture
-
-**ENGAGEMENT STRATEGY:**
-- Start with compelling hook
-- Use numbers/statistics when available
-- Include relevant hashtags
-- Use emojis strategically
-- End with clear conclusion or call-to-action
-- Maintain professional credibility
-
-**RESPONSE FORMAT:**
-Generate a single, professional X tweet (max 280 characters) that:
-- Clearly states the fact-check result
-- Engages the audience appropriately
-- Maintains journalistic credibility
-- Uses relevant hashtags and emojis
-- Respects X platform guidelines
-"""
-
-    # Prepare context based on fact-check result (only True or Uncertain)
-    if case.lower() in {"حقيقي", "true", "vrai", "verdadero", "pravda"}:
-        result_emoji = "✅"
-        result_text = "حقيقي" if lang == "ar" else "TRUE"
-        tone = "confirming"
-    else:  # uncertain
-        result_emoji = "⚠️"
-        result_text = "غير مؤكد" if lang == "ar" else "UNCERTAIN"
-        tone = "uncertain"
-
-    # Create the user message
-    user_message = f"""
-**FACT-CHECK RESULT:**
-Claim: {claim_text}
-Result: {case} ({result_text})
-Analysis: {talk}
-
-**SOURCES:**
-{len(sources)} sources available
-
-**INSTRUCTIONS:**
-Create a professional X tweet that:
-1. Clearly communicates the fact-check result
-2. Engages the audience appropriately
-3. Uses relevant hashtags and emojis
-4. Maintains journalistic credibility
-5. Respects X platform guidelines
-6. Stays within 280 character limit
-
-**TONE:** {tone}
-**LANGUAGE:** {lang.upper()}
-**PLATFORM:** X (Twitter)
-**CHARACTER LIMIT:** 280 characters maximum
-"""
+    messages = [
+        {"role": "system", "content": prompts.system_prompt("x_tweet", lang, case)},
+        {"role": "user", "content": prompts.tweet_user_message(claim_text, case, talk, sources, lang)},
+    ]
 
     try:
         print("🐦 Generating X tweet...")
         
-        response = await client.chat.completions.create(
+        response = await chat_completion(
+            client,
             model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": X_TWEET_PROMPT},
-                {"role": "user", "content": user_message}
-            ],
+            messages=messages,
             temperature=0.3,  # Balanced creativity and accuracy
             max_tokens=100,   # Optimized for tweet length (280 chars max)
             top_p=0.9,
@@ -302,6 +90,7 @@ Create a professional X tweet that:
             presence_penalty=0.1
         )
         
+        prompts.record_usage("x_tweet", getattr(response, "usage", None))
         tweet = response.choices[0].message.content.strip()
         
         # Ensure tweet is within character limit
@@ -327,16 +116,30 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 SERPAPI_HL = os.getenv("SERPAPI_HL", "ar")
 SERPAPI_GL = os.getenv("SERPAPI_GL", "")
 NEWS_AGENCIES = [d.strip() for d in os.getenv("NEWS_AGENCIES", "aljazeera.net,una-oic.org,bbc.com").split(",") if d.strip()]
+# بدء البحث بالتوازي مع الفحص الأولي بدلاً من انتظاره
+SPECULATIVE_SEARCH = os.getenv("FACT_SPECULATIVE_SEARCH", "0") == "1"
+
+BATCH_CONCURRENCY = int(os.getenv("FACT_BATCH_CONCURRENCY", "5"))
+BATCH_MAX_ITEMS = int(os.getenv("FACT_BATCH_MAX_ITEMS", "200"))
+
+fact_flight = SingleFlight("fact_check")
+metrics.register_gauge("singleflight_in_flight", lambda: fact_flight.in_flight())
 
 if not SERPAPI_KEY or not OPENAI_API_KEY:
     raise RuntimeError("⚠️ رجاءً ضع SERPAPI_KEY و OPENAI_API_KEY في .env")
 
 # Create async OpenAI client
-async_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+async_client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=openai_http_client())
 
 async def _lang_hint_from_claim_async(text: str) -> str:
+    # كشف محلي أولاً (بدون شبكة)؛ نلجأ إلى النموذج فقط عند انخفاض الثقة
+    lang, confidence = detect_language(text)
+    if confidence >= LANG_DETECT_MIN_CONFIDENCE:
+        return lang
+
     try:
-        resp = await async_client.chat.completions.create(
+        resp = await chat_completion(
+            async_client,
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "Detect the input language and return ONLY its ISO 639-1 code (like ar, en, fr, es, de)."},
@@ -356,222 +159,166 @@ async def _lang_hint_from_claim_async(text: str) -> str:
     ratio = ar_count / max(1, len(text))
     return "ar" if ratio >= 0.15 else "en"
 
-async def is_news_content_async(text: str) -> tuple[bool, str]:
+TRIAGE_PROMPT_SYSTEM = (
+    "You triage input for a FACT-CHECKING API. Decide whether the input is a news claim/statement "
+    "that can be fact-checked, and detect its language.\n"
+    "ACCEPT (is_news=true): declarative statements or headlines about events, people, places, projects, "
+    "politics, economy, sports, accidents, crimes, deaths, announcements, rumors or hoaxes — true or false. "
+    "Examples: \"مقتل ترامب\", \"زلزال يضرب تركيا\", \"فوز الهلال بالدوري\", \"وزير الخارجية يستقيل\".\n"
+    "REJECT (is_news=false): questions asking for opinions or information, how-to guides and recipes, "
+    "greetings and casual chat, tutorials, advice requests, general knowledge questions. "
+    "Examples: \"ما رأيك في الطقس اليوم؟\", \"كيف الطقس اليوم؟\", \"طريقة عمل المحشي\", \"مرحبا، كيف حالك؟\".\n"
+    "KEY TEST: is it a STATEMENT/CLAIM about something that happened or will happen? If yes → accept.\n"
+    "Reply with JSON only: "
+    '{"is_news": true|false, "reason": "<short reason in Arabic, empty when accepted>", "lang": "<ISO 639-1 code of the input>"}'
+)
+
+
+_LANG_CODE_RE = re.compile(r"[a-z]{2}")
+
+
+async def triage_claim_async(text: str) -> dict:
     """
-    Validate if the input text is news/journalistic content (async version).
-    Returns (is_valid, reason) tuple.
-    If not news-related, returns (False, reason in Arabic).
+    فحص أولي واحد يجمع التحقق من أن النص خبري مع كشف اللغة في استدعاء قصير واحد.
+    Returns {"is_news": bool, "reason": str, "lang": str}.
     """
     try:
-        validation_prompt = """You are a news content validator for a FACT-CHECKING API. Your job is to distinguish between NEWS CLAIMS/STATEMENTS and non-news content.
-
-⚠️ KEY DISTINCTION: Accept STATEMENTS/CLAIMS about events, NOT personal questions asking for opinions or information.
-
-✅ ACCEPT (News Claims/Statements - Declarative sentences):
-- STATEMENTS about events (e.g., "مقتل ترامب" = YES - it's a claim/statement)
-- CLAIMS that something happened or will happen
-- NEWS HEADLINES or STATEMENTS (true or false, verified or rumor)
-- Declarative sentences about events, people, places
-- ANY CLAIM that can be fact-checked (rumor, hoax, news, announcement)
-- Government announcements, official projects
-- Political events, diplomatic news
-- Economic news, business developments
-- Accidents, crimes, incidents, deaths
-- Sports events, results, announcements
-- Celebrity news, scandals, events
-- Breaking news, viral claims, rumors
-
-❌ REJECT (Non-news content):
-- QUESTIONS asking for opinions (e.g., "ما رأيك في الطقس اليوم؟" = NO - asking for opinion)
-- QUESTIONS asking for information (e.g., "كيف الطقس اليوم؟" = NO - general inquiry)
-- How-to guides, recipes (e.g., "طريقة عمل المحشي" = NO)
-- Casual conversations, greetings ("مرحبا، كيف حالك؟" = NO)
-- Educational tutorials ("كيف أتعلم البرمجة" = NO)
-- Personal questions without specific claim
-- Philosophical discussions without news context
-- General knowledge questions
-- Requests for advice or tips
-
-🔑 THE KEY TEST: Is it a STATEMENT/CLAIM about something that happened or will happen?
-- If YES → ACCEPT (it can be fact-checked)
-- If it's a QUESTION asking for opinion/info → REJECT (not a claim)
-
-EXAMPLES - ACCEPT ✅:
-- "مقتل ترامب" → YES (statement/claim about an event)
-- "ترامب توفي اليوم" → YES (statement/claim)
-- "زلزال يضرب تركيا" → YES (statement about event)
-- "إنشاء قطار يربط الدوحة بالرياض" → YES (statement about project)
-- "حريق في مبنى برج خليفة" → YES (statement about incident)
-- "فوز الهلال بالدوري" → YES (statement about result)
-- "وزير الخارجية يستقيل" → YES (statement about event)
-
-EXAMPLES - REJECT ❌:
-- "ما رأيك في الطقس اليوم؟" → NO (question asking for opinion)
-- "كيف الطقس اليوم؟" → NO (question asking for information)
-- "هل تعتقد أن الاقتصاد سيتحسن؟" → NO (opinion question)
-- "طريقة عمل المحشي" → NO (how-to/recipe)
-- "كيف أتعلم البرمجة" → NO (educational question)
-- "مرحبا، كيف حالك؟" → NO (casual greeting)
-- "ما هي أفضل طريقة للسفر؟" → NO (advice question)
-
-⚠️ CRITICAL: A CLAIM/STATEMENT can be fact-checked. A QUESTION asking for opinion/info cannot.
-
-Respond with ONLY one word: "yes" if it's a news claim/statement, "no" if it's not.
-Then on a new line, provide a brief reason in Arabic explaining your decision."""
-
-        resp = await async_client.chat.completions.create(
+        resp = await chat_completion(
+            async_client,
             model=OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": validation_prompt},
+                {"role": "system", "content": TRIAGE_PROMPT_SYSTEM},
                 {"role": "user", "content": text.strip()},
             ],
-            temperature=0.1,
-            max_tokens=100
+            temperature=0.0,
+            max_tokens=60,
+            response_format={"type": "json_object"},
         )
-        
-        answer = (resp.choices[0].message.content or "").strip().lower()
-        lines = answer.split('\n', 1)
-        is_valid = lines[0].strip() == "yes"
-        reason = lines[1].strip() if len(lines) > 1 else ""
-        
-        if not is_valid:
-            return (False, reason or "النص المقدم لا يتعلق بالأخبار أو السياق الصحفي")
-        return (True, "")
-        
+        prompts.record_usage("triage", getattr(resp, "usage", None))
+        data = json.loads(resp.choices[0].message.content or "{}")
+        is_news = data.get("is_news", True)
+        if isinstance(is_news, str):
+            is_news = is_news.strip().lower() in {"true", "yes"}
+        reason = (data.get("reason") or "").strip()
+        lang = (data.get("lang") or "").strip().lower()
     except Exception as e:
         # On error, allow through but log it
-        print(f"⚠️ Error validating news content: {e}")
-        return (True, "")  # Allow through on error to avoid blocking valid requests
-
-async def _fetch_serp_async(session: aiohttp.ClientSession, query: str, extra: Dict | None = None, num: int = 10) -> List[Dict]:
-    url = "https://serpapi.com/search.json"
-    params = {
-        "q": query,
-        "api_key": SERPAPI_KEY,
-        "hl": SERPAPI_HL,
-        "gl": SERPAPI_GL,
-        "num": num
-    }
-    if extra:
-        params.update(extra)
-    try:
-        print(f"🔍 Fetching: {query}")
-        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=20)) as response:
-            response.raise_for_status()
-            data = await response.json()
-            results = []
-            for it in data.get("organic_results", []):
-                results.append({
-                    "title": it.get("title") or "",
-                    "snippet": it.get("snippet") or (it.get("snippet_highlighted_words", [""]) or [""])[0],
-                    "link": it.get("link") or it.get("displayed_link") or "",
-                })
-            print(f"✅ Found {len(results)} results for query: {query}")
-            return [r for r in results if r["title"] or r["snippet"] or r["link"]]
-    except Exception as e:
-        print(f"❌ Error fetching from SerpAPI: {e}")
-        return []
-
-FACT_PROMPT_SYSTEM = (
-    "You are a rigorous fact-checking assistant. Use ONLY the sources provided below.\n"
-    "- You can ONLY return TWO possible verdicts: True OR Uncertain.\n"
-    "- If the claim is supported by credible sources with clear evidence → verdict: True\n"
-    "- If evidence is insufficient, conflicting, unclear, or off-topic → verdict: Uncertain\n"
-    "- IMPORTANT: There is NO 'False' option. If you cannot confirm something as True, mark it as Uncertain.\n"
-    "- Prefer official catalogs and reputable agencies over blogs or social posts.\n"
-    "- Match the claim's date/place/magnitude when relevant; do not infer beyond the given sources.\n\n"
-
-    "LANGUAGE POLICY:\n"
-    "- You MUST respond **entirely** in the language specified by LANG_HINT.\n"
-    "- Do NOT switch to another language or translate.\n"
-    "- Examples:\n"
-    "   • If LANG_HINT = 'fr' → respond fully in French.\n"
-    "   • If LANG_HINT = 'ar' → respond fully in Arabic.\n"
-    "   • If LANG_HINT = 'en' → respond fully in English.\n"
-    "   • If LANG_HINT = 'es' → respond fully in Spanish.\n"
-    "   • If LANG_HINT = 'cs' → respond fully in Czech.\n\n"
-
-    "FORMAT RULES:\n"
-    "• You MUST write all free-text fields strictly in LANG_HINT language.\n"
-    "• JSON keys must remain EXACTLY as: \"الحالة\", \"talk\", \"sources\" (do not translate keys).\n"
-    "• The value of \"الحالة\" must be ONLY one of these two options (localized):\n"
-    "   - Arabic: حقيقي / غير مؤكد (ONLY these two options)\n"
-    "   - English: True / Uncertain (ONLY these two options)\n"
-    "   - French: Vrai / Incertain (ONLY these two options)\n"
-    "   - Spanish: Verdadero / Incierto (ONLY these two options)\n"
-    "   - Czech: Pravda / Nejisté (ONLY these two options)\n"
-    "• NEVER use: False, Faux, Falso, Nepravda, كاذب - these are NOT valid options!\n"
-
-    "RESPONSE FORMAT (JSON ONLY — no extra text):\n"
-    "{\n"
-    '  \"الحالة\": \"<Localized verdict: True OR Uncertain ONLY>\",\n'
-    '  \"talk\": \"<Explanation paragraph ~350 words in LANG_HINT>\",\n'
-    '  \"sources\": [ {\"title\": \"<title>\", \"url\": \"<url>\"}, ... ]\n'
-    "}\n\n"
-
-    "SOURCES RULES:\n"
-    "1) Include ONLY sources that DIRECTLY support or relate to the claim.\n"
-    "2) Do NOT include unrelated sources, even if they mention similar topics.\n"
-    "3) If a source title/content is NOT relevant to the claim → DO NOT include it.\n"
-    "4) Maximum 10 sources (prioritize the most relevant and credible ones).\n"
-    "5) Remove duplicate URLs - include each source only once.\n"
-    "6) Each source must have both title AND url.\n\n"
-
-    "FINAL RULES:\n"
-    "1) Output STRICTLY valid JSON (UTF-8). No extra commentary before or after.\n"
-    "2) If the claim is Uncertain → keep 'sources' as an empty array [].\n"
-    "3) If the claim is True → include ONLY RELEVANT confirming sources (max 10).\n"
-    "4) Do not fabricate URLs or titles; use only provided sources.\n"
-    "5) REMEMBER: You can ONLY return True or Uncertain. There is NO False option.\n"
-    "6) ONLY include sources that are DIRECTLY related to the specific claim.\n"
-)
+        print(f"⚠️ Error in claim triage: {e}")
+        is_news, reason, lang = True, "", ""
+
+    # النموذج قرأ النص كاملاً: لغته هي المعتمدة، والكاشف المحلي للاحتياط فقط (رمز مفقود/غير صالح أو خطأ)
+    if not _LANG_CODE_RE.fullmatch(lang):
+        lang = detect_language(text)[0]
 
+    if not is_news:
+        return {"is_news": False, "reason": reason or "النص المقدم لا يتعلق بالأخبار أو السياق الصحفي", "lang": lang}
+    return {"is_news": True, "reason": "", "lang": lang}
 
-async def check_fact_simple_async(claim_text: str, k_sources: int = 5, generate_news: bool = False, preserve_sources: bool = False, generate_tweet: bool = False) -> dict:
+
+async def is_news_content_async(text: str) -> tuple[bool, str]:
+    """
+    Validate if the input text is news/journalistic content (async version).
+    Returns (is_valid, reason) tuple.
+    If not news-related, returns (False, reason in Arabic).
+    """
+    triage = await triage_claim_async(text)
+    return (triage["is_news"], triage["reason"])
+
+async def _fetch_serp_async(session: aiohttp.ClientSession | None, query: str, extra: Dict | None = None, num: int = 10, raise_errors: bool = False) -> List[Dict]:
+    # الكاش والعدادات مشتركة مع image_fact_check (انظر search.py)
+    return await fetch_serp_async(session, query, extra=extra, num=num, raise_errors=raise_errors)
+
+
+async def search_claim_async(claim_text: str, k_sources: int = 5, session: aiohttp.ClientSession | None = None) -> List[Dict]:
+    """
+    البحث عن الادعاء حسب خطة FACT_SEARCH_PLAN (انظر query_planner.py):
+    بحث عام + تغطية NEWS_AGENCIES، ثم دمج النتائج وإزالة المكرر حسب الرابط
+    Raises SerpAPIError when there are no results because the requests failed.
+    """
+    if session is None:
+        async with client_session() as shared:
+            return await search_claim_async(claim_text, k_sources, shared)
+
+    failures: List[SerpAPIError] = []
+
+    async def fetch(query: str, num: int) -> List[Dict]:
+        try:
+            return await _fetch_serp_async(session, query, extra=None, num=num, raise_errors=True)
+        except SerpAPIError as e:
+            failures.append(e)
+            return []
+
+    results = await query_planner.run_plan_async(claim_text, k_sources, fetch, NEWS_AGENCIES)
+    if not results and failures:
+        # صفر نتائج بسبب تعطل البحث ليس "لا نتائج": لا يصل إلى حكم يُخزَّن
+        raise failures[0]
+    return results
+
+
+async def _stream_verdict_async(messages: List[Dict], lang: str, on_event: EventCallback) -> str:
+    """
+    Same request as the non-streaming verdict call, but with stream=True:
+    emits "case" once the verdict string is complete and "talk" deltas as they arrive.
+    Returns the full answer text for the normal parsing path.
+    """
+    fields = JsonStringFieldStream(("الحالة", "talk"))
+    stream = await chat_completion(
+        async_client,
+        model=OPENAI_MODEL,
+        messages=messages,
+        temperature=0.2,
+        max_tokens=800,
+        response_format=verdict_schema.response_format(lang),
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    # async with: إن انقطع العميل أثناء on_event يُغلق البث وتتحرر خانة المحدِّد فوراً
+    async with stream:
+        async for chunk in stream:
+            if not chunk.choices:
+                # آخر دفعة: usage فقط (stream_options.include_usage)
+                prompts.record_usage("verdict", getattr(chunk, "usage", None))
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            for field, text, closed in fields.feed(delta):
+                if field == "talk" and text:
+                    await on_event("talk", {"delta": text})
+                elif field == "الحالة" and closed:
+                    await on_event("case", {"case": fields.values[field]})
+    return fields.buffer
+
+
+async def check_fact_simple_async(claim_text: str, k_sources: int = 5, generate_news: bool = False, preserve_sources: bool = False, generate_tweet: bool = False, lang: str | None = None, search_results: List[Dict] | None = None, on_event: EventCallback | None = None) -> dict:
+    """
+    lang: لغة الادعاء إن كانت معروفة مسبقاً (مثلاً من triage_claim_async) لتجنب كشفها مرة أخرى
+    search_results: نتائج بحث جاهزة (من البحث الاستباقي) بدل البحث من جديد
+    on_event: يُستدعى عند انتهاء كل مرحلة (search, case, talk, verdict, news_article, x_tweet)
+              للواجهة المتدفقة؛ عند تمريره يُطلب الحكم من OpenAI كـ stream
+    """
     try:
         # ترجمة المراجع الزمنية في النص
         processed_claim = translate_date_references(claim_text)
         print(f"🧠 Fact-checking: {processed_claim}")
-        
-        # Create aiohttp session for parallel HTTP requests
-        async with aiohttp.ClientSession() as session:
-            # Run language detection and searches in parallel for maximum speed
-            lang_task = _lang_hint_from_claim_async(processed_claim)
-            
-            # Prepare all search queries (start immediately without waiting for language)
-            search_tasks = []
-            
-            # Add news agency searches
-            for domain in NEWS_AGENCIES:
-                search_tasks.append(
-                    _fetch_serp_async(session, f"{processed_claim} site:{domain}", extra=None, num=2)
-                )
-            
-            # Add general Google search
-            search_tasks.append(
-                _fetch_serp_async(session, processed_claim, extra=None, num=k_sources)
+
+        # Run language detection (only if not already known) and searches in parallel for maximum speed
+        if search_results is not None:
+            results = search_results
+            if not lang:
+                lang = await _lang_hint_from_claim_async(processed_claim)
+        elif lang:
+            results = await search_claim_async(processed_claim, k_sources)
+        else:
+            print("🚀 Running language detection + searches in parallel...")
+            lang, results = await asyncio.gather(
+                _lang_hint_from_claim_async(processed_claim),
+                search_claim_async(processed_claim, k_sources),
             )
-            
-            # Execute language detection and all searches in parallel
-            print(f"🚀 Running language detection + {len(search_tasks)} parallel search queries...")
-            all_results = await asyncio.gather(lang_task, *search_tasks)
-            
-            # Extract language and search results
-            lang = all_results[0]
-            search_results = all_results[1:]
-            
-            # Combine all results and remove duplicates based on URL
-            results = []
-            seen_urls = set()
-            for result_list in search_results:
-                for result in result_list:
-                    url = result.get("link", "")
-                    # Only add if URL is not empty and not seen before
-                    if url and url not in seen_urls:
-                        results.append(result)
-                        seen_urls.add(url)
 
         print(f"🔎 Total combined results: {len(results)}")
+        await emit(on_event, "search", {
+            "lang": lang,
+            "results": [{"title": r.get("title", ""), "url": r.get("link", "")} for r in results],
+        })
 
         if not results:
             no_results_by_lang = {
@@ -584,17 +331,14 @@ async def check_fact_simple_async(claim_text: str, k_sources: int = 5, generate_
                 "tr": "Arama sonuçları bulunamadı.",
                 "ru": "Результаты поиска не найдены.",
             }
-            return {"case": "غير مؤكد", "talk": no_results_by_lang.get(lang, no_results_by_lang["en"]), "sources": [], "news_article": None}
-
-        def clip(s: str, n: int) -> str:
-            return s.strip() if len(s) <= n else s[:n] + "…"
+            return {"case": "غير مؤكد", "talk": no_results_by_lang.get(lang, no_results_by_lang["en"]), "sources": [], "news_article": None, "no_results": True}
 
-        context = "\n\n---\n\n".join(
-            f"عنوان: {clip(r['title'], 100)}\nملخص: {clip(r['snippet'], 200)}\nرابط: {r['link']}"
-            for r in results
-        )
+        # أدلة بلا نسخ مكررة من نفس الخبر، متنوعة المصادر وضمن ميزانية tokens (انظر evidence.py)
+        context, context_stats = build_context(results)
+        print(f"🧾 Evidence: {context_stats['packed']}/{context_stats['entries']} entries, "
+              f"{context_stats['merged']} duplicates merged, ~{context_stats['tokens']} tokens")
 
-        system_prompt = FACT_PROMPT_SYSTEM.replace("LANG_HINT", lang)
+        system_prompt = prompts.system_prompt("verdict", lang)
         user_msg = f"""
 LANG_HINT: {lang}
 CURRENT_DATE: {datetime.now().strftime('%Y-%m-%d')}
@@ -607,306 +351,50 @@ CURRENT_DATE: {datetime.now().strftime('%Y-%m-%d')}
 """.strip()
 
         print("📤 Sending prompt to OpenAI (fact-checking)")
-        resp = await async_client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_msg},
-            ],
-            temperature=0.2,
-            max_tokens=800,  # Enough for comprehensive fact-check
-            response_format={"type": "json_object"},
-        )
-        answer = (resp.choices[0].message.content or "").strip()
-        
-        # Clean up the answer - remove markdown code blocks if present
-        if answer.startswith("```"):
-            answer = answer.strip("` \n")
-            if answer.lower().startswith("json"):
-                answer = answer[4:].strip()
-        
-        # Try to extract JSON if it's wrapped in other text
-        json_match = re.search(r'\{[\s\S]*\}', answer)
-        if json_match:
-            answer = json_match.group(0)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_msg},
+        ]
+        if on_event is None:
+            resp = await chat_completion(
+                async_client,
+                model=OPENAI_MODEL,
+                messages=messages,
+                temperature=0.2,
+                max_tokens=800,  # Enough for comprehensive fact-check
+                response_format=verdict_schema.response_format(lang),
+            )
+            prompts.record_usage("verdict", getattr(resp, "usage", None))
+            answer = (resp.choices[0].message.content or "").strip()
+        else:
+            answer = (await _stream_verdict_async(messages, lang, on_event)).strip()
         
-        # Parse JSON with error handling
-        parsed = None
         try:
-            parsed = json.loads(answer)
-        except json.JSONDecodeError as e:
-            # Downgrade noisy logs; only show if explicitly debugging
-            if os.getenv("FACT_DEBUG", "0") == "1":
-                print(f"⚠️ JSON parsing error: {e}")
-                print(f"📄 Response content (first 1000 chars): {answer[:1000]}")
-            
-            # Strategy 1: Smart extraction and reconstruction
-            # Instead of trying to fix malformed JSON, extract and rebuild it properly
-            try:
-                # Extract case
-                case_match = re.search(r'"الحالة"\s*:\s*"([^"]+)"', answer)
-                case = case_match.group(1) if case_match else "غير مؤكد"
-                
-                # Extract talk - find everything between "talk": " and "sources"
-                talk_start = answer.find('"talk": "')
-                talk = ""
-                if talk_start != -1:
-                    talk_value_start = talk_start + 9
-                    # Find where "sources" begins
-                    sources_pos = answer.find('",\n  "sources"', talk_value_start)
-                    if sources_pos == -1:
-                        sources_pos = answer.find('",\n  "sources"', talk_value_start)
-                    if sources_pos == -1:
-                        sources_pos = answer.find('\n  "sources"', talk_value_start)
-                    if sources_pos == -1:
-                        sources_pos = answer.find('"sources"', talk_value_start)
-                    
-                    if sources_pos != -1:
-                        # Extract content between "talk": " and "sources"
-                        talk_raw = answer[talk_value_start:sources_pos].rstrip()
-                        # Remove trailing comma and quote if exists
-                        talk_raw = talk_raw.rstrip(',').rstrip()
-                        if talk_raw.endswith('"'):
-                            talk_raw = talk_raw[:-1]
-                        # Clean up escape sequences
-                        talk = talk_raw.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
-                    else:
-                        # Fallback: find until end of JSON
-                        end_brace = answer.rfind('}', talk_value_start)
-                        if end_brace != -1:
-                            talk_raw = answer[talk_value_start:end_brace].rstrip().rstrip(',').rstrip()
-                            if talk_raw.endswith('"'):
-                                talk_raw = talk_raw[:-1]
-                            talk = talk_raw.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
-                
-                if not talk:
-                    talk = "لا توجد معلومات متاحة."
-                
-                # Extract sources array - more robust pattern
-                sources = []
-                sources_match = re.search(r'"sources"\s*:\s*\[(.*?)\]', answer, re.DOTALL)
-                if sources_match:
-                    sources_str = sources_match.group(1)
-                    # Try multiple patterns to extract sources
-                    # Pattern 1: Standard format with title and url
-                    source_pattern = r'\{\s*"title"\s*:\s*"([^"]+)"\s*,\s*"url"\s*:\s*"([^"]+)"'
-                    for src_match in re.finditer(source_pattern, sources_str):
-                        sources.append({
-                            "title": src_match.group(1),
-                            "url": src_match.group(2)
-                        })
-                    
-                    # Pattern 2: If no sources found, try with different spacing
-                    if not sources:
-                        source_pattern2 = r'"title"\s*:\s*"([^"]+)"\s*[,\s]+\s*"url"\s*:\s*"([^"]+)"'
-                        for src_match in re.finditer(source_pattern2, sources_str):
-                            sources.append({
-                                "title": src_match.group(1),
-                                "url": src_match.group(2)
-                            })
-                    
-                    # Pattern 3: Try to extract from parsed JSON if available
-                    if not sources and parsed:
-                        # If parsed is a dict, try to get sources directly
-                        if isinstance(parsed, dict):
-                            sources_from_parsed = parsed.get("sources", [])
-                            if sources_from_parsed and isinstance(sources_from_parsed, list):
-                                sources = sources_from_parsed
-                
-                # If still no sources and case is "حقيقي", use original search results
-                if not sources and case.lower() in {"حقيقي", "true", "vrai", "verdadero", "pravda"}:
-                    # Use original search results as sources
-                    sources = [{"title": r.get("title", ""), "url": r.get("link", ""), "snippet": r.get("snippet", "")} for r in results[:5]]
-                    print(f"📚 Using {len(sources)} original search results as sources")
-                
-                # Rebuild valid JSON dict (no need to parse, just use the dict)
-                rebuilt_json = {
-                    "الحالة": case,
-                    "talk": talk,
-                    "sources": sources
-                }
-                
-                # Use the rebuilt dict directly
-                parsed = rebuilt_json
-                print("✅ Rebuilt JSON from extracted fields")
-                
-            except Exception as rebuild_error:
-                print(f"⚠️ Rebuild failed: {rebuild_error}")
-                parsed = None
-            
-            # Strategy 2: Use regex extraction if JSON parsing still fails
-            if parsed is None:
-                # Extract fields using regex - more robust for malformed JSON
-                try:
-                    # Extract case
-                    case_match = re.search(r'"الحالة"\s*:\s*"([^"]+)"', answer)
-                    case = case_match.group(1) if case_match else "غير مؤكد"
-                    
-                    # Extract talk - handle multi-line strings more carefully
-                    # Find the talk field and extract everything until "sources" or end
-                    talk_start = answer.find('"talk": "')
-                    talk = ""
-                    if talk_start != -1:
-                        talk_value_start = talk_start + 9
-                        # Find where talk should end (before "sources" or closing brace)
-                        sources_pos = answer.find(',\n  "sources"', talk_value_start)
-                        if sources_pos == -1:
-                            sources_pos = answer.find(',\n  "sources"', talk_value_start)
-                        if sources_pos == -1:
-                            sources_pos = answer.find('"sources"', talk_value_start)
-                        if sources_pos == -1:
-                            # Find the closing brace before "sources" array
-                            end_brace = answer.rfind('}', talk_value_start)
-                            if end_brace != -1:
-                                # Look backwards for the end of talk string
-                                before_sources = answer[talk_value_start:end_brace]
-                                # Find the last quote before sources or end
-                                last_quote = before_sources.rfind('"')
-                                if last_quote != -1:
-                                    talk = before_sources[:last_quote]
-                                else:
-                                    talk = before_sources.rstrip().rstrip(',').rstrip()
-                        else:
-                            talk = answer[talk_value_start:sources_pos].rstrip().rstrip(',').rstrip()
-                            # Remove trailing quote if exists
-                            if talk.endswith('"'):
-                                talk = talk[:-1]
-                        # Clean up escape sequences
-                        talk = talk.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\').strip()
-                    else:
-                        talk = "لا توجد معلومات متاحة."
-                    
-                    # Extract sources array - more robust pattern
-                    sources = []
-                    sources_match = re.search(r'"sources"\s*:\s*\[(.*?)\]', answer, re.DOTALL)
-                    if sources_match:
-                        sources_str = sources_match.group(1)
-                        # Try multiple patterns to extract sources
-                        source_pattern = r'\{\s*"title"\s*:\s*"([^"]+)"\s*,\s*"url"\s*:\s*"([^"]+)"'
-                        for src_match in re.finditer(source_pattern, sources_str):
-                            sources.append({
-                                "title": src_match.group(1),
-                                "url": src_match.group(2)
-                            })
-                        
-                        # If no sources found, try with different spacing
-                        if not sources:
-                            source_pattern2 = r'"title"\s*:\s*"([^"]+)"\s*[,\s]+\s*"url"\s*:\s*"([^"]+)"'
-                            for src_match in re.finditer(source_pattern2, sources_str):
-                                sources.append({
-                                    "title": src_match.group(1),
-                                    "url": src_match.group(2)
-                                })
-                    
-                    # If still no sources and case is "حقيقي", use original search results
-                    if not sources and case.lower() in {"حقيقي", "true", "vrai", "verdadero", "pravda"}:
-                        # Use original search results as sources
-                        sources = [{"title": r.get("title", ""), "url": r.get("link", ""), "snippet": r.get("snippet", "")} for r in results[:5]]
-                        print(f"📚 Using {len(sources)} original search results as sources")
-                    
-                    parsed = {
-                        "الحالة": case,
-                        "talk": talk,
-                        "sources": sources
-                    }
-                    print("✅ Extracted JSON using regex fallback")
-                except Exception as parse_error:
-                    print(f"⚠️ Regex extraction also failed: {parse_error}")
-                    parsed = None
-            
-            # Strategy 3: Final fallback - return uncertain result
-            if parsed is None:
-                print(f"❌ Failed to parse JSON with all strategies")
-                # Return uncertain result as fallback
-                return {
-                    "case": "غير مؤكد",
-                    "talk": "حدث خطأ أثناء معالجة نتائج التحقق. يرجى المحاولة مرة أخرى.",
-                    "sources": [],
-                    "news_article": None,
-                    "x_tweet": None
-                }
+            parsed, repaired = verdict_schema.parse_verdict(answer, lang)
+            if repaired:
+                print("✅ Recovered verdict from malformed JSON (tolerant parser)")
+        except verdict_schema.VerdictFormatError as e:
+            print(f"❌ Failed to parse verdict: {e}")
+            return {
+                "case": "غير مؤكد",
+                "talk": "حدث خطأ أثناء معالجة نتائج التحقق. يرجى المحاولة مرة أخرى.",
+                "sources": [],
+                "news_article": None,
+                "x_tweet": None,
+                "error": True
+            }
 
         case = parsed.get("الحالة", "غير مؤكد")
         talk = parsed.get("talk", "")
         sources = parsed.get("sources", [])
         
-        # Remove duplicates and irrelevant sources
+        # إزالة المكرر والمصادر غير المتعلقة بالادعاء (انظر relevance.py)
         if sources:
-            unique_sources = []
-            seen_source_urls = set()
-            
-            # Extract key words from claim (ignore common stop words)
-            stop_words = {'في', 'من', 'إلى', 'على', 'عن', 'مع', 'هذا', 'هذه', 'ذلك', 'التي', 'الذي', 
-                         'و', 'أو', 'لكن', 'ف', 'ب', 'ك', 'ل', 'the', 'a', 'an', 'and', 'or', 'but', 'in', 
-                         'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were'}
-            claim_words = set(word.lower() for word in processed_claim.split() if word.lower() not in stop_words and len(word) > 2)
-            
-            for source in sources:
-                source_url = source.get("url", "")
-                source_title = source.get("title", "").lower()
-                source_snippet = source.get("snippet", "").lower()
-                
-                # Skip if URL is empty or already seen
-                if not source_url or source_url in seen_source_urls:
-                    continue
-                
-                # Check if source is relevant to the claim
-                # More strict relevance check: title + snippet should contain meaningful key words
-                title_words = set(word.lower() for word in source_title.split() if word.lower() not in stop_words and len(word) > 2)
-                snippet_words = set(word.lower() for word in source_snippet.split() if word.lower() not in stop_words and len(word) > 2)
-                all_source_words = title_words | snippet_words
-                
-                # Calculate relevance score
-                if claim_words and all_source_words:
-                    common_words = claim_words & all_source_words
-                    relevance_ratio = len(common_words) / len(claim_words) if claim_words else 0
-                    
-                    # More lenient threshold to ensure we get enough sources
-                    # Require at least 20% overlap OR at least 1-2 key words in common
-                    min_common = max(1, int(len(claim_words) * 0.2))
-                    
-                    # Accept if relevance is reasonable (20% or has at least min_common words)
-                    if len(common_words) >= min_common or relevance_ratio >= 0.2:
-                        unique_sources.append(source)
-                        seen_source_urls.add(source_url)
-                        if os.getenv("FACT_DEBUG", "0") == "1":
-                            print(f"✓ Relevant source: {source_title[:50]}... (score: {relevance_ratio:.2f}, common: {len(common_words)})")
-                    else:
-                        if os.getenv("FACT_DEBUG", "0") == "1":
-                            print(f"✗ Filtered out: {source_title[:50]}... (score: {relevance_ratio:.2f}, common: {len(common_words)})")
-                elif len(source_title) > 0:
-                    # If claim has no meaningful words, just check if source has title
-                    unique_sources.append(source)
-                    seen_source_urls.add(source_url)
-            
-            sources = unique_sources
-            
-            # Ensure we have at least 3 sources if available from original results
-            # If we filtered too aggressively and have < 3 sources, add more from results
-            if len(sources) < 3 and len(results) > 0:
-                print(f"⚠️ Only {len(sources)} sources after filtering, adding more from search results...")
-                # Add sources from original results that haven't been added yet
-                for r in results[:10]:
-                    url = r.get("link", "")
-                    if url and url not in seen_source_urls:
-                        sources.append({
-                            "title": r.get("title", ""),
-                            "url": url,
-                            "snippet": r.get("snippet", "")
-                        })
-                        seen_source_urls.add(url)
-                        if len(sources) >= 5:  # Target at least 5 sources
-                            break
-                print(f"📚 Now have {len(sources)} sources after adding from search results")
-            
-            # Limit sources to top 10 to avoid overwhelming response
-            if len(sources) > 10:
-                sources = sources[:10]
-                print(f"📚 Limited sources to top 10 (from {len(unique_sources)})")
+            sources = relevance.filter_sources(processed_claim, sources, results)
         
         # Ensure sources are returned for "حقيقي" cases
         # If no sources found and case is "حقيقي", use original search results
-        if not sources and case.lower() in {"حقيقي", "true", "vrai", "verdadero", "pravda"}:
+        if not sources and prompts.case_key(case) == "true":
             sources = [{"title": r.get("title", ""), "url": r.get("link", ""), "snippet": r.get("snippet", "")} for r in results[:5]]
             print(f"📚 Using {len(sources)} original search results as sources for verified claim")
 
@@ -923,6 +411,23 @@ CURRENT_DATE: {datetime.now().strftime('%Y-%m-%d')}
         lowered = case.strip().lower()
         is_uncertain = lowered in {t for s in uncertain_terms.values() for t in s}
         
+        # Clear sources for uncertain results unless explicitly requested to preserve them
+        # But if preserve_sources is true, use the original search results instead of AI sources
+        if is_uncertain:
+            if preserve_sources:
+                # Use original search results when preserving sources (already deduplicated)
+                sources = [{"title": r.get("title", ""), "url": r.get("link", ""), "snippet": r.get("snippet", "")} for r in results]
+            else:
+                # Clear sources as per original logic
+                sources = []
+
+        await emit(on_event, "verdict", {"case": case, "talk": talk, "sources": sources})
+
+        async def _generate(name: str, coro):
+            value = await coro
+            await emit(on_event, name, {name: value})
+            return value
+
         # Prepare parallel tasks for news and tweet generation
         generation_tasks = []
         news_article = ""
@@ -930,15 +435,17 @@ CURRENT_DATE: {datetime.now().strftime('%Y-%m-%d')}
         
         if generate_news:
             print("📰 Generating professional news article as requested...")
-            generation_tasks.append(
-                generate_professional_news_article_from_analysis_async(processed_claim, case, talk, results, lang, async_client)
-            )
+            generation_tasks.append(_generate(
+                "news_article",
+                generate_professional_news_article_from_analysis_async(processed_claim, case, talk, results, lang, async_client),
+            ))
         
         if generate_tweet:
             print("🐦 Generating X tweet as requested...")
-            generation_tasks.append(
-                generate_x_tweet_async(processed_claim, case, talk, results, lang, async_client)
-            )
+            generation_tasks.append(_generate(
+                "x_tweet",
+                generate_x_tweet_async(processed_claim, case, talk, results, lang, async_client),
+            ))
         
         # Execute generation tasks in parallel if any
         if generation_tasks:
@@ -952,16 +459,6 @@ CURRENT_DATE: {datetime.now().strftime('%Y-%m-%d')}
                 result_idx += 1
             if generate_tweet:
                 x_tweet = generation_results[result_idx]
-        
-        # Clear sources for uncertain results unless explicitly requested to preserve them
-        # But if preserve_sources is true, use the original search results instead of AI sources
-        if is_uncertain:
-            if preserve_sources:
-                # Use original search results when preserving sources (already deduplicated)
-                sources = [{"title": r.get("title", ""), "url": r.get("link", ""), "snippet": r.get("snippet", "")} for r in results]
-            else:
-                # Clear sources as per original logic
-                sources = []
 
         return {
             "case": case, 
@@ -984,10 +481,130 @@ CURRENT_DATE: {datetime.now().strftime('%Y-%m-%d')}
             "ru": "⚠️ Во время проверки фактов произошла ошибка.",
         }
         try:
-            lang = await _lang_hint_from_claim_async(processed_claim if 'processed_claim' in locals() else claim_text)
+            lang = lang or await _lang_hint_from_claim_async(processed_claim if 'processed_claim' in locals() else claim_text)
         except Exception:
             lang = "en"
-        return {"case": "غير مؤكد", "talk": error_by_lang.get(lang, error_by_lang["en"]), "sources": [], "news_article": None}
+        return {"case": "غير مؤكد", "talk": error_by_lang.get(lang, error_by_lang["en"]), "sources": [], "news_article": None, "error": True}
+
+
+async def fact_check_request_async(query: str, k_sources: int = 10, generate_news: bool = False, preserve_sources: bool = False, generate_tweet: bool = False, speculative: bool | None = None, on_event: EventCallback | None = None) -> dict:
+    """
+    المسار الكامل لطلب فحص: كاش النتائج ← الفحص الأولي (خبر؟ + اللغة) ← البحث ← الحكم.
+
+    في الوضع الاستباقي (FACT_SPECULATIVE_SEARCH=1) يبدأ البحث مع الفحص الأولي في نفس الوقت،
+    ويُلغى إن رُفض الادعاء (وتُحسب عمليات البحث المهدرة في العدادات).
+    الطلبات المتطابقة المتزامنة تُدمج في تنفيذ واحد (انظر singleflight.py).
+    on_event: للواجهة المتدفقة (SSE) — تُرسل المراحل فور انتهائها، ولا يُدمج الطلب مع غيره
+              لأن كل عميل يحتاج أحداثه الخاصة.
+
+    Returns the pipeline result dict, or {"rejected": True, "reason": str} if the claim is not news.
+    """
+    cache_key = make_result_key(query, k_sources=k_sources, generate_news=generate_news, preserve_sources=preserve_sources, generate_tweet=generate_tweet)
+    result = await result_cache.aget(cache_key)
+    if result is not None:
+        print(f"⚡ Cache hit: {query[:50]}...")
+        if on_event is not None:
+            await _replay_cached_async(result, on_event)
+        return result
+
+    if on_event is not None:
+        return await _fact_check_uncached_async(query, cache_key, k_sources, generate_news, preserve_sources, generate_tweet, speculative, on_event)
+
+    # الطلبات المتطابقة المتزامنة تنتظر نفس التنفيذ بدل تشغيل مسار جديد
+    return await fact_flight.do(
+        cache_key,
+        lambda: _fact_check_uncached_async(query, cache_key, k_sources, generate_news, preserve_sources, generate_tweet, speculative),
+        wait_shared=lambda: result_cache.aget(cache_key),
+    )
+
+
+async def fact_check_batch_async(queries: List[str], k_sources: int = 10, generate_news: bool = False, preserve_sources: bool = False, generate_tweet: bool = False, concurrency: int | None = None) -> AsyncIterator[Tuple[List[int], str, dict]]:
+    """
+    فحص قائمة ادعاءات بحد أقصى للتوازي (FACT_BATCH_CONCURRENCY).
+    الادعاءات المتطابقة (بعد التطبيع) داخل الدفعة تُفحص مرة واحدة.
+
+    Yields (indices, query, result) as each unique claim completes; indices are the
+    positions in ``queries`` that share this result.
+    """
+    groups: Dict[str, List[int]] = {}
+    for idx, query in enumerate(queries):
+        key = make_result_key(query, k_sources=k_sources, generate_news=generate_news, preserve_sources=preserve_sources, generate_tweet=generate_tweet)
+        groups.setdefault(key, []).append(idx)
+    metrics.incr("batch.items", len(queries))
+    metrics.incr("batch.deduplicated", len(queries) - len(groups))
+
+    semaphore = asyncio.Semaphore(concurrency or BATCH_CONCURRENCY)
+
+    async def run_one(indices: List[int]) -> Tuple[List[int], str, dict]:
+        query = queries[indices[0]]
+        async with semaphore:
+            try:
+                result = await fact_check_request_async(query, k_sources=k_sources, generate_news=generate_news, preserve_sources=preserve_sources, generate_tweet=generate_tweet)
+            except Exception as e:
+                print(f"❌ Batch item failed: {e}")
+                result = {"error": True, "reason": str(e)}
+        return indices, query, result
+
+    tasks = [asyncio.create_task(run_one(indices)) for indices in groups.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _replay_cached_async(result: dict, on_event: EventCallback) -> None:
+    """نتيجة من الكاش: نرسل نفس الأحداث النهائية دفعة واحدة"""
+    await on_event("validation", {"is_news": True, "reason": "", "cached": True})
+    await on_event("verdict", {"case": result.get("case"), "talk": result.get("talk"), "sources": result.get("sources", [])})
+    for name in ("news_article", "x_tweet"):
+        if result.get(name) is not None:
+            await on_event(name, {name: result[name]})
+
+
+async def _fact_check_uncached_async(query: str, cache_key: str, k_sources: int, generate_news: bool, preserve_sources: bool, generate_tweet: bool, speculative: bool | None, on_event: EventCallback | None = None) -> dict:
+    if speculative is None:
+        speculative = SPECULATIVE_SEARCH
+    search_task = None
+    # طلبات SerpAPI التي أرسلها البحث الاستباقي فعلاً (الكاش وتوقف الخطة التكيفية مبكراً لا يُحسبان)
+    serp_requests = RequestCounter()
+    rejected = False
+    if speculative:
+        metrics.incr("speculative.claims")
+        search_task = asyncio.create_task(serp_requests.run(search_claim_async(translate_date_references(query), k_sources)))
+
+    try:
+        triage = await triage_claim_async(query)
+        await emit(on_event, "validation", triage)
+        if not triage["is_news"]:
+            rejected = True
+            if search_task is not None:
+                metrics.incr("speculative.claims_rejected")
+            return {"rejected": True, "reason": triage["reason"]}
+
+        search_results = None
+        if search_task is not None:
+            try:
+                search_results = await search_task
+            except Exception as e:
+                # نكمل بالبحث العادي داخل المسار
+                print(f"⚠️ Speculative search failed: {e}")
+    finally:
+        # رفض، أو إلغاء الطلب نفسه أثناء انتظار الفرز: لا نترك البحث يعمل في الخلفية
+        if search_task is not None:
+            if not search_task.done():
+                search_task.cancel()
+            metrics.incr("speculative.searches_started", serp_requests.count)
+            if rejected:
+                metrics.incr("speculative.searches_wasted", serp_requests.count)
+
+    result = await check_fact_simple_async(query, k_sources=k_sources, generate_news=generate_news, preserve_sources=preserve_sources, generate_tweet=generate_tweet, lang=triage["lang"], search_results=search_results, on_event=on_event)
+
+    # لا نخزّن نتائج الأخطاء حتى لا تتكرر للمستخدمين التاليين؛ "لا نتائج" قد تتغير قريباً (خبر جديد)
+    if not result.get("error"):
+        await result_cache.aset(cache_key, result, ttl=RESULT_CACHE_NEGATIVE_TTL if result.get("no_results") else None)
+    return result
 
 
 # Keep synchronous version for backward compatibility - it will call async version internally
@@ -0,0 +1,274 @@
+"""
+Structured output for the verdict call.
+
+- ``response_format(lang)`` is the strict ``json_schema`` sent to OpenAI: the
+  verdict is an enum of the two localized labels for LANG_HINT, ``talk`` a string
+  and ``sources`` a list of ``{title, url}`` — with strict mode the model cannot
+  return anything else (FACT_VERDICT_STRICT_SCHEMA=0 goes back to json_object).
+- ``parse_verdict(answer, lang)`` reads the answer: ``json`` first, then — only if
+  that fails (old models, truncated streams) — ``loads_tolerant``, a single
+  left-to-right pass that accepts unescaped quotes and raw newlines inside strings,
+  trailing commas, code fences and missing closing brackets.
+- ``validate_verdict`` checks the result and returns ``{"الحالة", "talk", "sources"}``.
+"""
+import os
+import json
+from typing import Dict, List, Tuple
+
+from . import metrics
+
+STRICT_SCHEMA = os.getenv("FACT_VERDICT_STRICT_SCHEMA", "1") == "1"
+
+CASE_KEY = "الحالة"
+
+# (حقيقي، غير مؤكد) بلغة LANG_HINT — لا يوجد خيار "كاذب" (انظر FACT_PROMPT_SYSTEM)
+VERDICT_LABELS = {
+    "ar": ("حقيقي", "غير مؤكد"),
+    "en": ("True", "Uncertain"),
+    "fr": ("Vrai", "Incertain"),
+    "es": ("Verdadero", "Incierto"),
+    "cs": ("Pravda", "Nejisté"),
+    "de": ("Wahr", "Unsicher"),
+    "tr": ("Doğru", "Belirsiz"),
+    "ru": ("Правда", "Неопределенно"),
+}
+
+_ALL_LABELS = [label for labels in VERDICT_LABELS.values() for label in labels]
+_KNOWN = {label.casefold(): label for label in _ALL_LABELS}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_WHITESPACE = " \t\r\n"
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+class VerdictFormatError(ValueError):
+    """Raised when the verdict answer cannot be turned into a valid verdict"""
+
+
+def verdict_labels(lang: str) -> List[str]:
+    return list(VERDICT_LABELS[lang]) if lang in VERDICT_LABELS else _ALL_LABELS
+
+
+def uncertain_label(lang: str) -> str:
+    return VERDICT_LABELS.get(lang, VERDICT_LABELS["ar"])[1]
+
+
+def response_format(lang: str) -> Dict:
+    if not STRICT_SCHEMA:
+        return {"type": "json_object"}
+    source = {
+        "type": "object",
+        "properties": {"title": {"type": "string"}, "url": {"type": "string"}},
+        "required": ["title", "url"],
+        "additionalProperties": False,
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "fact_check_verdict",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                # ترتيب الخصائص = ترتيب التوليد: الحكم ثم talk يصلان أولاً للواجهة المتدفقة
+                "properties": {
+                    CASE_KEY: {"type": "string", "enum": verdict_labels(lang)},
+                    "talk": {"type": "string"},
+                    "sources": {"type": "array", "items": source},
+                },
+                "required": [CASE_KEY, "talk", "sources"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+class _TolerantParser:
+    """
+    Recursive descent over the text with no backtracking: each character is read once
+    by the main loop, plus at most once more by the whitespace lookahead after a quote
+    or a comma — O(n) whatever the input.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.i = 0
+
+    def _skip(self, i: int) -> int:
+        text = self.text
+        while i < len(text) and text[i] in _WHITESPACE:
+            i += 1
+        return i
+
+    def _peek(self, i: int) -> str:
+        i = self._skip(i)
+        return self.text[i] if i < len(self.text) else ""
+
+    def value(self, context: str = ""):
+        self.i = self._skip(self.i)
+        if self.i >= len(self.text):
+            return None
+        ch = self.text[self.i]
+        if ch == "{":
+            return self.obj()
+        if ch == "[":
+            return self.array()
+        if ch == '"':
+            return self.string("value" if context == "}" else "item")
+        return self.bare(context)
+
+    def obj(self) -> Dict:
+        self.i += 1
+        out = {}
+        while True:
+            self.i = self._skip(self.i)
+            if self.i >= len(self.text):
+                return out
+            ch = self.text[self.i]
+            if ch == "}":
+                self.i += 1
+                return out
+            if ch == ",":
+                self.i += 1
+                continue
+            key = self.string("key") if ch == '"' else self.bare(":")
+            self.i = self._skip(self.i)
+            if self.i < len(self.text) and self.text[self.i] == ":":
+                self.i += 1
+            out[str(key)] = self.value("}")
+
+    def array(self) -> List:
+        self.i += 1
+        out = []
+        while True:
+            self.i = self._skip(self.i)
+            if self.i >= len(self.text):
+                return out
+            ch = self.text[self.i]
+            if ch == "]":
+                self.i += 1
+                return out
+            if ch == ",":
+                self.i += 1
+                continue
+            if ch == "}":
+                # قوس مصفوفة ناقص: نتركه للكائن الأب
+                return out
+            out.append(self.value("]"))
+
+    def _closes(self, role: str, i: int) -> bool:
+        """Is the quote just before ``i`` the end of the string? (an unescaped quote inside talk is not)"""
+        nxt = self._peek(i)
+        if role == "key":
+            return nxt == ":"
+        if nxt in ("", "}", "]"):
+            return True
+        if nxt != ",":
+            return False
+        after = self._peek(self._skip(i) + 1)
+        return after in ('"', "}", "]", "") or (role == "item" and after in ("{", "["))
+
+    def string(self, role: str) -> str:
+        text, i = self.text, self.i + 1
+        out, start = [], i
+        while i < len(text):
+            ch = text[i]
+            if ch == '"':
+                out.append(text[start:i])
+                if self._closes(role, i + 1):
+                    self.i = i + 1
+                    return "".join(out)
+                start = i
+                i += 1
+            elif ch == "\\" and i + 1 < len(text):
+                out.append(text[start:i])
+                esc = text[i + 1]
+                if esc == "u" and i + 6 <= len(text):
+                    try:
+                        out.append(chr(int(text[i + 2:i + 6], 16)))
+                        i += 6
+                    except ValueError:
+                        out.append(esc)
+                        i += 2
+                else:
+                    out.append(_ESCAPES.get(esc, esc))
+                    i += 2
+                start = i
+            else:
+                i += 1
+        # نص مقطوع: نعيد ما وصل
+        out.append(text[start:i])
+        self.i = i
+        return "".join(out)
+
+    def bare(self, context: str):
+        text, i = self.text, self.i
+        stops = ",}]\n" if context != ":" else ":,}\n"
+        while i < len(text) and text[i] not in stops:
+            i += 1
+        raw, self.i = text[self.i:i].strip(), i
+        if raw in _LITERALS:
+            return _LITERALS[raw]
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw
+
+
+def loads_tolerant(text: str):
+    """Best-effort JSON decoding of a malformed model answer (see _TolerantParser)"""
+    try:
+        return _TolerantParser(text).value()
+    except RecursionError:
+        raise VerdictFormatError("answer is nested too deeply")
+
+
+def validate_verdict(data, lang: str) -> Dict:
+    if not isinstance(data, dict):
+        raise VerdictFormatError(f"expected an object, got {type(data).__name__}")
+    talk = data.get("talk")
+    if not isinstance(talk, str) or not talk.strip():
+        raise VerdictFormatError("missing talk")
+
+    case = data.get(CASE_KEY)
+    known = _KNOWN.get(case.strip().casefold()) if isinstance(case, str) else None
+    if known is None:
+        # لا خيار ثالث: أي حكم غير معروف يُعامل كـ "غير مؤكد"
+        metrics.incr("verdict.unknown_case")
+        known = uncertain_label(lang)
+
+    sources = []
+    raw_sources = data.get("sources")
+    for source in raw_sources if isinstance(raw_sources, list) else []:
+        if isinstance(source, dict) and isinstance(source.get("url"), str) and source["url"].strip():
+            title = source.get("title")
+            sources.append({"title": title if isinstance(title, str) else "", "url": source["url"].strip()})
+    return {CASE_KEY: known, "talk": talk.strip(), "sources": sources}
+
+
+def _strip_fences(answer: str) -> str:
+    answer = (answer or "").strip()
+    if answer.startswith("```"):
+        answer = answer.strip("` \n")
+        if answer.lower().startswith("json"):
+            answer = answer[4:].strip()
+    return answer
+
+
+def parse_verdict(answer: str, lang: str) -> Tuple[Dict, bool]:
+    """
+    Returns (verdict, tolerant) — tolerant is True when the strict decoder failed
+    and the answer had to be repaired. Raises VerdictFormatError.
+    """
+    answer = _strip_fences(answer)
+    start = answer.find("{")
+    if start == -1:
+        raise VerdictFormatError("no JSON object in answer")
+    try:
+        data, _ = json.JSONDecoder().raw_decode(answer, start)
+        tolerant = False
+    except (ValueError, RecursionError) as e:
+        if os.getenv("FACT_DEBUG", "0") == "1":
+            print(f"⚠️ JSON parsing error: {e}")
+            print(f"📄 Response content (first 1000 chars): {answer[:1000]}")
+        metrics.incr("verdict.tolerant_parse")
+        data, tolerant = loads_tolerant(answer[start:]), True
+    return validate_verdict(data, lang), tolerant
@@ -2,19 +2,24 @@ from __future__ import annotations
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.views import View
-from django.http import JsonResponse, HttpRequest, HttpResponse
+from django.http import JsonResponse, HttpRequest, HttpResponse, StreamingHttpResponse
+import os
+import hmac
 import json
 import traceback
 import asyncio
-from asgiref.sync import sync_to_async
 
 # Import async utilities
 from .utils_async import (
-    check_fact_simple_async,
+    fact_check_request_async,
+    fact_check_batch_async,
+    BATCH_MAX_ITEMS,
     async_client,
     OPENAI_MODEL,
-    is_news_content_async
 )
+from .lang_detect import detect_lang_hint
+from .streaming import sse_event
+from . import history_writer, metrics
 
 # Keep sync imports for backward compatibility endpoints
 from .utils import (
@@ -23,8 +28,46 @@ from .utils import (
     generate_x_tweet
 )
 
-# Import dashboard model
-from dashboard.models import FactCheckHistory
+# للوصول إلى /fact_check/metrics/ بدون جلسة مدير (Prometheus وما شابه)؛ فارغ = المديرون فقط
+METRICS_TOKEN = os.getenv("FACT_METRICS_TOKEN", "")
+
+
+async def _save_history(request: HttpRequest, query: str, result: dict) -> None:
+    """حفظ نتيجة الفحص في سجل لوحة التحكم خارج مسار الطلب (انظر history_writer.py)"""
+    try:
+        # الحصول على IP و User Agent
+        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+        if x_forwarded_for:
+            ip_address = x_forwarded_for.split(',')[0]
+        else:
+            ip_address = request.META.get('REMOTE_ADDR')
+
+        await history_writer.aenqueue(
+            query=query,
+            case=result.get("case", "unverified"),
+            talk=result.get("talk", ""),
+            sources=result.get("sources", []),
+            news_article=result.get("news_article"),
+            x_tweet=result.get("x_tweet"),
+            ip_address=ip_address,
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        )
+    except Exception as db_error:
+        # في حالة فشل حفظ البيانات، نطبع الخطأ لكن نكمل
+        print(f"❌ Error saving to database: {db_error}")
+        traceback.print_exc()
+
+
+def _response_payload(query: str, result: dict) -> dict:
+    return {
+        "ok": True,
+        "query": query,
+        "case": result.get("case"),
+        "talk": result.get("talk"),
+        "sources": result.get("sources", []),
+        "news_article": result.get("news_article"),
+        "x_tweet": result.get("x_tweet"),
+    }
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -69,15 +112,6 @@ class FactCheckWithOpenaiView(View):
                     status=400,
                 )
 
-            # ✅ التحقق من أن النص متعلق بالأخبار فقط
-            is_valid, reason = await is_news_content_async(query)
-            if not is_valid:
-                return JsonResponse(
-                    {"ok": False, "error": reason or "النص المقدم لا يتعلق بالأخبار أو السياق الصحفي. يرجى إرسال محتوى إخباري فقط."},
-                    status=400,
-                )
-
-            # ✅ استخدام النسخة الـ async للسرعة الفائقة
             # ✅ نمرّر k_sources (الموحد) بدل أي اسم قديم
             # ✅ نمرّر generate_news إذا كان مطلوباً
             # ✅ نمرّر preserve_sources إذا كان مطلوباً
@@ -85,57 +119,22 @@ class FactCheckWithOpenaiView(View):
             generate_news = payload.get("generate_news", False)
             preserve_sources = payload.get("preserve_sources", False)
             generate_tweet = payload.get("generate_tweet", False)
-            
-            # استخدام النسخة الـ async
-            result = await check_fact_simple_async(query, k_sources=10, generate_news=generate_news, preserve_sources=preserve_sources, generate_tweet=generate_tweet)
 
-            # ✅ حفظ النتيجة في قاعدة البيانات
-            try:
-                # الحصول على IP و User Agent
-                x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-                if x_forwarded_for:
-                    ip_address = x_forwarded_for.split(',')[0]
-                else:
-                    ip_address = request.META.get('REMOTE_ADDR')
-
-                user_agent = request.META.get('HTTP_USER_AGENT', '')
-
-                # Debug: Print talk length before saving
-                talk_content = result.get("talk", "")
-                print(f"📝 Talk length before saving: {len(talk_content)} characters")
-                print(f"📝 Talk preview: {talk_content[:200]}...")
-
-                # حفظ في Database باستخدام sync_to_async
-                await sync_to_async(FactCheckHistory.objects.create)(
-                    query=query,
-                    case=result.get("case", "unverified"),
-                    talk=talk_content,
-                    sources=result.get("sources", []),
-                    news_article=result.get("news_article"),
-                    x_tweet=result.get("x_tweet"),
-                    ip_address=ip_address,
-                    user_agent=user_agent
+            # ✅ الكاش ← الفحص الأولي (خبر؟ + اللغة) ← البحث ← الحكم
+            result = await fact_check_request_async(query, k_sources=10, generate_news=generate_news, preserve_sources=preserve_sources, generate_tweet=generate_tweet)
+
+            # ✅ التحقق من أن النص متعلق بالأخبار فقط
+            if result.get("rejected"):
+                return JsonResponse(
+                    {"ok": False, "error": result.get("reason") or "النص المقدم لا يتعلق بالأخبار أو السياق الصحفي. يرجى إرسال محتوى إخباري فقط."},
+                    status=400,
                 )
-                print(f"✅ Successfully saved to database: {query[:50]}...")
-            except Exception as db_error:
-                # في حالة فشل حفظ البيانات، نطبع الخطأ لكن نكمل
-                print(f"❌ Error saving to database: {db_error}")
-                import traceback
-                traceback.print_exc()
+
+            # ✅ حفظ النتيجة في قاعدة البيانات
+            await _save_history(request, query, result)
 
             # ✅ نعيد المفاتيح الموحدة
-            return JsonResponse(
-                {
-                    "ok": True,
-                    "query": query,
-                    "case": result.get("case"),
-                    "talk": result.get("talk"),
-                    "sources": result.get("sources", []),
-                    "news_article": result.get("news_article"),
-                    "x_tweet": result.get("x_tweet"),
-                },
-                status=200,
-            )
+            return JsonResponse(_response_payload(query, result), status=200)
 
         except Exception as e:
             return JsonResponse(
@@ -148,6 +147,153 @@ class FactCheckWithOpenaiView(View):
             )
 
 
+@method_decorator(csrf_exempt, name="dispatch")
+class FactCheckStreamView(View):
+    """
+    POST /fact_check/stream/
+    Body: same as FactCheckWithOpenaiView.
+    Response: text/event-stream, one event per finished stage:
+      start        {query}
+      validation   {is_news, reason, lang}          (cached: true when served from cache)
+      search       {lang, results: [{title, url}]}
+      case         {case}                            (as soon as the model wrote the verdict)
+      talk         {delta}                           (repeated, streamed explanation tokens)
+      verdict      {case, talk, sources}             (final, after source filtering)
+      news_article {news_article}                    (only if generate_news=true)
+      x_tweet      {x_tweet}                         (only if generate_tweet=true)
+      done         {ok, query, case, talk, sources, news_article, x_tweet}  (same shape as /fact_check/)
+      error        {ok: false, error}
+
+    Needs an ASGI server to actually stream; under WSGI Django buffers async iterators.
+    """
+
+    async def post(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        try:
+            payload = json.loads(request.body.decode("utf-8"))
+        except json.JSONDecodeError:
+            return JsonResponse({"ok": False, "error": "Invalid JSON body"}, status=400)
+
+        query = (payload.get("query") or "").strip()
+        if not query:
+            return JsonResponse({"ok": False, "error": "query is required"}, status=400)
+
+        response = StreamingHttpResponse(
+            self._events(request, query, payload),
+            content_type="text/event-stream; charset=utf-8",
+        )
+        response["Cache-Control"] = "no-cache"
+        # يمنع nginx من تخزين الاستجابة مؤقتاً قبل إرسالها
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def _events(self, request: HttpRequest, query: str, payload: dict):
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def on_event(name: str, data: dict) -> None:
+            await queue.put((name, data))
+
+        async def run() -> None:
+            try:
+                result = await fact_check_request_async(
+                    query,
+                    k_sources=10,
+                    generate_news=payload.get("generate_news", False),
+                    preserve_sources=payload.get("preserve_sources", False),
+                    generate_tweet=payload.get("generate_tweet", False),
+                    on_event=on_event,
+                )
+                await queue.put(("_result", result))
+            except Exception as e:
+                traceback.print_exc()
+                await queue.put(("_error", e))
+
+        task = asyncio.create_task(run())
+        try:
+            yield sse_event("start", {"query": query})
+            while True:
+                name, data = await queue.get()
+                if name == "_error":
+                    yield sse_event("error", {"ok": False, "error": str(data)})
+                    return
+                if name == "_result":
+                    if data.get("rejected"):
+                        yield sse_event("error", {"ok": False, "error": data.get("reason") or "النص المقدم لا يتعلق بالأخبار أو السياق الصحفي. يرجى إرسال محتوى إخباري فقط."})
+                        return
+                    await _save_history(request, query, data)
+                    yield sse_event("done", _response_payload(query, data))
+                    return
+                yield sse_event(name, data)
+        finally:
+            # العميل أغلق الاتصال مبكراً → نوقف المسار
+            if not task.done():
+                task.cancel()
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class FactCheckBatchView(View):
+    """
+    POST /fact_check/batch/
+    Body: {
+      "queries": ["<claim 1>", "<claim 2>", ...]   (max FACT_BATCH_MAX_ITEMS, default 200),
+      "generate_news" / "preserve_sources" / "generate_tweet": same as /fact_check/,
+      "stream": true/false (optional) → NDJSON, one line per item as it completes
+    }
+    Response:
+      { ok: true, count: int, results: [ {index, ...same keys as /fact_check/ or ok: false + error}, ... ] }
+
+    Identical claims (after normalization) are checked once; at most
+    FACT_BATCH_CONCURRENCY claims run at the same time.
+    """
+
+    async def post(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        try:
+            payload = json.loads(request.body.decode("utf-8"))
+        except json.JSONDecodeError:
+            return JsonResponse({"ok": False, "error": "Invalid JSON body"}, status=400)
+
+        queries = payload.get("queries")
+        if not isinstance(queries, list) or not queries:
+            return JsonResponse({"ok": False, "error": "queries must be a non-empty list"}, status=400)
+        if len(queries) > BATCH_MAX_ITEMS:
+            return JsonResponse({"ok": False, "error": f"at most {BATCH_MAX_ITEMS} queries per batch"}, status=400)
+        queries = [(q or "").strip() if isinstance(q, str) else "" for q in queries]
+        if not all(queries):
+            return JsonResponse({"ok": False, "error": "every query must be a non-empty string"}, status=400)
+
+        items = fact_check_batch_async(
+            queries,
+            k_sources=10,
+            generate_news=payload.get("generate_news", False),
+            preserve_sources=payload.get("preserve_sources", False),
+            generate_tweet=payload.get("generate_tweet", False),
+        )
+
+        if payload.get("stream"):
+            response = StreamingHttpResponse(self._ndjson(request, queries, items), content_type="application/x-ndjson")
+            response["X-Accel-Buffering"] = "no"
+            return response
+
+        results = [None] * len(queries)
+        async for item in self._items(request, queries, items):
+            results[item["index"]] = item
+        return JsonResponse({"ok": True, "count": len(results), "results": results}, status=200)
+
+    async def _items(self, request: HttpRequest, queries: list, items):
+        async for indices, query, result in items:
+            if result.get("rejected") or "case" not in result:
+                body = {"ok": False, "error": result.get("reason") or "النص المقدم لا يتعلق بالأخبار أو السياق الصحفي. يرجى إرسال محتوى إخباري فقط."}
+            else:
+                await _save_history(request, query, result)
+                body = _response_payload(query, result)
+            # المكررات تشترك في النتيجة لكن كل عنصر يحتفظ بنصه الأصلي
+            for index in indices:
+                yield {**body, "index": index, "query": queries[index]}
+
+    async def _ndjson(self, request: HttpRequest, queries: list, items):
+        async for item in self._items(request, queries, items):
+            yield (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+
+
 @method_decorator(csrf_exempt, name="dispatch")
 class AnalyticalNewsView(View):
     """
@@ -155,7 +301,7 @@ class AnalyticalNewsView(View):
     Body: { 
       "headline": "<news headline>",
       "analysis": "<fact-check analysis>",
-      "lang": "ar" (optional, default: "ar")
+      "lang": "ar" (optional, default: detected from the text, else "ar")
     }
     Response:
       { 
@@ -179,7 +325,7 @@ class AnalyticalNewsView(View):
 
             headline = (payload.get("headline") or "").strip()
             analysis = (payload.get("analysis") or "").strip()
-            lang = payload.get("lang", "ar")
+            lang = payload.get("lang") or detect_lang_hint(headline, default="ar")
 
             if not headline:
                 return JsonResponse(
@@ -228,7 +374,7 @@ class ComposeNewsView(View):
       "case": "<حقيقي/كاذب/غير مؤكد>",
       "talk": "<التحليل>",
       "sources": [{"title": "", "url": "", "snippet": ""}],
-      "lang": "ar" (optional, default: "ar")
+      "lang": "ar" (optional, default: detected from the text, else "ar")
     }
     Response:
       { 
@@ -251,7 +397,8 @@ class ComposeNewsView(View):
             case = (payload.get("case") or "").strip()
             talk = (payload.get("talk") or "").strip()
             sources = payload.get("sources", [])
-            lang = payload.get("lang", "ar")
+            # إن لم تُحدد اللغة نكشفها محلياً من نص الادعاء (الافتراضي: العربية)
+            lang = payload.get("lang") or detect_lang_hint(claim_text, default="ar")
 
             if not claim_text:
                 return JsonResponse(
@@ -310,7 +457,7 @@ class ComposeTweetView(View):
       "case": "<حقيقي/كاذب/غير مؤكد>",
       "talk": "<التحليل>",
       "sources": [{"title": "", "url": "", "snippet": ""}],
-      "lang": "ar" (optional, default: "ar")
+      "lang": "ar" (optional, default: detected from the text, else "ar")
     }
     Response:
       { 
@@ -333,7 +480,8 @@ class ComposeTweetView(View):
             case = (payload.get("case") or "").strip()
             talk = (payload.get("talk") or "").strip()
             sources = payload.get("sources", [])
-            lang = payload.get("lang", "ar")
+            # إن لم تُحدد اللغة نكشفها محلياً من نص الادعاء (الافتراضي: العربية)
+            lang = payload.get("lang") or detect_lang_hint(claim_text, default="ar")
 
             if not claim_text:
                 return JsonResponse(
@@ -379,3 +527,25 @@ class ComposeTweetView(View):
                 },
                 status=500,
             )
+
+
+class MetricsView(View):
+    """
+    GET /fact_check/metrics/
+    عدادات ومؤشرات العملية الحالية (worker): الكاش، استهلاك SerpAPI، البحث الاستباقي...
+    Not public: staff users (session), or "Authorization: Bearer <FACT_METRICS_TOKEN>"
+    for scrapers when that variable is set.
+    """
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if not _metrics_allowed(request):
+            return JsonResponse({"ok": False, "error": "Forbidden"}, status=403)
+        return JsonResponse({"ok": True, **metrics.snapshot()}, status=200)
+
+
+def _metrics_allowed(request: HttpRequest) -> bool:
+    user = getattr(request, "user", None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    auth = request.META.get("HTTP_AUTHORIZATION", "")
+    return bool(METRICS_TOKEN) and auth.startswith("Bearer ") and hmac.compare_digest(auth[7:].strip(), METRICS_TOKEN)
@@ -9,25 +9,31 @@ import aiohttp
 from io import BytesIO
 from PIL import Image
 
+from fact_check_with_openai.search import fetch_serp_async
+from fact_check_with_openai.lang_detect import detect_language, LANG_DETECT_MIN_CONFIDENCE
+from fact_check_with_openai.rate_limit import chat_completion, openai_http_client
+
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
-SERPAPI_KEY = os.getenv("SERPAPI_KEY")
-SERPAPI_HL = os.getenv("SERPAPI_HL", "ar")
-SERPAPI_GL = os.getenv("SERPAPI_GL", "")
 
 if not OPENAI_API_KEY:
     raise RuntimeError("⚠️ Please set OPENAI_API_KEY in .env")
 
 # Create async OpenAI client
-async_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+async_client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=openai_http_client())
 
 
 async def _lang_hint_from_claim_async(text: str) -> str:
-    """Detect language from text"""
+    """Detect language from text (locally first, LLM only when the detector is not confident)"""
+    lang, confidence = detect_language(text)
+    if confidence >= LANG_DETECT_MIN_CONFIDENCE:
+        return lang
+
     try:
-        resp = await async_client.chat.completions.create(
+        resp = await chat_completion(
+            async_client,
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "Detect the input language and return ONLY its ISO 639-1 code (like ar, en, fr, es, de)."},
@@ -48,35 +54,9 @@ async def _lang_hint_from_claim_async(text: str) -> str:
     return "ar" if ratio >= 0.15 else "en"
 
 
-async def _fetch_serp_async(session: aiohttp.ClientSession, query: str, extra: Dict | None = None, num: int = 10) -> List[Dict]:
-    """Fetch search results from SerpAPI"""
-    url = "https://serpapi.com/search.json"
-    params = {
-        "q": query,
-        "api_key": SERPAPI_KEY,
-        "hl": SERPAPI_HL,
-        "gl": SERPAPI_GL,
-        "num": num
-    }
-    if extra:
-        params.update(extra)
-    try:
-        print(f"🔍 Fetching: {query}")
-        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=20)) as response:
-            response.raise_for_status()
-            data = await response.json()
-            results = []
-            for it in data.get("organic_results", []):
-                results.append({
-                    "title": it.get("title") or "",
-                    "snippet": it.get("snippet") or (it.get("snippet_highlighted_words", [""]) or [""])[0],
-                    "link": it.get("link") or it.get("displayed_link") or "",
-                })
-            print(f"✅ Found {len(results)} results for query: {query}")
-            return [r for r in results if r["title"] or r["snippet"] or r["link"]]
-    except Exception as e:
-        print(f"❌ Error fetching from SerpAPI: {e}")
-        return []
+async def _fetch_serp_async(session: aiohttp.ClientSession | None, query: str, extra: Dict | None = None, num: int = 10) -> List[Dict]:
+    """Fetch search results from SerpAPI (shared cache and connection pool with the text pipeline)"""
+    return await fetch_serp_async(session, query, extra=extra, num=num)
 
 
 async def check_image_fact_and_ai_async(image_file, lang: Optional[str] = None) -> dict:
@@ -251,7 +231,8 @@ You are a professional image forensics expert working for a fact-checking servic
         
         # Try with detailed prompt first
         try:
-            response = await async_client.chat.completions.create(
+            response = await chat_completion(
+                async_client,
                 model=OPENAI_MODEL,  # GPT-4o supports vision
                 messages=[
                     {
@@ -354,7 +335,8 @@ All text must be in Arabic."""
                 
                 # Try simpler prompt
                 try:
-                    simple_response = await async_client.chat.completions.create(
+                    simple_response = await chat_completion(
+                        async_client,
                         model=OPENAI_MODEL,
                         messages=[
                             {